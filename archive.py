@@ -0,0 +1,178 @@
+# YouTube MP3 Downloader PRO - Índice de downloads concluídos (arquivo de downloads)
+
+# --------------------------------------------------------------------------------------------------
+# 1. Importações de Módulos
+# --------------------------------------------------------------------------------------------------
+import os
+import re
+import json
+import shutil
+import sqlite3
+import threading
+import subprocess
+
+# --------------------------------------------------------------------------------------------------
+# 2. Configurações Globais
+# --------------------------------------------------------------------------------------------------
+# Extensões consideradas na reconstrução do índice, com o formato correspondente
+EXTENSOES_FORMATO = {'.mp3': "MP3", '.mp4': "MP4"}
+
+# Padrões de URL do YouTube de onde o id do vídeo (11 caracteres) pode ser lido
+_VIDEO_ID_RE = re.compile(
+    r'(?:youtube\.com/(?:watch\?(?:.*&)?v=|shorts/|embed/|live/|v/)|youtu\.be/)([0-9A-Za-z_-]{11})')
+
+# --------------------------------------------------------------------------------------------------
+# 3. Funções Auxiliares
+# --------------------------------------------------------------------------------------------------
+def extrair_video_id(url):
+    """Retorna o id do vídeo do YouTube contido na URL, ou None."""
+    if not url:
+        return None
+    match = _VIDEO_ID_RE.search(url)
+    return match.group(1) if match else None
+
+def _qualidade_mais_proxima(valor, opcoes):
+    """Escolhe, entre opções como '192kbps' ou '720p', a mais próxima do valor numérico."""
+    numeros = {opcao: int(re.sub(r'\D', '', opcao)) for opcao in opcoes}
+    return min(opcoes, key=lambda opcao: abs(numeros[opcao] - valor))
+
+def _ffprobe(ffprobe, path):
+    """Lê as informações de formato e streams de um arquivo de mídia com o ffprobe."""
+    saida = subprocess.run(
+        [ffprobe, '-v', 'quiet', '-print_format', 'json', '-show_format', '-show_streams', path],
+        capture_output=True, text=True, timeout=60)
+    return json.loads(saida.stdout or '{}')
+
+# --------------------------------------------------------------------------------------------------
+# 4. Índice de Downloads
+# --------------------------------------------------------------------------------------------------
+class DownloadArchive:
+    """Índice persistente dos vídeos já baixados, por (id do vídeo, formato, qualidade).
+
+    O índice é mantido inteiro em memória (um dicionário), de modo que cada consulta é
+    O(1) e não exige nenhuma requisição de rede; as inclusões são gravadas
+    incrementalmente em SQLite.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS arquivo (
+                video_id TEXT NOT NULL,
+                formato TEXT NOT NULL,
+                qualidade TEXT NOT NULL,
+                caminho TEXT NOT NULL,
+                tamanho INTEGER,
+                PRIMARY KEY (video_id, formato, qualidade)
+            )
+        """)
+        self._indice = {
+            (video_id, formato, qualidade): (caminho, tamanho)
+            for video_id, formato, qualidade, caminho, tamanho
+            in self._conn.execute("SELECT video_id, formato, qualidade, caminho, tamanho FROM arquivo")
+        }
+
+    def __len__(self):
+        return len(self._indice)
+
+    def contem(self, video_id, formato, qualidade):
+        """True se o vídeo já foi baixado neste formato e qualidade."""
+        return video_id is not None and (video_id, formato, qualidade) in self._indice
+
+    def obter(self, video_id, formato, qualidade):
+        """Retorna (caminho, tamanho) do download registrado, ou None."""
+        return self._indice.get((video_id, formato, qualidade))
+
+    def registrar(self, video_id, formato, qualidade, caminho):
+        """Registra um download concluído."""
+        try:
+            tamanho = os.path.getsize(caminho)
+        except OSError:
+            tamanho = None
+        with self._lock:
+            self._indice[(video_id, formato, qualidade)] = (caminho, tamanho)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO arquivo (video_id, formato, qualidade, caminho, tamanho) VALUES (?, ?, ?, ?, ?)",
+                (video_id, formato, qualidade, caminho, tamanho))
+
+    def reconstruir(self, pasta, ffprobe='ffprobe', qualidades_por_formato=None, saida=None):
+        """Reconstrói o índice a partir dos arquivos presentes em `pasta`.
+
+        Entradas cujos arquivos não existem mais são descartadas e os tamanhos são
+        atualizados. Arquivos ainda não indexados são identificados pela URL gravada nos
+        metadados (tags 'purl'/'comment', escritas pelo FFmpegMetadata), com o formato
+        deduzido da extensão e a qualidade da taxa de bits (MP3) ou da altura do vídeo (MP4).
+        Retorna uma tupla (mantidos, adicionados, removidos).
+        """
+        qualidades_por_formato = qualidades_por_formato or {}
+        with self._lock:
+            entradas = dict(self._indice)
+        conhecidos = {os.path.normcase(os.path.abspath(caminho)) for caminho, _ in entradas.values()}
+
+        novo_indice = {}
+        for chave, (caminho, _) in entradas.items():
+            if os.path.isfile(caminho):
+                novo_indice[chave] = (caminho, os.path.getsize(caminho))
+        removidos = len(entradas) - len(novo_indice)
+        mantidos = len(novo_indice)
+
+        tem_ffprobe = os.path.isfile(ffprobe) or shutil.which(ffprobe) is not None
+        adicionados = 0
+        for raiz, _, arquivos in os.walk(pasta):
+            for nome in arquivos:
+                formato = EXTENSOES_FORMATO.get(os.path.splitext(nome)[1].lower())
+                caminho = os.path.join(raiz, nome)
+                if formato is None or os.path.normcase(os.path.abspath(caminho)) in conhecidos:
+                    continue
+                if not tem_ffprobe:
+                    continue
+                chave = self._identificar(ffprobe, caminho, formato, qualidades_por_formato.get(formato))
+                if chave is None:
+                    if saida is not None:
+                        print(f"⚠️ Sem id de vídeo nos metadados: {caminho}", file=saida)
+                    continue
+                novo_indice[chave] = (caminho, os.path.getsize(caminho))
+                adicionados += 1
+
+        with self._lock:
+            self._indice = novo_indice
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM arquivo")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO arquivo (video_id, formato, qualidade, caminho, tamanho) VALUES (?, ?, ?, ?, ?)",
+                [(*chave, caminho, tamanho) for chave, (caminho, tamanho) in novo_indice.items()])
+            self._conn.execute("COMMIT")
+        return mantidos, adicionados, removidos
+
+    def _identificar(self, ffprobe, caminho, formato, qualidades):
+        """Deduz (id do vídeo, formato, qualidade) de um arquivo a partir dos seus metadados."""
+        try:
+            dados = _ffprobe(ffprobe, caminho)
+        except (OSError, ValueError, subprocess.SubprocessError):
+            return None
+        tags = {k.lower(): v for k, v in (dados.get('format', {}).get('tags') or {}).items()}
+        video_id = extrair_video_id(tags.get('purl')) or extrair_video_id(tags.get('comment'))
+        if video_id is None:
+            return None
+        qualidade = None
+        if qualidades:
+            if formato == "MP3":
+                bit_rate = dados.get('format', {}).get('bit_rate')
+                if bit_rate:
+                    qualidade = _qualidade_mais_proxima(int(bit_rate) / 1000, qualidades)
+            else:
+                alturas = [s.get('height') for s in dados.get('streams', []) if s.get('height')]
+                if alturas:
+                    qualidade = _qualidade_mais_proxima(max(alturas), qualidades)
+        if qualidade is None:
+            return None
+        return video_id, formato, qualidade
+
+    def fechar(self):
+        """Fecha a conexão com o banco de dados."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,165 @@
+# YouTube MP3 Downloader PRO - Pasta temporária local, mudança atômica para o destino e checagem de espaço livre
+
+# --------------------------------------------------------------------------------------------------
+# 1. Importações de Módulos
+# --------------------------------------------------------------------------------------------------
+import os
+import uuid
+import shutil
+import threading
+import contextlib
+import concurrent.futures
+
+# --------------------------------------------------------------------------------------------------
+# 2. Configurações Globais
+# --------------------------------------------------------------------------------------------------
+# Espaço na pasta de trabalho por byte baixado: o arquivo bruto e a saída do FFmpeg (remux,
+# extração de áudio) coexistem até o fim da conversão
+FATOR_TRABALHO = 2
+SUFIXO_MOVENDO = '.movendo' # Cópia incompleta na pasta de destino; só ganha o nome final quando termina
+MOVEDOR_THREADS = 2 # Cópias simultâneas para o destino (limitadas pela rede, não pela CPU)
+
+# Parâmetro próprio repassado ao yt-dlp junto com as opções de cada download
+PARAM_ESPACO = 'reservar_espaco'
+
+class EspacoInsuficiente(Exception):
+    """Não há espaço livre para o download (ou para a saída dele) em uma das pastas."""
+
+# --------------------------------------------------------------------------------------------------
+# 3. Espaço Livre
+# --------------------------------------------------------------------------------------------------
+def estimar_bytes(info):
+    """Tamanho estimado, em bytes, dos arquivos que o yt-dlp vai baixar para `info` (0 se desconhecido)."""
+    return sum(formato.get('filesize') or formato.get('filesize_approx') or 0
+               for formato in info.get('requested_formats') or [info])
+
+class ReservaEspaco:
+    """Controla o espaço livre das pastas de trabalho e de destino entre os downloads simultâneos.
+
+    Cada download reserva, antes de começar, os bytes que vai ocupar em cada pasta; a
+    checagem desconta do espaço livre do disco as reservas ainda em aberto dos outros
+    downloads no mesmo disco (pastas no mesmo dispositivo dividem o mesmo saldo). Assim
+    vários downloads grandes não passam juntos na checagem para depois encher o disco.
+    """
+
+    def __init__(self, margem_bytes=0):
+        self.margem_bytes = margem_bytes # Sempre deixada livre em cada disco
+        self._reservas = {} # chave -> [(dispositivo, bytes)]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _dispositivo(pasta):
+        return os.stat(pasta).st_dev
+
+    def reservar(self, chave, necessidades):
+        """Reserva {pasta: bytes} para `chave`, ou levanta EspacoInsuficiente sem reservar nada."""
+        pedidos = {}
+        for pasta, n in necessidades.items():
+            os.makedirs(pasta, exist_ok=True)
+            dispositivo = self._dispositivo(pasta)
+            pasta_anterior, total = pedidos.get(dispositivo, (pasta, 0))
+            pedidos[dispositivo] = (pasta_anterior, total + n)
+        with self._lock:
+            reservado = {}
+            for reservas in self._reservas.values():
+                for dispositivo, n in reservas:
+                    reservado[dispositivo] = reservado.get(dispositivo, 0) + n
+            for dispositivo, (pasta, n) in pedidos.items():
+                livre = shutil.disk_usage(pasta).free - reservado.get(dispositivo, 0)
+                if livre - n < self.margem_bytes:
+                    raise EspacoInsuficiente(
+                        f"espaço insuficiente em {pasta}: {max(livre, 0) // 2 ** 20} MB livres, "
+                        f"{(n + self.margem_bytes) // 2 ** 20} MB necessários")
+            self._reservas[chave] = [(dispositivo, n) for dispositivo, (_, n) in pedidos.items()]
+
+    def liberar(self, chave):
+        with self._lock:
+            self._reservas.pop(chave, None)
+
+class VerificadorEspaco:
+    """Etapa 'before_dl' do yt-dlp: confere o espaço livre com o tamanho dos formatos escolhidos.
+
+    Roda depois da seleção de formato, quando `filesize` já é conhecido, e antes de qualquer
+    byte ser gravado. A checagem em si vem do download atual (parâmetro PARAM_ESPACO).
+    """
+
+    def __init__(self):
+        self._downloader = None
+
+    def set_downloader(self, downloader):
+        self._downloader = downloader
+
+    def add_progress_hook(self, hook):
+        pass
+
+    def run(self, info):
+        reservar = self._downloader.params.get(PARAM_ESPACO) if self._downloader is not None else None
+        if reservar is not None:
+            reservar(estimar_bytes(info))
+        return [], info
+
+# --------------------------------------------------------------------------------------------------
+# 4. Mudança para o Destino
+# --------------------------------------------------------------------------------------------------
+def mover_atomico(origem, pasta_destino):
+    """Move `origem` para `pasta_destino` de forma que o arquivo final nunca apareça pela metade.
+
+    No mesmo disco, é um único rename. Entre discos (pasta temporária local e destino na
+    rede), o arquivo é copiado para um nome temporário ao lado do destino, gravado em
+    disco (fsync) e só então renomeado para o nome final; a origem é apagada por último.
+    Retorna o caminho final.
+    """
+    destino = os.path.join(pasta_destino, os.path.basename(origem))
+    os.makedirs(pasta_destino, exist_ok=True)
+    try:
+        os.replace(origem, destino)
+        return destino
+    except OSError:
+        pass # Outro disco (EXDEV) ou sistema de arquivos que não aceita o rename
+    temporario = os.path.join(pasta_destino, f".{os.path.basename(origem)}.{uuid.uuid4().hex[:8]}{SUFIXO_MOVENDO}")
+    try:
+        with open(origem, 'rb') as entrada, open(temporario, 'wb') as saida:
+            shutil.copyfileobj(entrada, saida, 1024 * 1024)
+            saida.flush()
+            os.fsync(saida.fileno())
+        shutil.copystat(origem, temporario)
+        os.replace(temporario, destino)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temporario)
+        raise
+    os.remove(origem)
+    return destino
+
+def limpar_movendo(pasta_destino):
+    """Apaga as cópias incompletas deixadas na pasta de destino por uma execução interrompida."""
+    with contextlib.suppress(OSError):
+        for nome in os.listdir(pasta_destino):
+            if nome.startswith('.') and nome.endswith(SUFIXO_MOVENDO):
+                with contextlib.suppress(OSError):
+                    os.remove(os.path.join(pasta_destino, nome))
+
+class MovedorArquivos:
+    """Threads em segundo plano que levam os arquivos prontos da pasta temporária ao destino.
+
+    Os workers de download e o pool de conversão não esperam a cópia pela rede: entregam
+    o arquivo e seguem para o próximo item. `mover` retorna um Future com o caminho final.
+    """
+
+    def __init__(self, max_threads=MOVEDOR_THREADS):
+        self.max_threads = max_threads
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def mover(self, origem, pasta_destino):
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(self.max_threads,
+                                                                       thread_name_prefix='movedor')
+            return self._executor.submit(mover_atomico, origem, pasta_destino)
+
+    def encerrar(self, aguardar=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=aguardar)
@@ -0,0 +1,127 @@
+# YouTube MP3 Downloader PRO - Limite global de banda (token bucket) com divisão justa entre os downloads
+
+# --------------------------------------------------------------------------------------------------
+# 1. Importações de Módulos
+# --------------------------------------------------------------------------------------------------
+import itertools
+import threading
+import time
+
+# --------------------------------------------------------------------------------------------------
+# 2. Configurações Globais
+# --------------------------------------------------------------------------------------------------
+RAJADA_S = 0.25 # Capacidade do balde, em segundos de banda: limita as rajadas depois de uma folga
+RAJADA_MIN_BYTES = 64 * 1024
+ESPERA_MAX_S = 0.1 # Esperas longas são fatiadas para notar pausas e mudanças de limite
+
+# --------------------------------------------------------------------------------------------------
+# 3. Limitador
+# --------------------------------------------------------------------------------------------------
+class LimitadorBanda:
+    """Token bucket compartilhado por todos os downloads, com divisão justa ponderada.
+
+    Cada bloco recebido por um download consome `n` fichas do balde, que se enche a
+    `taxa` bytes/s (None ou 0 = sem limite). Blocos maiores que o saldo são liberados
+    assim que o saldo fica positivo, deixando-o negativo: quem vem depois espera a
+    dívida ser paga, e a taxa média continua correta.
+
+    Quando vários downloads esperam ao mesmo tempo, a vez é de quem recebeu menos em
+    relação ao próprio peso (tempo virtual = bytes / peso). Assim a banda é dividida na
+    proporção dos pesos, sem que um vídeo enorme tome a vez dos outros, e a parte de um
+    download mais lento que a própria fatia sobra para os demais. `definir_taxa` vale
+    imediatamente, inclusive para quem já está esperando.
+    """
+
+    def __init__(self, taxa=None):
+        self._cond = threading.Condition()
+        self._taxa = None
+        self._fichas = 0.0
+        self._ultimo = time.monotonic()
+        self._tempo_virtual = {} # chave -> bytes recebidos / peso
+        self._virtual_global = 0.0 # Tempo virtual do último bloco liberado
+        self._esperando = {} # senha -> (tempo virtual, ordem de chegada)
+        self._senhas = itertools.count()
+        self._vistos = {} # (chave, arquivo) -> bytes já contabilizados
+        self.definir_taxa(taxa)
+
+    @property
+    def taxa(self):
+        return self._taxa
+
+    def definir_taxa(self, taxa):
+        """Muda o limite (bytes/s; None ou 0 = sem limite). Vale para os blocos seguintes."""
+        with self._cond:
+            self._reabastecer()
+            anterior = self._taxa
+            self._taxa = taxa if taxa and taxa > 0 else None
+            # Ao ligar o limite, o balde começa cheio; ao mudá-lo, o saldo (ou a dívida) é mantido
+            self._fichas = self._capacidade() if anterior is None else min(self._fichas, self._capacidade())
+            self._cond.notify_all()
+
+    def _capacidade(self):
+        return max(self._taxa * RAJADA_S, RAJADA_MIN_BYTES) if self._taxa else 0.0
+
+    def _reabastecer(self):
+        agora = time.monotonic()
+        if self._taxa:
+            self._fichas = min(self._fichas + (agora - self._ultimo) * self._taxa, self._capacidade())
+        self._ultimo = agora
+
+    def consumir(self, chave, n, peso=1, interromper=None):
+        """Espera a vez de `chave` e consome `n` bytes. False se `interromper()` pediu para parar."""
+        if n <= 0:
+            return True
+        peso = max(peso, 1e-3)
+        with self._cond:
+            if self._taxa is None:
+                self._tempo_virtual[chave] = self._tempo_virtual.get(chave, 0.0) + n / peso
+                return True
+            # Quem ficou para trás (parado ou mais lento que a própria fatia) recupera no máximo
+            # uma rajada de atraso, para não monopolizar o balde quando voltar a pedir
+            virtual = max(self._tempo_virtual.get(chave, 0.0), self._virtual_global - self._capacidade())
+            self._tempo_virtual[chave] = virtual
+            senha = next(self._senhas)
+            self._esperando[senha] = (virtual, senha)
+            try:
+                while True:
+                    if interromper is not None and interromper():
+                        return False
+                    if self._taxa is None:
+                        break
+                    self._reabastecer()
+                    if self._fichas > 0:
+                        if min(self._esperando.values()) == self._esperando[senha]:
+                            self._fichas -= n
+                            break
+                        espera = ESPERA_MAX_S # Não é a vez: quem for liberado avisa
+                    else:
+                        espera = min(max(-self._fichas / self._taxa, 0.001), ESPERA_MAX_S)
+                    self._cond.wait(espera)
+                self._virtual_global = max(self._virtual_global, self._tempo_virtual[chave])
+                self._tempo_virtual[chave] += n / peso
+                return True
+            finally:
+                del self._esperando[senha]
+                self._cond.notify_all()
+
+    def consumir_progresso(self, chave, arquivo, baixados, peso=1, interromper=None):
+        """`consumir` a partir do total já baixado de um arquivo (o que os hooks do yt-dlp informam).
+
+        A primeira leitura de cada arquivo só marca a referência, para que os bytes
+        retomados de um .part não sejam cobrados de novo.
+        """
+        with self._cond:
+            anterior = self._vistos.get((chave, arquivo))
+            if anterior is not None and baixados <= anterior:
+                return True
+            self._vistos[(chave, arquivo)] = baixados
+        if anterior is None:
+            return True
+        return self.consumir(chave, baixados - anterior, peso, interromper)
+
+    def esquecer(self, chave):
+        """Descarta o estado de um download que terminou (ou foi pausado/cancelado)."""
+        with self._cond:
+            self._tempo_virtual.pop(chave, None)
+            for visto in [visto for visto in self._vistos if visto[0] == chave]:
+                del self._vistos[visto]
@@ -0,0 +1 @@
+# YouTube MP3 Downloader PRO - Benchmarks offline (servidor de mídia local e extrator falso)
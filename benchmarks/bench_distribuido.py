@@ -0,0 +1,134 @@
+# YouTube MP3 Downloader PRO - Benchmark da fila compartilhada com vários processos workers
+#
+# Uso (na raiz do projeto):
+#     python -m benchmarks.bench_distribuido
+#     python -m benchmarks.bench_distribuido --processos 4 --itens 200 --matar 1 --ttl 3
+#
+# Sobe o servidor de mídia local, enfileira os vídeos em uma fila compartilhada numa pasta
+# temporária e inicia vários processos workers sobre ela. Com --matar, alguns workers são
+# encerrados à força no meio do trabalho: os itens deles devem ser recuperados pelos outros
+# depois do TTL do lease. Ao final, confere se cada item foi concluído exatamente uma vez.
+
+# --------------------------------------------------------------------------------------------------
+# 1. Importações de Módulos
+# --------------------------------------------------------------------------------------------------
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import tempfile
+
+# --------------------------------------------------------------------------------------------------
+# 2. Configurações Globais
+# --------------------------------------------------------------------------------------------------
+MARCADOR_RESULTADO = "@@resultado " # O yt-dlp escreve o progresso no stdout do processo filho
+
+# --------------------------------------------------------------------------------------------------
+# 3. Worker (processo filho)
+# --------------------------------------------------------------------------------------------------
+def executar_worker(pasta_fila, pasta_destino, args):
+    """Trabalha na fila compartilhada até ela esvaziar e retorna a contagem por status."""
+    import engine
+    from benchmarks import extrator_falso
+    from fila_compartilhada import FilaCompartilhada, TrabalhadorDistribuido
+
+    with extrator_falso.instalar(conversao=False):
+        motor = engine.DownloadEngine(pasta_destino, "MP3", "192kbps", args.workers)
+        fila = FilaCompartilhada(pasta_fila, ttl=args.ttl)
+        inicio = time.monotonic()
+        try:
+            resultado = TrabalhadorDistribuido(motor, fila, consulta_s=args.ttl / 10).executar()
+        finally:
+            motor.encerrar()
+    return {'dono': fila.dono, 'segundos': round(time.monotonic() - inicio, 3), 'resultado': resultado}
+
+# --------------------------------------------------------------------------------------------------
+# 4. Coordenação e Verificação
+# --------------------------------------------------------------------------------------------------
+def _iniciar_worker(pasta_fila, pasta_destino, args):
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.bench_distribuido', '--executar', pasta_fila, pasta_destino,
+         '--workers', str(args.workers), '--ttl', str(args.ttl)],
+        cwd=raiz, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+
+def _verificar(pasta_fila):
+    """Lê os resultados gravados na fila: (por status, por worker, recuperados, pendentes)."""
+    from fila_compartilhada import PASTA_CONCLUIDOS, PASTA_ITENS
+    pasta = os.path.join(pasta_fila, PASTA_CONCLUIDOS)
+    por_status, donos, recuperados = {}, {}, 0
+    for nome in os.listdir(pasta):
+        if nome.endswith('.json') and not nome.startswith('.'):
+            with open(os.path.join(pasta, nome), encoding='utf-8') as f:
+                dados = json.load(f)
+            por_status[dados['status']] = por_status.get(dados['status'], 0) + 1
+            donos[dados['dono']] = donos.get(dados['dono'], 0) + 1
+            recuperados += bool(dados.get('recuperacoes'))
+    pendentes = len([nome for nome in os.listdir(os.path.join(pasta_fila, PASTA_ITENS)) if not nome.startswith('.')])
+    return por_status, donos, recuperados, pendentes
+
+def executar(args):
+    from benchmarks.servidor_midia import ServidorMidia
+    from fila_compartilhada import FilaCompartilhada
+    from importacao import ENTRADA_VIDEO
+
+    with tempfile.TemporaryDirectory() as pasta, \
+            ServidorMidia(tamanho=args.tamanho_midia, taxa=args.taxa) as servidor:
+        pasta_fila = os.path.join(pasta, 'fila')
+        pasta_destino = os.path.join(pasta, 'downloads') # Compartilhada, como um NAS
+        fila = FilaCompartilhada(pasta_fila, ttl=args.ttl)
+        fila.enfileirar([(None, (ENTRADA_VIDEO, f"d{i:07d}", servidor.url_video(f"d{i:07d}")))
+                         for i in range(args.itens)])
+        inicio = time.monotonic()
+        processos = [_iniciar_worker(pasta_fila, pasta_destino, args) for _ in range(args.processos)]
+        if args.matar:
+            time.sleep(args.matar_apos)
+            for processo in processos[:args.matar]:
+                processo.kill() # Sem chance de devolver os itens: só o TTL os libera
+        saidas = []
+        for processo in processos[args.matar:]:
+            stdout, _ = processo.communicate()
+            linha = stdout.rsplit(MARCADOR_RESULTADO, 1)[-1]
+            saidas.append(json.loads(linha.splitlines()[0]) if MARCADOR_RESULTADO in stdout else None)
+        duracao = time.monotonic() - inicio
+        for processo in processos[:args.matar]:
+            processo.wait()
+        por_status, donos, recuperados, pendentes = _verificar(pasta_fila)
+        arquivos = len([nome for nome in os.listdir(pasta_destino) if nome.endswith('.wav')])
+
+    concluidos = sum(por_status.values())
+    print(f"{args.itens} itens, {args.processos} processos x {args.workers} downloads, "
+          f"{args.matar} encerrado(s) à força: {duracao:.2f}s ({args.itens / duracao:.1f} itens/s)")
+    print(f"Resultados: {por_status} | Recuperados de workers encerrados: {recuperados} | "
+          f"Pendentes: {pendentes} | Arquivos no destino: {arquivos}")
+    for dono, n in sorted(donos.items()):
+        print(f"  {dono}: {n} item(ns)")
+    falhas = [saida for saida in saidas if saida is None]
+    ok = concluidos == args.itens and pendentes == 0 and arquivos == args.itens and not falhas
+    print("✔ Cada item foi concluído uma vez." if ok else "✘ A fila não terminou como esperado.")
+    return 0 if ok else 1
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da fila compartilhada com vários processos")
+    parser.add_argument('--processos', type=int, default=3, help="Processos workers")
+    parser.add_argument('--workers', type=int, default=2, help="Downloads simultâneos por processo")
+    parser.add_argument('--itens', type=int, default=60, help="Vídeos na fila compartilhada")
+    parser.add_argument('--tamanho-midia', type=int, default=512 * 1024, help="Bytes por arquivo de mídia")
+    parser.add_argument('--taxa', type=int, default=1024 * 1024, help="Bytes/s por conexão (0 = sem limite)")
+    parser.add_argument('--matar', type=int, default=1, help="Processos encerrados à força no meio do trabalho")
+    parser.add_argument('--matar-apos', type=float, default=1.5, help="Segundos até encerrá-los")
+    parser.add_argument('--ttl', type=float, default=3.0, help="Validade dos leases, em segundos")
+    parser.add_argument('--executar', nargs=2, metavar=('FILA', 'DESTINO'), help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.executar:
+        print("\n" + MARCADOR_RESULTADO + json.dumps(executar_worker(*args.executar, args)), flush=True)
+        return 0
+    return executar(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
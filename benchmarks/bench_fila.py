@@ -0,0 +1,293 @@
+# YouTube MP3 Downloader PRO - Benchmarks da fila, da ingestão de playlists e dos callbacks da GUI
+#
+# Uso (na raiz do projeto):
+#     python -m benchmarks.bench_fila
+#     python -m benchmarks.bench_fila --cenarios ingestao --tamanhos 10 100 1000 10000
+#     python -m benchmarks.bench_fila --cenarios fila --workers 8 --taxa 2000000 --saida base.json
+#     python -m benchmarks.bench_fila --comparar base.json
+#
+# Nenhum acesso à internet: o yt-dlp usa o extrator falso (benchmarks/extrator_falso.py),
+# que consulta o servidor de mídia local (benchmarks/servidor_midia.py).
+
+# --------------------------------------------------------------------------------------------------
+# 1. Importações de Módulos
+# --------------------------------------------------------------------------------------------------
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+import threading
+
+# --------------------------------------------------------------------------------------------------
+# 2. Configurações Globais
+# --------------------------------------------------------------------------------------------------
+TAMANHOS_PADRAO = {
+    'ingestao': [10, 100, 1000, 10000], # Só a análise da playlist, sem downloads
+    'fila': [10, 100, 1000], # URLs de vídeos já na fila, baixadas pelos workers
+    'playlist': [10, 100, 1000], # Análise e downloads juntos, como no botão "Adicionar Playlist"
+}
+MARCADOR_RESULTADO = "@@resultado " # O yt-dlp escreve o progresso no stdout do processo filho
+REGRESSAO_TOLERANCIA = 0.10 # Variação (10%) a partir da qual --comparar aponta uma diferença
+
+# --------------------------------------------------------------------------------------------------
+# 3. Medições
+# --------------------------------------------------------------------------------------------------
+def pico_rss():
+    """Pico de memória residente do processo, em bytes (None onde não há `resource`)."""
+    try:
+        import resource
+    except ImportError: # Windows
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico if sys.platform == 'darwin' else pico * 1024 # Linux informa em KB
+
+
+class ContadorEventos:
+    """Listener do motor que conta os callbacks recebidos, como a GUI os receberia."""
+
+    def __init__(self):
+        self.por_tipo = {}
+        self.primeiro_lote_em = None
+        self._lock = threading.Lock()
+
+    def __call__(self, evento):
+        with self._lock:
+            self.por_tipo[evento['tipo']] = self.por_tipo.get(evento['tipo'], 0) + 1
+            if evento['tipo'] == 'itens_adicionados' and self.primeiro_lote_em is None:
+                self.primeiro_lote_em = time.monotonic()
+
+    @property
+    def total(self):
+        return sum(self.por_tipo.values())
+
+
+class SimuladorTick:
+    """Imita o `_tick_progresso` da GUI: consulta o snapshot de progresso em `hz` e conta
+    quantas vezes a interface teria de ser redesenhada."""
+
+    def __init__(self, motor, hz):
+        self.motor = motor
+        self.intervalo = 1.0 / hz
+        self.ticks = 0
+        self.renders = 0
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def _loop(self):
+        versao_anterior = None
+        while not self._parar.wait(self.intervalo):
+            self.ticks += 1
+            versao, _ = self.motor.progresso_atual()
+            if versao != versao_anterior:
+                versao_anterior = versao
+                self.renders += 1
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+
+# --------------------------------------------------------------------------------------------------
+# 4. Cenários
+# --------------------------------------------------------------------------------------------------
+def _criar_motor(args, pasta):
+    import engine
+    from journal import FilaJournal
+    from archive import DownloadArchive
+    from cache import MetadataCache
+    persistencia = {}
+    if args.persistencia:
+        # Inclui o custo do diário, do índice e do cache em SQLite, como no aplicativo
+        persistencia = {'journal': FilaJournal(os.path.join(pasta, 'fila.db')),
+                        'archive': DownloadArchive(os.path.join(pasta, 'arquivo.db')),
+                        'cache': MetadataCache(os.path.join(pasta, 'metadados.db'))}
+    return engine.DownloadEngine(os.path.join(pasta, 'downloads'), "MP3", "192kbps", args.workers,
+                                 pipeline_conversao=args.pipeline, **persistencia)
+
+def _cenario_ingestao(motor, servidor, n):
+    return motor.adicionar_playlist(servidor.url_playlist(n), iniciar=False)
+
+def _cenario_fila(motor, servidor, n):
+    motor.adicionar_lote([(None, servidor.url_video(f"f{i:07d}")) for i in range(n)])
+    motor.iniciar()
+    motor.aguardar()
+    return n
+
+def _cenario_playlist(motor, servidor, n):
+    motor.adicionar_playlist(servidor.url_playlist(n), iniciar=True)
+    motor.aguardar()
+    return n
+
+CENARIOS = {'ingestao': _cenario_ingestao, 'fila': _cenario_fila, 'playlist': _cenario_playlist}
+
+def executar_cenario(cenario, n, args):
+    """Roda um cenário uma vez neste processo e retorna suas métricas."""
+    from benchmarks import extrator_falso
+    from benchmarks.servidor_midia import ServidorMidia
+
+    with tempfile.TemporaryDirectory() as pasta, \
+            ServidorMidia(tamanho=args.tamanho_midia, taxa=args.taxa, atraso_api=args.atraso_api) as servidor, \
+            extrator_falso.instalar(conversao=args.conversao):
+        motor = _criar_motor(args, pasta)
+        contador = ContadorEventos()
+        motor.subscribe(contador)
+        tick = SimuladorTick(motor, args.hz).iniciar()
+        inicio = time.monotonic()
+        try:
+            itens = CENARIOS[cenario](motor, servidor, n)
+        finally:
+            duracao = time.monotonic() - inicio
+            tick.parar()
+            motor.encerrar()
+
+    if cenario == 'ingestao':
+        # Sem downloads, o "primeiro byte" útil é o primeiro lote de itens chegando à fila
+        primeiro = contador.primeiro_lote_em
+    else:
+        primeiro = servidor.primeiro_byte_em
+    rss = pico_rss()
+    return {
+        'cenario': cenario,
+        'n': n,
+        'segundos': round(duracao, 4),
+        'itens_por_s': round(itens / duracao, 2) if duracao > 0 else None,
+        'ttfb_s': round(primeiro - inicio, 4) if primeiro is not None else None,
+        'pico_rss_mb': round(rss / (1024 * 1024), 1) if rss is not None else None,
+        'callbacks': contador.total,
+        'callbacks_por_tipo': contador.por_tipo,
+        'ticks': tick.ticks,
+        'renders': tick.renders,
+        'requisicoes_midia': servidor.requisicoes_midia,
+        'bytes': servidor.bytes_enviados,
+    }
+
+# --------------------------------------------------------------------------------------------------
+# 5. Execução e Relatório
+# --------------------------------------------------------------------------------------------------
+def _argumentos_filho(args):
+    """Repete no processo filho as opções que afetam a medição."""
+    opcoes = ['--workers', str(args.workers), '--tamanho-midia', str(args.tamanho_midia),
+              '--taxa', str(args.taxa), '--atraso-api', str(args.atraso_api), '--hz', str(args.hz)]
+    if not args.pipeline:
+        opcoes.append('--sem-pipeline')
+    if args.conversao:
+        opcoes.append('--conversao')
+    if args.persistencia:
+        opcoes.append('--persistencia')
+    return opcoes
+
+def _rodar_em_processo(cenario, n, args):
+    """Cada medição roda em um processo novo, para que o pico de RSS seja só dela."""
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    saida = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_fila', '--executar', cenario, str(n), *_argumentos_filho(args)],
+        cwd=raiz, capture_output=True, text=True)
+    if saida.returncode != 0:
+        raise RuntimeError(f"{cenario} n={n} falhou:\n{saida.stderr}")
+    linha = saida.stdout.rsplit(MARCADOR_RESULTADO, 1)[-1]
+    return json.loads(linha.splitlines()[0])
+
+def _mediana(execucoes):
+    """Combina as repetições de uma medição: mediana dos números, primeira execução no resto."""
+    resultado = dict(execucoes[0])
+    for chave, valor in resultado.items():
+        if isinstance(valor, (int, float)) and chave != 'n':
+            valores = [e[chave] for e in execucoes if e[chave] is not None]
+            resultado[chave] = statistics.median(valores) if valores else None
+    resultado['repeticoes'] = len(execucoes)
+    return resultado
+
+def _formatar(valor, casas=2):
+    if valor is None:
+        return "-"
+    return f"{valor:.{casas}f}" if isinstance(valor, float) else str(valor)
+
+def imprimir_tabela(resultados, saida=sys.stdout):
+    colunas = [('cenario', "Cenário", 9), ('n', "N", 6), ('segundos', "Tempo (s)", 10),
+               ('itens_por_s', "Itens/s", 9), ('ttfb_s', "TTFB (s)", 9), ('pico_rss_mb', "RSS (MB)", 9),
+               ('callbacks', "Callbacks", 10), ('renders', "Renders", 8)]
+    print("  ".join(titulo.rjust(largura) for _, titulo, largura in colunas), file=saida)
+    for resultado in resultados:
+        print("  ".join(_formatar(resultado.get(chave)).rjust(largura) for chave, _, largura in colunas),
+              file=saida)
+
+def comparar(resultados, path_base, saida=sys.stdout):
+    """Compara com uma execução anterior salva com --saida. Retorna o número de regressões."""
+    with open(path_base, 'r', encoding='utf-8') as f:
+        base = {(r['cenario'], r['n']): r for r in json.load(f)['resultados']}
+    # Para cada métrica: True se maior é melhor
+    metricas = {'itens_por_s': True, 'ttfb_s': False, 'pico_rss_mb': False, 'callbacks': False}
+    regressoes = 0
+    for resultado in resultados:
+        anterior = base.get((resultado['cenario'], resultado['n']))
+        if anterior is None:
+            continue
+        for metrica, maior_melhor in metricas.items():
+            atual, antigo = resultado.get(metrica), anterior.get(metrica)
+            if not atual or not antigo:
+                continue
+            variacao = (atual - antigo) / antigo
+            piorou = variacao < -REGRESSAO_TOLERANCIA if maior_melhor else variacao > REGRESSAO_TOLERANCIA
+            if piorou:
+                regressoes += 1
+                print(f"⚠️ {resultado['cenario']} n={resultado['n']}: {metrica} {antigo} -> {atual} "
+                      f"({variacao:+.0%})", file=saida)
+    if not regressoes:
+        print("Nenhuma regressão acima de "
+              f"{REGRESSAO_TOLERANCIA:.0%} em relação a {path_base}.", file=saida)
+    return regressoes
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks offline da fila de downloads")
+    parser.add_argument('--cenarios', nargs='+', choices=list(CENARIOS), default=list(CENARIOS))
+    parser.add_argument('--tamanhos', nargs='+', type=int,
+                        help="Tamanhos de playlist/fila (padrão: depende do cenário, de 10 a 10.000)")
+    parser.add_argument('--repeticoes', type=int, default=1, help="Execuções por medição (usa a mediana)")
+    parser.add_argument('--workers', type=int, default=3, help="Downloads simultâneos")
+    parser.add_argument('--tamanho-midia', type=int, default=256 * 1024, help="Bytes por arquivo de mídia")
+    parser.add_argument('--taxa', type=int, default=0, help="Bytes/s por conexão (0 = sem limite)")
+    parser.add_argument('--atraso-api', type=float, default=0.0,
+                        help="Latência simulada dos metadados, em segundos")
+    parser.add_argument('--hz', type=int, default=10, help="Frequência do tick de progresso simulado")
+    parser.add_argument('--sem-pipeline', dest='pipeline', action='store_false',
+                        help="Converte dentro do worker, sem o pool de processos")
+    parser.add_argument('--conversao', action='store_true',
+                        help="Executa as etapas do FFmpeg (exige FFmpeg instalado)")
+    parser.add_argument('--persistencia', action='store_true',
+                        help="Usa diário, índice e cache em SQLite, como o aplicativo")
+    parser.add_argument('--saida', metavar='ARQUIVO', help="Grava os resultados em JSON")
+    parser.add_argument('--comparar', metavar='ARQUIVO',
+                        help="Compara com resultados gravados antes; sai com código 1 se houver regressão")
+    parser.add_argument('--executar', nargs=2, metavar=('CENARIO', 'N'), help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.executar:
+        cenario, n = args.executar
+        print("\n" + MARCADOR_RESULTADO + json.dumps(executar_cenario(cenario, int(n), args)), flush=True)
+        return 0
+
+    resultados = []
+    for cenario in args.cenarios:
+        for n in args.tamanhos or TAMANHOS_PADRAO[cenario]:
+            execucoes = [_rodar_em_processo(cenario, n, args) for _ in range(max(args.repeticoes, 1))]
+            resultados.append(_mediana(execucoes))
+            print(f"✔ {cenario} n={n}: {_formatar(resultados[-1]['itens_por_s'])} itens/s", file=sys.stderr)
+    imprimir_tabela(resultados)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump({'opcoes': _argumentos_filho(args), 'resultados': resultados}, f, indent=2)
+    if args.comparar:
+        return 1 if comparar(resultados, args.comparar) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+# YouTube MP3 Downloader PRO - Benchmark do tempo de inicialização do aplicativo
+#
+# Uso (na raiz do projeto):
+#     python -m benchmarks.bench_inicio
+#     python -m benchmarks.bench_inicio --repeticoes 20 --saida inicio.json
+#
+# Cada repetição roda em um processo novo (imports "frios" do Python). Sem display, mede só a
+# importação do main.py e o aquecimento do motor; com display, mede também o primeiro frame
+# da janela e o tempo até o aquecimento em segundo plano terminar. O config.json, os bancos de
+# dados e as métricas ficam em uma pasta temporária, e a GUI não procura um serviço no ar.
+
+# --------------------------------------------------------------------------------------------------
+# 1. Importações de Módulos
+# --------------------------------------------------------------------------------------------------
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+# --------------------------------------------------------------------------------------------------
+# 2. Configurações Globais
+# --------------------------------------------------------------------------------------------------
+MARCADOR_RESULTADO = "@@resultado "
+ETAPAS = [
+    ('importacao_s', "Importação do main.py"),
+    ('primeiro_frame_s', "Primeiro frame da janela"),
+    ('pronto_s', "Bancos de dados abertos"),
+    ('aquecido_s', "yt-dlp carregado (GUI)"),
+    ('yt_dlp_s', "Importação do yt-dlp"),
+    ('aquecer_s', "DownloadEngine.aquecer()"),
+]
+LIMITE_AQUECIMENTO = 30.0 # Segundos até desistir de esperar o aquecimento da GUI
+# Arquivos do usuário que a inicialização lê ou cria, redirecionados para a pasta temporária
+CAMINHOS_ISOLADOS = ('CONFIG_FULL_PATH', 'JOURNAL_FULL_PATH', 'ARCHIVE_FULL_PATH', 'CACHE_FULL_PATH',
+                     'METRICAS_FULL_PATH')
+
+# --------------------------------------------------------------------------------------------------
+# 3. Medição (processo filho)
+# --------------------------------------------------------------------------------------------------
+def _isolar(engine, pasta):
+    """Aponta os arquivos do usuário (CAMINHOS_ISOLADOS) e a pasta de downloads para `pasta`."""
+    for nome in CAMINHOS_ISOLADOS:
+        setattr(engine, nome, os.path.join(pasta, os.path.basename(getattr(engine, nome))))
+    with open(engine.CONFIG_FULL_PATH, 'w', encoding='utf-8') as f:
+        json.dump({'pasta': os.path.join(pasta, 'downloads')}, f)
+
+def medir():
+    """Mede uma inicialização, do zero, neste processo. Os tempos são relativos ao início."""
+    with tempfile.TemporaryDirectory() as pasta:
+        inicio = time.perf_counter()
+        import engine
+        antes = time.perf_counter()
+        _isolar(engine, pasta) # Antes do main, que lê o config.json ao ser importado
+        inicio += time.perf_counter() - antes # Não entra no tempo de importação
+        import main
+        resultado = {'importacao_s': time.perf_counter() - inicio}
+        main.MotorRemoto.conectar = classmethod(lambda cls, *args, **kwargs: None) # Sempre o motor local
+        return _medir_inicializacao(main, inicio, resultado)
+
+def _medir_inicializacao(main, inicio, resultado):
+    try:
+        root = main.tk.Tk() if main.tk is not None else None
+    except main.tk.TclError: # Sem display
+        root = None
+    if root is not None:
+        app = main.YouTubeMP3Downloader(root)
+        root.update()
+        resultado['primeiro_frame_s'] = time.perf_counter() - inicio
+        while not app._pronto.is_set():
+            root.update()
+            time.sleep(0.001)
+        resultado['pronto_s'] = time.perf_counter() - inicio
+        limite = time.monotonic() + LIMITE_AQUECIMENTO
+        while not app._aquecido.is_set() and time.monotonic() < limite:
+            root.update()
+            time.sleep(0.001)
+        resultado['aquecido_s'] = time.perf_counter() - inicio if app._aquecido.is_set() else None
+        app.engine.encerrar()
+        app.engine.metricas.fechar()
+        for banco in (app.engine.journal, app.engine.archive, app.engine.cache):
+            if banco is not None:
+                banco.fechar()
+        root.destroy()
+        return resultado
+
+    # Sem janela: mede as mesmas etapas que a GUI executa em segundo plano
+    t = time.perf_counter()
+    main.engine.carregar_yt_dlp()
+    resultado['yt_dlp_s'] = time.perf_counter() - t
+    motor = main.DownloadEngine(main.initial_download_folder, main.initial_format_type,
+                                main.initial_quality, main.initial_max_workers)
+    t = time.perf_counter()
+    motor.aquecer()
+    resultado['aquecer_s'] = time.perf_counter() - t
+    motor.encerrar()
+    return resultado
+
+# --------------------------------------------------------------------------------------------------
+# 4. Execução e Relatório
+# --------------------------------------------------------------------------------------------------
+def _rodar_em_processo():
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    saida = subprocess.run([sys.executable, '-m', 'benchmarks.bench_inicio', '--executar'],
+                           cwd=raiz, capture_output=True, text=True)
+    if saida.returncode != 0:
+        raise RuntimeError(f"A medição falhou:\n{saida.stderr}")
+    linha = saida.stdout.rsplit(MARCADOR_RESULTADO, 1)[-1]
+    return json.loads(linha.splitlines()[0])
+
+def resumir(execucoes):
+    """{etapa: {'mediana', 'min', 'max'}} para cada etapa medida em alguma execução."""
+    resumo = {}
+    for chave, _ in ETAPAS:
+        valores = [e[chave] for e in execucoes if e.get(chave) is not None]
+        if valores:
+            resumo[chave] = {'mediana': statistics.median(valores), 'min': min(valores), 'max': max(valores)}
+    return resumo
+
+def imprimir_tabela(resumo, saida=sys.stdout):
+    print(f"{'Etapa':<28}{'Mediana':>10}{'Mín':>10}{'Máx':>10}", file=saida)
+    for chave, titulo in ETAPAS:
+        if chave in resumo:
+            valores = resumo[chave]
+            print(f"{titulo:<28}" + "".join(f"{valores[c] * 1000:>8.0f}ms" for c in ('mediana', 'min', 'max')),
+                  file=saida)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do tempo de inicialização")
+    parser.add_argument('--repeticoes', type=int, default=10, help="Inicializações medidas (usa a mediana)")
+    parser.add_argument('--saida', metavar='ARQUIVO', help="Grava as medições em JSON")
+    parser.add_argument('--executar', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.executar:
+        print("\n" + MARCADOR_RESULTADO + json.dumps(medir()), flush=True)
+        return 0
+
+    execucoes = [_rodar_em_processo() for _ in range(max(args.repeticoes, 1))]
+    resumo = resumir(execucoes)
+    imprimir_tabela(resumo)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump({'execucoes': execucoes, 'resumo': resumo}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
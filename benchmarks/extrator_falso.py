@@ -0,0 +1,89 @@
+# YouTube MP3 Downloader PRO - Extrator falso do yt-dlp apontado para o servidor de mídia local
+
+# --------------------------------------------------------------------------------------------------
+# 1. Importações de Módulos
+# --------------------------------------------------------------------------------------------------
+import contextlib
+from unittest import mock
+
+import yt_dlp
+from yt_dlp.extractor.common import InfoExtractor
+
+# --------------------------------------------------------------------------------------------------
+# 2. Extratores
+# --------------------------------------------------------------------------------------------------
+_BASE_RE = r'(?P<base>https?://(?:127\.0\.0\.1|localhost):\d+)'
+
+
+class BenchVideoIE(InfoExtractor):
+    """Um vídeo do servidor local: os metadados vêm de /api/video e a mídia de /midia."""
+    IE_NAME = 'bench:video'
+    _VALID_URL = _BASE_RE + r'/video/(?P<id>[\w-]+)'
+
+    def _real_extract(self, url):
+        base, video_id = self._match_valid_url(url).group('base', 'id')
+        dados = self._download_json(f"{base}/api/video/{video_id}", video_id, note=False)
+        return {
+            'id': video_id,
+            'title': dados['title'],
+            'webpage_url': url,
+            'formats': [{
+                'format_id': 'wav',
+                'url': dados['midia'],
+                'ext': 'wav',
+                'vcodec': 'none',
+                'acodec': 'pcm_s16le',
+                'abr': 705,
+                'filesize': dados['tamanho'],
+            }],
+        }
+
+
+class BenchPlaylistIE(InfoExtractor):
+    """Uma playlist sintética de n vídeos, entregue em páginas como no YouTube."""
+    IE_NAME = 'bench:playlist'
+    _VALID_URL = _BASE_RE + r'/playlist/(?P<id>\d+)'
+
+    def _entradas(self, base, n):
+        pagina = 0
+        while True:
+            dados = self._download_json(f"{base}/api/playlist/{n}", n, note=False,
+                                        query={'pagina': pagina})
+            for entrada in dados['entradas']:
+                yield self.url_result(f"{base}/video/{entrada['id']}", BenchVideoIE,
+                                      entrada['id'], entrada['title'])
+            if not dados['proxima']:
+                return
+            pagina += 1
+
+    def _real_extract(self, url):
+        base, n = self._match_valid_url(url).group('base', 'id')
+        return self.playlist_result(self._entradas(base, n), n, f"Playlist {n}")
+
+
+class YoutubeDLBench(yt_dlp.YoutubeDL):
+    """YoutubeDL com os extratores falsos à frente dos padrão (o genérico aceitaria qualquer URL)."""
+
+    def __init__(self, params=None, auto_init=True):
+        super().__init__(params, auto_init=False)
+        self.add_info_extractor(BenchVideoIE())
+        self.add_info_extractor(BenchPlaylistIE())
+        if auto_init:
+            self.add_default_info_extractors()
+
+# --------------------------------------------------------------------------------------------------
+# 3. Instalação
+# --------------------------------------------------------------------------------------------------
+@contextlib.contextmanager
+def instalar(conversao=False):
+    """Faz o motor usar o YoutubeDL com os extratores falsos enquanto o bloco estiver ativo.
+
+    Sem `conversao`, as etapas do FFmpeg são retiradas, para que os cenários meçam apenas a
+    fila e a rede (e rodem em máquinas sem FFmpeg).
+    """
+    import engine
+    with contextlib.ExitStack() as pilha:
+        pilha.enter_context(mock.patch.object(yt_dlp, 'YoutubeDL', YoutubeDLBench))
+        if not conversao:
+            pilha.enter_context(mock.patch.object(engine, 'postprocessors_para', lambda *args: []))
+        yield
@@ -0,0 +1,213 @@
+# YouTube MP3 Downloader PRO - Servidor HTTP local de mídia sintética para os benchmarks
+
+# --------------------------------------------------------------------------------------------------
+# 1. Importações de Módulos
+# --------------------------------------------------------------------------------------------------
+import re
+import json
+import time
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+# --------------------------------------------------------------------------------------------------
+# 2. Configurações Globais
+# --------------------------------------------------------------------------------------------------
+BLOCO = 64 * 1024 # Bytes enviados por escrita no socket
+ENTRADAS_POR_PAGINA = 100 # Entradas por página da playlist, como no YouTube
+TAXA_AMOSTRAGEM = 44100
+
+_RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)')
+
+# --------------------------------------------------------------------------------------------------
+# 3. Funções Auxiliares
+# --------------------------------------------------------------------------------------------------
+def cabecalho_wav(tamanho):
+    """Cabeçalho de um WAV PCM 16 bits mono cujo arquivo inteiro tem `tamanho` bytes."""
+    dados = max(tamanho - 44, 0)
+    return (b'RIFF' + struct.pack('<I', 36 + dados) + b'WAVE'
+            + b'fmt ' + struct.pack('<IHHIIHH', 16, 1, 1, TAXA_AMOSTRAGEM, TAXA_AMOSTRAGEM * 2, 2, 16)
+            + b'data' + struct.pack('<I', dados))
+
+def _inteiro(query, nome, padrao):
+    try:
+        return int(query[nome][0])
+    except (KeyError, IndexError, ValueError):
+        return padrao
+
+# --------------------------------------------------------------------------------------------------
+# 4. Servidor
+# --------------------------------------------------------------------------------------------------
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass # Sem log por requisição; o ruído no terminal distorceria as medições
+
+    def do_HEAD(self):
+        self._responder(enviar_corpo=False)
+
+    def do_GET(self):
+        self._responder(enviar_corpo=True)
+
+    def _responder(self, enviar_corpo):
+        partes = urlsplit(self.path)
+        query = parse_qs(partes.query)
+        caminho = partes.path.strip('/').split('/')
+        servidor = self.server.midia
+        if len(caminho) == 3 and caminho[:2] == ['api', 'video']:
+            self._json(servidor.info_video(caminho[2]), enviar_corpo)
+        elif len(caminho) == 3 and caminho[:2] == ['api', 'playlist'] and caminho[2].isdigit():
+            self._json(servidor.pagina_playlist(int(caminho[2]), _inteiro(query, 'pagina', 0)), enviar_corpo)
+        elif len(caminho) == 2 and caminho[0] == 'midia':
+            self._midia(_inteiro(query, 'tamanho', servidor.tamanho),
+                        _inteiro(query, 'taxa', servidor.taxa), enviar_corpo)
+        else:
+            self.send_error(404)
+
+    def _json(self, dados, enviar_corpo):
+        corpo = json.dumps(dados).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        if enviar_corpo:
+            self.wfile.write(corpo)
+
+    def _midia(self, tamanho, taxa, enviar_corpo):
+        inicio, fim = 0, tamanho - 1
+        match = _RANGE_RE.fullmatch(self.headers.get('Range', '').strip())
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                inicio = int(match.group(1))
+                fim = min(int(match.group(2)), tamanho - 1) if match.group(2) else tamanho - 1
+            else: # Sufixo: os últimos N bytes
+                inicio = max(tamanho - int(match.group(2)), 0)
+            if inicio >= tamanho or inicio > fim:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{tamanho}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {inicio}-{fim}/{tamanho}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'audio/wav')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(fim - inicio + 1))
+        self.end_headers()
+        if not enviar_corpo:
+            return
+
+        cabecalho = cabecalho_wav(tamanho)
+        zeros = bytes(BLOCO)
+        servidor = self.server.midia
+        comeco = time.monotonic()
+        posicao = inicio
+        enviados = 0
+        try:
+            while posicao <= fim:
+                n = min(BLOCO, fim - posicao + 1)
+                if posicao < len(cabecalho):
+                    bloco = (cabecalho[posicao:] + zeros)[:n]
+                else:
+                    bloco = zeros[:n]
+                self.wfile.write(bloco)
+                if enviados == 0:
+                    servidor.registrar_primeiro_byte()
+                posicao += n
+                enviados += n
+                if taxa:
+                    # Limita a taxa de envio desta conexão a `taxa` bytes/s
+                    atraso = enviados / taxa - (time.monotonic() - comeco)
+                    if atraso > 0:
+                        time.sleep(atraso)
+        except (BrokenPipeError, ConnectionResetError):
+            pass # O cliente desistiu (download cancelado ou pausado)
+        finally:
+            servidor.registrar_envio(enviados)
+
+
+class ServidorMidia:
+    """Servidor HTTP local que imita as respostas usadas pelo extrator falso.
+
+    Rotas:
+        /api/video/<id>                  -> JSON com título, tamanho e URL da mídia
+        /api/playlist/<n>?pagina=<k>     -> JSON com uma página de entradas de uma playlist de n vídeos
+        /midia/<id>.wav?tamanho=&taxa=   -> WAV sintético (silêncio), com suporte a Range
+
+    `tamanho` (bytes) e `taxa` (bytes/s por conexão, 0 = sem limite) podem ser definidos
+    por requisição ou, por padrão, na criação do servidor. Os contadores permitem medir o
+    tempo até o primeiro byte e o volume transferido em cada cenário.
+    """
+
+    def __init__(self, tamanho=256 * 1024, taxa=0, atraso_api=0.0, host='127.0.0.1', porta=0):
+        self.tamanho = tamanho
+        self.taxa = taxa
+        self.atraso_api = atraso_api # Latência simulada das respostas JSON (s)
+        self.requisicoes_midia = 0
+        self.bytes_enviados = 0
+        self.primeiro_byte_em = None # time.monotonic() do primeiro byte de mídia enviado
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, porta), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.midia = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, porta = self._httpd.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def url_video(self, video_id):
+        return f"{self.base_url}/video/{video_id}"
+
+    def url_playlist(self, n):
+        return f"{self.base_url}/playlist/{n}"
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    def zerar_contadores(self):
+        with self._lock:
+            self.requisicoes_midia = 0
+            self.bytes_enviados = 0
+            self.primeiro_byte_em = None
+
+    def registrar_primeiro_byte(self):
+        with self._lock:
+            self.requisicoes_midia += 1
+            if self.primeiro_byte_em is None:
+                self.primeiro_byte_em = time.monotonic()
+
+    def registrar_envio(self, n):
+        with self._lock:
+            self.bytes_enviados += n
+
+    def info_video(self, video_id):
+        if self.atraso_api:
+            time.sleep(self.atraso_api)
+        return {'id': video_id, 'title': f"Video {video_id}", 'tamanho': self.tamanho,
+                'midia': f"{self.base_url}/midia/{video_id}.wav?tamanho={self.tamanho}&taxa={self.taxa}"}
+
+    def pagina_playlist(self, n, pagina):
+        if self.atraso_api:
+            time.sleep(self.atraso_api)
+        inicio = pagina * ENTRADAS_POR_PAGINA
+        fim = min(inicio + ENTRADAS_POR_PAGINA, n)
+        return {'titulo': f"Playlist {n}", 'total': n, 'proxima': fim < n,
+                'entradas': [{'id': f"b{n}x{i:07d}", 'title': f"Video {i}"} for i in range(inicio, fim)]}
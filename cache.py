@@ -0,0 +1,121 @@
+# YouTube MP3 Downloader PRO - Cache em disco dos resultados do extract_info
+
+# --------------------------------------------------------------------------------------------------
+# 1. Importações de Módulos
+# --------------------------------------------------------------------------------------------------
+import json
+import sqlite3
+import threading
+import time
+
+# --------------------------------------------------------------------------------------------------
+# 2. Configurações Globais
+# --------------------------------------------------------------------------------------------------
+# Chaves volumosas dos resultados do yt-dlp que o aplicativo não usa e não vale a pena guardar
+CHAVES_DESCARTADAS = ('automatic_captions', 'subtitles', 'thumbnails', 'heatmap')
+
+# --------------------------------------------------------------------------------------------------
+# 3. Cache de Metadados
+# --------------------------------------------------------------------------------------------------
+class MetadataCache:
+    """Cache persistente de metadados (JSON) com validade (TTL) e limite de tamanho (LRU).
+
+    As entradas expiram `ttl` segundos depois de gravadas (o valor pode ser sobrescrito
+    por entrada). Quando o total ultrapassa `max_bytes`, as entradas acessadas há mais
+    tempo são removidas. Os contadores `hits` e `misses` medem a eficácia do cache.
+    """
+
+    def __init__(self, path, ttl=1800, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                chave TEXT PRIMARY KEY,
+                dados TEXT NOT NULL,
+                expira_em REAL NOT NULL,
+                acessado_em REAL NOT NULL,
+                tamanho INTEGER NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_acesso ON cache(acessado_em)")
+        self._conn.execute("DELETE FROM cache WHERE expira_em <= ?", (time.time(),))
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(tamanho), 0) FROM cache").fetchone()[0]
+
+    def obter(self, chave):
+        """Retorna os dados guardados em `chave` (uma cópia nova a cada chamada), ou None."""
+        agora = time.time()
+        with self._lock:
+            linha = self._conn.execute("SELECT dados, expira_em, tamanho FROM cache WHERE chave = ?",
+                                       (chave,)).fetchone()
+            if linha is None:
+                self.misses += 1
+                return None
+            dados, expira_em, tamanho = linha
+            if expira_em <= agora:
+                self._conn.execute("DELETE FROM cache WHERE chave = ?", (chave,))
+                self._total_bytes -= tamanho
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE cache SET acessado_em = ? WHERE chave = ?", (agora, chave))
+            self.hits += 1
+        return json.loads(dados)
+
+    def guardar(self, chave, dados, ttl=None):
+        """Guarda `dados` (serializáveis em JSON) em `chave`. Retorna False se não for possível."""
+        if isinstance(dados, dict):
+            dados = {k: v for k, v in dados.items() if k not in CHAVES_DESCARTADAS}
+        try:
+            texto = json.dumps(dados, ensure_ascii=False)
+        except (TypeError, ValueError):
+            return False
+        tamanho = len(texto.encode('utf-8'))
+        if tamanho > self.max_bytes:
+            return False
+        agora = time.time()
+        with self._lock:
+            anterior = self._conn.execute("SELECT tamanho FROM cache WHERE chave = ?", (chave,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (chave, dados, expira_em, acessado_em, tamanho) VALUES (?, ?, ?, ?, ?)",
+                (chave, texto, agora + (self.ttl if ttl is None else ttl), agora, tamanho))
+            self._total_bytes += tamanho - (anterior[0] if anterior else 0)
+            if self._total_bytes > self.max_bytes:
+                self._despejar()
+        return True
+
+    def _despejar(self):
+        """Remove as entradas menos usadas até o total ficar abaixo de 90% do limite."""
+        alvo = self.max_bytes * 0.9
+        self._conn.execute("BEGIN")
+        for chave, tamanho in self._conn.execute(
+                "SELECT chave, tamanho FROM cache ORDER BY acessado_em").fetchall():
+            if self._total_bytes <= alvo:
+                break
+            self._conn.execute("DELETE FROM cache WHERE chave = ?", (chave,))
+            self._total_bytes -= tamanho
+        self._conn.execute("COMMIT")
+
+    def invalidar(self, chave):
+        """Remove uma entrada (por exemplo, quando as URLs de mídia guardadas expiraram)."""
+        with self._lock:
+            linha = self._conn.execute("SELECT tamanho FROM cache WHERE chave = ?", (chave,)).fetchone()
+            if linha:
+                self._conn.execute("DELETE FROM cache WHERE chave = ?", (chave,))
+                self._total_bytes -= linha[0]
+
+    def estatisticas(self):
+        """Retorna os contadores de acerto/erro e a ocupação atual do cache."""
+        with self._lock:
+            entradas = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            return {'hits': self.hits, 'misses': self.misses, 'entradas': entradas, 'bytes': self._total_bytes}
+
+    def fechar(self):
+        """Fecha a conexão com o banco de dados."""
+        with self._lock:
+            self._conn.close()
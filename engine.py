@@ -0,0 +1,1674 @@
+# YouTube MP3 Downloader PRO - Motor de Downloads (independente da interface)
+
+# --------------------------------------------------------------------------------------------------
+# 1. Importações de Módulos
+# --------------------------------------------------------------------------------------------------
+import os
+import re
+import sys
+import json
+import itertools
+import concurrent.futures
+import contextlib
+import glob
+import shutil
+import time
+import threading
+
+from archive import extrair_video_id
+from armazenamento import (FATOR_TRABALHO, PARAM_ESPACO, EspacoInsuficiente, MovedorArquivos, ReservaEspaco,
+                           VerificadorEspaco, limpar_movendo)
+from banda import LimitadorBanda
+from fila import (FilaIndexada, FilaItem, STATUS_PENDENTE, STATUS_BAIXANDO, STATUS_CONVERTENDO, STATUS_MOVENDO,
+                  STATUS_CONCLUIDO, STATUS_ERRO, STATUS_IGNORADO, STATUS_CANCELADO, STATUS_PAUSADO,
+                  STATUS_RETENTATIVA, STATUS_AGUARDANDO)
+from importacao import ENTRADA_VIDEO, IMPORTACAO_LOTE, entradas_importadas
+from faixas import PARAM_DIVIDIR, DivisorFaixas, LimiteConexoes, registrar_protocolo
+from retentativa import ERRO_TRANSITORIO, DisjuntorFalhas, atraso_backoff, classificar_erro
+
+# --------------------------------------------------------------------------------------------------
+# 2. Configurações Globais
+# --------------------------------------------------------------------------------------------------
+CONFIG_PATH = 'config.json'
+DEFAULT_FOLDER = 'downloads_mp3' # Pasta padrão para downloads
+
+# Determina o caminho base da aplicação para encontrar recursos (ícones, config.json)
+# Funciona tanto em modo de desenvolvimento quanto em executável PyInstaller
+if getattr(sys, 'frozen', False):
+    # Se estiver rodando como executável PyInstaller
+    APPLICATION_BASE_PATH = sys._MEIPASS
+else:
+    # Se estiver rodando como script Python
+    APPLICATION_BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+
+CONFIG_FULL_PATH = os.path.join(APPLICATION_BASE_PATH, CONFIG_PATH)
+FFMPEG_PATH = os.path.join(APPLICATION_BASE_PATH, 'bin', 'ffmpeg.exe')
+FFPROBE_PATH = os.path.join(APPLICATION_BASE_PATH, 'bin', 'ffprobe.exe')
+JOURNAL_FULL_PATH = os.path.join(APPLICATION_BASE_PATH, 'fila.db') # Diário persistente da fila
+ARCHIVE_FULL_PATH = os.path.join(APPLICATION_BASE_PATH, 'arquivo.db') # Índice de downloads concluídos
+CACHE_FULL_PATH = os.path.join(APPLICATION_BASE_PATH, 'metadados.db') # Cache de resultados do extract_info
+METRICAS_FULL_PATH = os.path.join(APPLICATION_BASE_PATH, 'metricas.jsonl') # Tempos por fase de cada item
+
+# Entradas de playlist são enviadas à fila em lotes deste tamanho, ou a cada intervalo (s)
+PLAYLIST_LOTE_TAMANHO = 50
+PLAYLIST_LOTE_INTERVALO = 0.5
+
+# Arquivo-fonte de um job com vários alvos ("Título [fonte-<id>].mp4"); apagado depois das conversões
+SUFIXO_FONTE = " [fonte-%(id)s]"
+_SUFIXO_FONTE_RE = re.compile(r' \[fonte-[^\]]*\]$')
+
+# Limites para o número de downloads simultâneos da fila
+MIN_WORKERS = 1
+MAX_WORKERS = 16
+
+DEFAULT_CONFIG = {
+    'pasta': os.path.join(APPLICATION_BASE_PATH, DEFAULT_FOLDER),
+    'qualidade': "192kbps",
+    'formato_tipo': "MP3",
+    'downloads_simultaneos': 3,
+    'cache_ttl_video': 1800, # As URLs de mídia do YouTube expiram em algumas horas
+    'cache_ttl_playlist': 6 * 3600,
+    'cache_max_mb': 64,
+    'pipeline_conversao': True, # Conversões do FFmpeg em um pool de processos separado dos downloads
+    'metricas_log': True, # Grava os tempos por fase de cada item em metricas.jsonl
+    'metricas_prometheus': "", # Caminho do textfile do Prometheus (vazio = desativado)
+    'retentativas_max': 4, # Novas tentativas de um item após falhas transitórias (429, 403, rede)
+    'retentativa_base_s': 2.0, # Espera antes da primeira nova tentativa; dobra a cada falha
+    'retentativa_max_s': 120.0,
+    'conexoes_por_item': 4, # Conexões paralelas (faixas de bytes) por arquivo baixado; 1 desativa
+    'conexoes_max': 16, # Total de conexões somando todos os downloads simultâneos
+    'limite_banda_kbs': 0, # Banda total dos downloads, em KB/s (0 = sem limite); pode mudar a qualquer momento
+    'banda_peso_prioritario': 2, # Fatia da banda dos itens movidos para o topo, em relação aos demais
+    'pasta_temporaria': "", # Pasta local onde os downloads e conversões acontecem (vazio = direto no destino)
+    'espaco_livre_min_mb': 512, # Espaço sempre deixado livre nos discos de trabalho e de destino
+    'servico_host': "127.0.0.1", # Endereço da API do modo serviço (--servico); a GUI se conecta a ele se estiver no ar
+    'servico_porta': 8765,
+}
+
+# --------------------------------------------------------------------------------------------------
+# 3. Funções Auxiliares
+# --------------------------------------------------------------------------------------------------
+_yt_dlp = None
+_yt_dlp_lock = threading.Lock()
+
+def carregar_yt_dlp():
+    """Importa o yt-dlp na primeira chamada e retorna o módulo.
+
+    A importação carrega os extratores e leva uma fração de segundo (mais no executável
+    do PyInstaller), por isso fica fora da abertura da janela. Chamadas concorrentes
+    esperam a primeira terminar.
+    """
+    global _yt_dlp
+    if _yt_dlp is None:
+        with _yt_dlp_lock:
+            if _yt_dlp is None:
+                import yt_dlp
+                registrar_protocolo(yt_dlp) # Downloads em faixas de bytes (ver faixas.py)
+                _yt_dlp = yt_dlp
+    return _yt_dlp
+
+def carregar_config():
+    """Carrega as configurações do config.json, usando os valores padrão para chaves ausentes."""
+    config = dict(DEFAULT_CONFIG)
+    try:
+        if os.path.exists(CONFIG_FULL_PATH):
+            with open(CONFIG_FULL_PATH, 'r') as f:
+                config.update(json.load(f))
+    except (json.JSONDecodeError, FileNotFoundError):
+        # Se o arquivo de configuração estiver corrompido ou não for encontrado, usa os valores padrão
+        pass
+    return config
+
+def salvar_config(config):
+    """Salva as configurações em config.json. Erros de escrita são propagados ao chamador."""
+    with open(CONFIG_FULL_PATH, 'w') as f:
+        json.dump(config, f, indent=4)
+
+def clamp_workers(value, default=DEFAULT_CONFIG['downloads_simultaneos']):
+    """Garante que o número de downloads simultâneos fique entre MIN_WORKERS e MAX_WORKERS."""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        value = default
+    return max(MIN_WORKERS, min(MAX_WORKERS, value))
+
+def get_quality_options_for_format(format_type):
+    """Retorna a lista de opções de qualidade com base no tipo de formato."""
+    if format_type == "MP3":
+        return ["128kbps", "192kbps", "256kbps", "320kbps"]
+    elif format_type == "MP4":
+        return ["360p", "480p", "720p", "1080p"]
+    return []
+
+def default_quality_for_format(format_type):
+    """Retorna a qualidade padrão de cada formato."""
+    return "192kbps" if format_type == "MP3" else "720p"
+
+def sanitize_filename(filename):
+    """Remove caracteres inválidos de um nome de arquivo."""
+    filename = re.sub(r'[<>:"/\\|?*]', '', filename)
+    filename = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', filename)
+    filename = re.sub(r'\s+', '_', filename).strip()
+    filename = re.sub(r'_+', '_', filename)
+    return filename
+
+def format_bytes(bytes_val):
+    """Formata bytes para KB/MB/GB."""
+    if bytes_val is None:
+        return "N/A"
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if bytes_val < 1024.0:
+            return f"{bytes_val:.1f}{unit}"
+        bytes_val /= 1024.0
+    return f"{bytes_val:.1f}TB"
+
+def format_eta(seconds):
+    """Formata segundos para HH:MM:SS."""
+    if seconds is None:
+        return "N/A"
+    m, s = divmod(int(seconds), 60)
+    h, m = divmod(m, 60)
+    return f"{h:02d}:{m:02d}:{s:02d}"
+
+def build_ydl_opts(format_type, quality, download_folder, progress_hooks=(), pos_processar=True,
+                   ignorar_erros=True):
+    """Monta o dicionário de opções do yt-dlp para o formato e a qualidade escolhidos.
+
+    Com `pos_processar=False` as etapas do FFmpeg (extração de áudio, remux, metadados)
+    ficam de fora e apenas o fluxo bruto é baixado; elas continuam disponíveis em
+    `postprocessors_para` para serem executadas em outro lugar. Com `ignorar_erros=False`
+    as falhas levantam DownloadError (com a exceção original), em vez de só retornar None.
+    """
+    ydl_opts = {
+        'outtmpl': os.path.join(download_folder, '%(title)s.%(ext)s'),
+        'no_color': True,
+        'ignoreerrors': ignorar_erros,
+        'quiet': True,
+        'no_warnings': True,
+        'progress_hooks': list(progress_hooks),
+        'extract_flat': True, # Para playlists, para extrair URLs sem baixar imediatamente
+        'continuedl': True, # Downloads interrompidos (pausa) continuam do .part com requisições Range
+        'nopart': False,
+    }
+
+    # Configura o caminho do FFmpeg se existir na pasta bin/
+    if os.path.exists(FFMPEG_PATH):
+        ydl_opts['ffmpeg_location'] = os.path.dirname(FFMPEG_PATH)
+
+    if format_type == "MP3":
+        ydl_opts['format'] = 'bestaudio/best'
+    elif format_type == "MP4":
+        resolution_map = {
+            "360p": "bestvideo[height<=360][ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
+            "480p": "bestvideo[height<=480][ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
+            "720p": "bestvideo[height<=720][ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
+            "1080p": "bestvideo[height<=1080][ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
+        }
+        ydl_opts['format'] = resolution_map.get(quality, "best[ext=mp4]/best") # Padrão para melhor MP4 se não mapeado
+    if pos_processar:
+        ydl_opts['postprocessors'] = postprocessors_para(format_type, quality)
+    return ydl_opts
+
+def postprocessors_para(format_type, quality):
+    """Etapas de pós-processamento (FFmpeg) do yt-dlp para o formato e a qualidade escolhidos."""
+    if format_type == "MP3":
+        preferred_quality_audio = quality.replace("kbps", "")
+        return [
+            {
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': 'mp3',
+                'preferredquality': preferred_quality_audio
+            },
+            {'key': 'FFmpegMetadata'} # Grava a URL do vídeo nas tags, usada para reconstruir o índice
+        ]
+    elif format_type == "MP4":
+        return [
+            {'key': 'FFmpegVideoRemuxer', 'preferedformat': 'mp4'},
+            {'key': 'FFmpegMetadata'}
+        ]
+    return []
+
+def remover_arquivos_parciais(arquivos):
+    """Apaga os arquivos .part de um download abandonado (e o .ytdl e as faixas dos downloads em fragmentos)."""
+    for parcial in arquivos:
+        if not parcial.endswith('.part'):
+            continue
+        faixas = glob.glob(glob.escape(parcial) + '-Frag*')
+        for caminho in [parcial, parcial[:-len('.part')] + '.ytdl', *faixas]:
+            with contextlib.suppress(OSError):
+                os.remove(caminho)
+
+def parcial_sem_faixas(arquivos):
+    """True se algum .part foi baixado por uma conexão só (sem .ytdl) e precisa continuar assim."""
+    return any(parcial.endswith('.part') and os.path.exists(parcial)
+               and not os.path.exists(parcial[:-len('.part')] + '.ytdl') for parcial in arquivos)
+
+# Instâncias do YoutubeDL de cada processo do pool de conversão, por (etapas, localização do FFmpeg)
+_ydl_conversao = {}
+
+def _ydl_do_processo(postprocessors=(), ffmpeg_location=None):
+    """YoutubeDL reaproveitado por todas as conversões de um processo do pool.
+
+    Criar a instância (e as etapas do FFmpeg) custa dezenas de milissegundos, mais do que
+    converter um arquivo pequeno; como em YdlPool, cada configuração é criada uma única vez.
+    """
+    chave = (json.dumps(postprocessors, sort_keys=True), ffmpeg_location)
+    ydl = _ydl_conversao.get(chave)
+    if ydl is None:
+        opts = {'quiet': True, 'no_warnings': True, 'no_color': True, 'postprocessors': list(postprocessors)}
+        if ffmpeg_location:
+            opts['ffmpeg_location'] = ffmpeg_location
+        ydl = _ydl_conversao[chave] = carregar_yt_dlp().YoutubeDL(opts)
+    return ydl
+
+def pos_processar(filepath, info, postprocessors, ffmpeg_location=None):
+    """Executa as etapas do FFmpeg sobre um arquivo já baixado. Retorna o caminho final.
+
+    Roda nos processos do pool de conversão, por isso recebe apenas dados serializáveis
+    (o `info` deve ter passado por `YoutubeDL.sanitize_info`).
+    """
+    info = _ydl_do_processo(postprocessors, ffmpeg_location).post_process(filepath, info)
+    return info.get('filepath') or filepath
+
+def pos_processar_cronometrado(filepath, info, postprocessors, ffmpeg_location=None):
+    """`pos_processar` que também retorna quando a conversão começou e terminou (time.time())."""
+    inicio = time.time()
+    caminho = pos_processar(filepath, info, postprocessors, ffmpeg_location)
+    return caminho, inicio, time.time()
+
+def altura_da_qualidade(quality):
+    """Altura em pixels de uma qualidade de vídeo ("720p" -> 720)."""
+    return int(quality.rstrip('p'))
+
+def normalizar_alvos(alvos):
+    """Lista de (formato, qualidade) sem repetições, na ordem informada; None se vazia."""
+    resultado = []
+    for formato, qualidade in alvos or ():
+        alvo = (formato.upper(), qualidade)
+        if qualidade not in get_quality_options_for_format(alvo[0]):
+            raise ValueError(f"Qualidade inválida para {alvo[0]}: {qualidade}")
+        if alvo not in resultado:
+            resultado.append(alvo)
+    return resultado or None
+
+def fonte_para_alvos(alvos):
+    """(formato, qualidade) do único download que serve a todos os alvos de um job.
+
+    Com algum alvo MP4, baixa o vídeo na maior resolução pedida (o áudio dos MP3 sai do
+    mesmo arquivo); só com alvos MP3, baixa apenas o melhor áudio.
+    """
+    resolucoes = [qualidade for formato, qualidade in alvos if formato == "MP4"]
+    if resolucoes:
+        return "MP4", max(resolucoes, key=altura_da_qualidade)
+    return "MP3", None # A qualidade do MP3 só importa na conversão
+
+_ffmpeg_do_processo = {} # FFmpegPostProcessor por localização do FFmpeg (a versão é detectada uma vez)
+
+def _ffmpeg(ffmpeg_location, argumentos_saida, origem, destino):
+    """Executa o FFmpeg pelo yt-dlp (mesma localização e tratamento de erros das etapas padrão)."""
+    ffmpeg = _ffmpeg_do_processo.get(ffmpeg_location)
+    if ffmpeg is None:
+        ydl = _ydl_do_processo(ffmpeg_location=ffmpeg_location)
+        ffmpeg = _ffmpeg_do_processo[ffmpeg_location] = carregar_yt_dlp().postprocessor.FFmpegPostProcessor(ydl)
+    ffmpeg.run_ffmpeg(origem, destino, argumentos_saida)
+
+def transcodificar_alvo(fonte, info, format_type, quality, ffmpeg_location=None):
+    """Produz uma saída (formato, qualidade) a partir do arquivo-fonte de um job com vários alvos.
+
+    Roda no pool de conversão, em paralelo com os outros alvos do mesmo job. Cada alvo
+    trabalha em uma cópia própria da fonte ("Título [MP3 320kbps].mp4", um hard link quando
+    possível), que as etapas padrão do FFmpeg convertem e apagam; vídeos acima da
+    resolução pedida são redimensionados antes. Retorna (caminho, início, fim).
+    """
+    inicio = time.time()
+    base, ext = os.path.splitext(fonte)
+    base = _SUFIXO_FONTE_RE.sub('', base)
+    destino = f"{base} [{format_type} {quality}]{ext}"
+    with contextlib.suppress(OSError):
+        os.remove(destino) # Sobra de uma execução interrompida
+    altura = info.get('height')
+    if format_type == "MP4" and altura and altura > altura_da_qualidade(quality):
+        _ffmpeg(ffmpeg_location, ['-vf', f'scale=-2:{altura_da_qualidade(quality)}', '-c:v', 'libx264',
+                                  '-preset', 'veryfast', '-c:a', 'copy'], fonte, destino)
+    else:
+        try:
+            os.link(fonte, destino)
+        except OSError:
+            shutil.copyfile(fonte, destino)
+    info = dict(info, filepath=destino, ext=ext[1:])
+    caminho = pos_processar(destino, info, postprocessors_para(format_type, quality), ffmpeg_location)
+    return caminho, inicio, time.time()
+
+def caminho_baixado(info):
+    """Caminho do arquivo produzido pelo yt-dlp para um resultado de download (ou None)."""
+    downloads = info.get('requested_downloads') or [info]
+    return downloads[-1].get('filepath') or downloads[-1].get('_filename')
+
+# --------------------------------------------------------------------------------------------------
+# 4. Pool de Instâncias do yt-dlp
+# --------------------------------------------------------------------------------------------------
+class _YdlReutilizavel:
+    """Uma instância de YoutubeDL de longa duração, emprestada a um download por vez.
+
+    Os hooks registrados no yt-dlp (de progresso e de pós-processamento) são fixos e
+    repassam cada chamada para os hooks do download atual, trocados a cada empréstimo.
+    """
+
+    def __init__(self, chave, geracao, ydl_opts):
+        self.chave = chave
+        self.geracao = geracao
+        self.hook = None
+        self.hook_pos = None
+        ydl_opts = dict(ydl_opts)
+        ydl_opts['progress_hooks'] = [self._despachar]
+        ydl_opts['postprocessor_hooks'] = [self._despachar_pos]
+        self.ydl = carregar_yt_dlp().YoutubeDL(ydl_opts)
+        self.ydl.add_post_processor(DivisorFaixas(), when='before_dl') # Só age com PARAM_DIVIDIR
+        self.ydl.add_post_processor(VerificadorEspaco(), when='before_dl') # Só age com PARAM_ESPACO
+
+    def _despachar(self, d):
+        if self.hook is not None:
+            self.hook(d)
+
+    def _despachar_pos(self, d):
+        if self.hook_pos is not None:
+            self.hook_pos(d)
+
+    def fechar(self):
+        try:
+            self.ydl.__exit__(None, None, None) # Salva cookies e fecha as conexões HTTP
+        except Exception:
+            pass
+
+class YdlPool:
+    """Mantém instâncias de YoutubeDL reutilizáveis, agrupadas por configuração.
+
+    Reaproveitar a instância evita, a cada item, montar as opções, inicializar os
+    extratores e abrir novas conexões TLS. Como o YoutubeDL não é thread-safe, cada
+    instância é usada por um único worker por vez; instâncias ociosas ficam guardadas
+    por chave (formato, qualidade, pasta) até `invalidar` ser chamado.
+    """
+
+    def __init__(self, max_ociosas_por_chave=MAX_WORKERS):
+        self._lock = threading.Lock()
+        self._ociosas = {} # chave -> lista de _YdlReutilizavel
+        self._geracao = 0 # Incrementada por invalidar(); instâncias antigas são fechadas ao voltar
+        self.max_ociosas_por_chave = max_ociosas_por_chave
+        self.criadas = 0
+        self.reutilizadas = 0
+
+    @contextlib.contextmanager
+    def emprestar(self, chave, fabrica_opts, hook, hook_pos=None):
+        """Empresta uma instância para `chave`, criando-a com `fabrica_opts()` se necessário."""
+        with self._lock:
+            ociosas = self._ociosas.get(chave)
+            instancia = ociosas.pop() if ociosas else None
+            geracao = self._geracao
+            if instancia is not None:
+                self.reutilizadas += 1
+        if instancia is None:
+            instancia = _YdlReutilizavel(chave, geracao, fabrica_opts())
+            with self._lock:
+                self.criadas += 1
+        instancia.hook = hook
+        instancia.hook_pos = hook_pos
+        try:
+            yield instancia.ydl
+        finally:
+            instancia.hook = None
+            instancia.hook_pos = None
+            self._devolver(instancia)
+
+    def _devolver(self, instancia):
+        with self._lock:
+            ociosas = self._ociosas.setdefault(instancia.chave, [])
+            if instancia.geracao == self._geracao and len(ociosas) < self.max_ociosas_por_chave:
+                ociosas.append(instancia)
+                return
+        instancia.fechar()
+
+    def invalidar(self):
+        """Descarta todas as instâncias (as emprestadas são fechadas quando voltarem)."""
+        with self._lock:
+            self._geracao += 1
+            descartadas = [inst for ociosas in self._ociosas.values() for inst in ociosas]
+            self._ociosas.clear()
+        for instancia in descartadas:
+            instancia.fechar()
+
+# --------------------------------------------------------------------------------------------------
+# 5. Motor de Downloads
+# --------------------------------------------------------------------------------------------------
+class DownloadEngine:
+    """Mantém a fila, executa os workers de download e publica eventos de progresso.
+
+    O motor não conhece a interface: quem quiser acompanhar os downloads registra um
+    callback com `subscribe`. Os eventos são dicionários com a chave 'tipo' e são
+    emitidos a partir das threads dos workers; clientes com GUI devem repassá-los à
+    thread da interface (por exemplo com `root.after`).
+
+    O progresso dos downloads não gera eventos: os hooks do yt-dlp apenas gravam o
+    estado mais recente de cada download em um snapshot compartilhado, que os clientes
+    consultam no ritmo que quiserem com `progresso_atual`.
+
+    Tipos de evento:
+        'itens_adicionados' -> itens
+        'item_status'       -> item (status mudou para Baixando/Convertendo/Pausado/Concluído/Erro/Cancelado)
+        'item_removido'     -> item
+        'item_movido'       -> item (passou para o topo da fila)
+        'download_unico'    -> status ('finished' ou 'error'), erro (download fora da fila)
+        'fila_limpa'        -> removidos
+        'fila_restaurada'   -> itens (carregados do diário ao iniciar)
+        'playlist_progresso'-> url, lote, encontrados, enfileirados, ja_baixados, concluida
+        'importacao_progresso' -> lidas, enfileirados, duplicados, descartados, invalidas, analisados, erros, concluida
+        'fila_concluida'    -> pausado (True se os workers pararam por pausa)
+        'retentativa'       -> item, tentativa, atraso (s), mensagem (falha transitória reagendada)
+        'disjuntor'         -> acao ('reduzir'/'pausar'/'restaurar'/'religar'), limite, pausa, taxa, mensagem
+        'erro'              -> item (opcional), mensagem
+    """
+
+    def __init__(self, download_folder=None, format_type=None, quality=None, max_workers=None,
+                 journal=None, archive=None, cache=None, cache_ttl_playlist=None,
+                 pipeline_conversao=True, max_conversoes=None, metricas=None, max_tentativas=None,
+                 backoff_base=None, backoff_max=None, conexoes_por_item=None, conexoes_max=None,
+                 limite_banda_kbs=None, peso_prioritario=None, pasta_temporaria=None, espaco_livre_min_mb=None):
+        self.fila = FilaIndexada() # Fila de prioridade dos itens (FilaItem), indexada pelo id
+        self.fila_lock = threading.Lock() # Protege a fila contra acesso concorrente dos workers
+        self.workers_ativos = 0 # Número de threads de download em execução
+        self.em_processamento = False # Flag para indicar se há workers ativos
+        self.pausado = False # Flag para pausar/retomar a fila
+        self._ids = itertools.count(1)
+        self._listeners = []
+        self._ocioso = threading.Event() # Sinalizado quando nenhum worker está ativo
+        self._ocioso.set()
+        self._ativos = {} # id -> item dos downloads em andamento
+        self._progresso = {} # id -> último estado de progresso (None = download avulso)
+        self._progresso_versao = 0 # Incrementado a cada escrita no snapshot de progresso
+        self._progresso_lock = threading.Lock()
+        self.journal = journal # FilaJournal opcional; sem ele a fila existe apenas em memória
+        self.archive = archive # DownloadArchive opcional; itens já baixados são ignorados
+        self.cache = cache # MetadataCache opcional para os resultados do extract_info
+        self.cache_ttl_playlist = cache_ttl_playlist
+        self.metricas = metricas # RegistroMetricas opcional; recebe os tempos por fase de cada item
+        self.ydl_pool = YdlPool() # Instâncias do yt-dlp reaproveitadas entre os itens
+        # Cada arquivo grande é baixado em faixas de bytes por várias conexões, dentro de um total global
+        self.conexoes = LimiteConexoes(conexoes_por_item or DEFAULT_CONFIG['conexoes_por_item'],
+                                       conexoes_max or DEFAULT_CONFIG['conexoes_max'])
+        # Limite global de banda, dividido entre os downloads ativos na proporção dos pesos
+        self.limite_banda_kbs = 0
+        self.banda = LimitadorBanda()
+        self.peso_prioritario = peso_prioritario or DEFAULT_CONFIG['banda_peso_prioritario']
+        self.definir_limite_banda(limite_banda_kbs if limite_banda_kbs is not None
+                                  else DEFAULT_CONFIG['limite_banda_kbs'])
+
+        # Falhas transitórias voltam à fila com backoff; o disjuntor desacelera a fila se elas dispararem
+        self.max_tentativas = (max_tentativas if max_tentativas is not None
+                               else DEFAULT_CONFIG['retentativas_max'])
+        self.backoff_base = backoff_base or DEFAULT_CONFIG['retentativa_base_s']
+        self.backoff_max = backoff_max or DEFAULT_CONFIG['retentativa_max_s']
+        self.disjuntor = DisjuntorFalhas()
+        self.pausado_pelo_disjuntor = False # Pausa automática; o motor se religa sozinho
+        self._retentativas_agendadas = 0 # Itens esperando o backoff (contam como trabalho pendente)
+        self._timer_disjuntor = None
+
+        # Pipeline de duas etapas: os workers só baixam; o FFmpeg roda em um pool de processos
+        self.pipeline_conversao = pipeline_conversao
+        self.max_conversoes = max_conversoes or os.cpu_count() or 1
+        self._conversor = None # ProcessPoolExecutor, criado no primeiro uso
+        # Fila de passagem limitada: um worker espera se já houver muitos arquivos aguardando conversão
+        self._vagas_conversao = threading.BoundedSemaphore(2 * self.max_conversoes)
+        self._conversoes_pendentes = 0
+
+        self.download_folder = download_folder or DEFAULT_CONFIG['pasta']
+        self.format_type = format_type or DEFAULT_CONFIG['formato_tipo']
+        self.quality = quality or default_quality_for_format(self.format_type)
+        self.max_workers = clamp_workers(max_workers if max_workers is not None
+                                         else DEFAULT_CONFIG['downloads_simultaneos'])
+        os.makedirs(self.download_folder, exist_ok=True) # Garante que a pasta exista
+
+        # Com uma pasta temporária (disco local), .part, faixas e saídas do FFmpeg ficam nela; só o
+        # arquivo pronto vai para o destino (um compartilhamento de rede, por exemplo), em segundo plano
+        self.pasta_temporaria = (pasta_temporaria if pasta_temporaria is not None
+                                 else DEFAULT_CONFIG['pasta_temporaria']) or None
+        self.movedor = MovedorArquivos()
+        self._movimentos_pendentes = 0
+        if self.pasta_temporaria:
+            os.makedirs(self.pasta_temporaria, exist_ok=True)
+            limpar_movendo(self.download_folder) # Cópias interrompidas por um fechamento à força
+        self.espaco = ReservaEspaco((espaco_livre_min_mb if espaco_livre_min_mb is not None
+                                     else DEFAULT_CONFIG['espaco_livre_min_mb']) * 1024 * 1024)
+
+    # ---------------------------------------------------------------- Eventos
+    def subscribe(self, callback):
+        """Registra um callback que recebe todos os eventos do motor."""
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        """Remove um callback registrado com `subscribe`."""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _emit(self, tipo, **dados):
+        evento = {'tipo': tipo, **dados}
+        for callback in list(self._listeners):
+            try:
+                callback(evento)
+            except Exception:
+                # Um listener com problema não pode derrubar os workers
+                pass
+
+    # ---------------------------------------------------------------- Configuração
+    def configure(self, format_type=None, quality=None, download_folder=None, max_workers=None):
+        """Atualiza as opções de download. Vale para os próximos itens iniciados."""
+        chave_anterior = self._chave_opts()
+        if format_type is not None:
+            self.format_type = format_type
+        if quality is not None:
+            self.quality = quality
+        if download_folder is not None:
+            self.download_folder = download_folder
+            os.makedirs(self.download_folder, exist_ok=True)
+        if self._chave_opts() != chave_anterior:
+            self.ydl_pool.invalidar() # As instâncias com as opções antigas não serão mais usadas
+        if max_workers is not None:
+            self.max_workers = clamp_workers(max_workers)
+            if self.em_processamento and not self.pausado:
+                self.iniciar() # Inicia workers adicionais se o limite aumentou
+
+    def definir_limite_banda(self, kbs):
+        """Muda o limite global de banda (KB/s; 0 = sem limite). Vale na hora, inclusive para os downloads em andamento."""
+        try:
+            kbs = max(0, int(kbs))
+        except (TypeError, ValueError):
+            kbs = 0
+        self.limite_banda_kbs = kbs
+        self.banda.definir_taxa(kbs * 1024)
+
+    def config_dict(self):
+        """Retorna as configurações atuais no formato do config.json."""
+        return {
+            'pasta': self.download_folder,
+            'qualidade': self.quality,
+            'formato_tipo': self.format_type,
+            'downloads_simultaneos': self.max_workers,
+            'limite_banda_kbs': self.limite_banda_kbs,
+        }
+
+    @property
+    def pasta_trabalho(self):
+        """Onde o yt-dlp e o FFmpeg gravam: a pasta temporária, se houver, ou a própria pasta de destino."""
+        return self.pasta_temporaria or self.download_folder
+
+    def build_ydl_opts(self, progress_hooks=(), pos_processar=True, ignorar_erros=True):
+        """Opções do yt-dlp para as configurações atuais do motor."""
+        return build_ydl_opts(self.format_type, self.quality, self.pasta_trabalho, progress_hooks,
+                              pos_processar, ignorar_erros)
+
+    def _chave_opts(self, pos_processar=True, ignorar_erros=True):
+        """Identifica as configurações que determinam as opções do yt-dlp (chave do pool)."""
+        return (self.format_type, self.quality, self.pasta_trabalho, pos_processar, ignorar_erros)
+
+    def _opts_fila(self):
+        """(chave do pool, fábrica de opções) das instâncias usadas pelos workers da fila.
+
+        Os itens da fila não ignoram erros: a exceção original é necessária para decidir
+        entre uma nova tentativa e um erro definitivo.
+        """
+        pos = not self.pipeline_conversao
+        return self._chave_opts(pos, False), lambda: self.build_ydl_opts(pos_processar=pos, ignorar_erros=False)
+
+    def _opts_fonte(self, alvos):
+        """(chave do pool, fábrica de opções) do download único de um job com vários alvos."""
+        formato, qualidade = fonte_para_alvos(alvos)
+        pasta = self.pasta_trabalho
+
+        def fabrica_opts():
+            opts = build_ydl_opts(formato, qualidade, pasta, pos_processar=False, ignorar_erros=False)
+            opts['outtmpl'] = os.path.join(pasta, '%(title)s' + SUFIXO_FONTE + '.%(ext)s')
+            return opts
+        return ('fonte', formato, qualidade, pasta), fabrica_opts
+
+    @contextlib.contextmanager
+    def _emprestar(self, chave, fabrica_opts, hook, hook_pos=None, arquivos_parciais=(), chave_banda=None,
+                   saidas=1):
+        """Empresta uma instância do pool com as conexões paralelas reservadas para um download.
+
+        As conexões são reservadas no início e devolvidas no fim do download; o yt-dlp usa
+        quantas couberem no limite global naquele momento. Um .part que começou com uma
+        conexão só continua assim, já que as faixas não sabem retomá-lo. Ao final, a parte
+        do download no limitador de banda (`chave_banda`) é descartada. O espaço em disco
+        para o download e suas `saidas` é reservado quando o tamanho fica conhecido (ver
+        VerificadorEspaco) e liberado ao fim do download.
+        """
+        conexoes = self.conexoes.reservar()
+        reserva = object()
+        try:
+            with self.ydl_pool.emprestar(chave, fabrica_opts, hook, hook_pos) as ydl:
+                ydl.params['concurrent_fragment_downloads'] = conexoes
+                ydl.params[PARAM_DIVIDIR] = self.conexoes.por_item > 1 and not parcial_sem_faixas(arquivos_parciais)
+                ydl.params[PARAM_ESPACO] = lambda n: self.espaco.reservar(reserva, self._espaco_necessario(n, saidas))
+                try:
+                    yield ydl
+                finally:
+                    ydl.params[PARAM_ESPACO] = None
+        finally:
+            self.conexoes.liberar(conexoes)
+            self.banda.esquecer(chave_banda)
+            self.espaco.liberar(reserva)
+
+    def _espaco_necessario(self, n, saidas=1):
+        """{pasta: bytes} ocupados por um download de `n` bytes que gera `saidas` arquivos.
+
+        Na pasta de trabalho ficam o arquivo baixado e as saídas do FFmpeg até o fim da
+        conversão; na pasta de destino (quando é outra), só as saídas.
+        """
+        trabalho = n * (FATOR_TRABALHO + saidas - 1)
+        if not self.pasta_temporaria:
+            return {self.download_folder: trabalho}
+        return {self.pasta_temporaria: trabalho, self.download_folder: n * saidas}
+
+    def aquecer(self):
+        """Importa o yt-dlp e deixa no pool uma instância pronta para as opções atuais. Bloqueante.
+
+        Pensado para rodar em segundo plano logo depois de a janela aparecer: o primeiro
+        download encontra os extratores já carregados (ou espera só o que faltar).
+        """
+        carregar_yt_dlp()
+        chave, fabrica_opts = self._opts_fila()
+        with self.ydl_pool.emprestar(chave, fabrica_opts, None):
+            pass
+
+    # ---------------------------------------------------------------- Fila
+    def _novo_item(self, item_id, url, title, status=STATUS_PENDENTE, video_id=None, prioridade=0,
+                   parcial=0, arquivos_parciais=None, alvos=None):
+        item = FilaItem(item_id, title, url, status, video_id or extrair_video_id(url), prioridade)
+        item.alvos = alvos
+        item.tempos['enfileirado'] = time.time()
+        item.parcial = parcial
+        item.arquivos_parciais = arquivos_parciais or set()
+        return item
+
+    def ja_baixado(self, video_id, alvos=None):
+        """Consulta O(1) ao índice de downloads, para o formato e a qualidade atuais (ou todos os `alvos`)."""
+        if alvos:
+            return not self._alvos_faltando(video_id, alvos)
+        return self.archive is not None and self.archive.contem(video_id, self.format_type, self.quality)
+
+    def _alvos_faltando(self, video_id, alvos):
+        """Os alvos de um job que ainda não constam no índice de downloads."""
+        if self.archive is None:
+            return list(alvos)
+        return [alvo for alvo in alvos if not self.archive.contem(video_id, *alvo)]
+
+    def _set_status(self, item, status):
+        """Muda o status de um item e registra a mudança no diário."""
+        item.status = status
+        if self.journal is not None:
+            self.journal.atualizar_status(item.id, status)
+
+    def adicionar(self, url, title=None, alvos=None):
+        """Adiciona uma URL à fila e retorna o item criado (None se já estava na fila ou foi baixada)."""
+        itens = self.adicionar_lote([(title, url)], alvos)
+        return itens[0] if itens else None
+
+    def adicionar_lote(self, entradas, alvos=None):
+        """Adiciona várias entradas à fila com uma única escrita no diário.
+
+        Cada entrada é (título, url) ou (título, url, id do vídeo). Entradas que já
+        constam no índice de downloads ou que já estão na fila (mesmo id de vídeo) são
+        descartadas antes de qualquer acesso à rede. Com `alvos` (lista de (formato,
+        qualidade)), cada item é um job que baixa a fonte uma vez e gera todas as saídas.
+        Retorna os itens efetivamente adicionados.
+        """
+        alvos = normalizar_alvos(alvos)
+        novas = []
+        vistos = set()
+        with self.fila_lock:
+            for entrada in entradas:
+                title, url = entrada[0], entrada[1]
+                video_id = (entrada[2] if len(entrada) > 2 else None) or extrair_video_id(url)
+                if video_id is not None:
+                    if video_id in vistos or self.fila.contem_video(video_id):
+                        continue
+                    vistos.add(video_id)
+                if not self.ja_baixado(video_id, alvos):
+                    novas.append((url, sanitize_filename(title or url), video_id))
+        if self.journal is not None:
+            ids = self.journal.registrar_lote(novas, STATUS_PENDENTE, alvos)
+        else:
+            ids = [next(self._ids) for _ in novas]
+        itens = [self._novo_item(item_id, url, title, video_id=video_id, alvos=alvos)
+                 for item_id, (url, title, video_id) in zip(ids, novas)]
+        with self.fila_lock:
+            # Outra ingestão pode ter enfileirado o mesmo vídeo enquanto o diário era gravado
+            duplicados = [item for item in itens if not self.fila.adicionar(item)]
+        if duplicados:
+            if self.journal is not None:
+                self.journal.remover([item.id for item in duplicados])
+            itens = [item for item in itens if item not in duplicados]
+        if itens:
+            self._emit('itens_adicionados', itens=itens)
+        return itens
+
+    def restaurar(self):
+        """Recarrega do diário os itens pendentes, os pausados e os interrompidos. Retorna quantos voltaram à fila.
+
+        Os pausados continuam de onde pararam: o yt-dlp reaproveita os arquivos .part que
+        ficaram na pasta de downloads.
+        """
+        if self.journal is None:
+            return 0
+        linhas = self.journal.carregar_pendentes(
+            STATUS_AGUARDANDO, (STATUS_BAIXANDO, STATUS_CONVERTENDO, STATUS_MOVENDO, STATUS_RETENTATIVA),
+            STATUS_PENDENTE)
+        itens = [self._novo_item(item_id, url, title, status, video_id, prioridade, parcial, arquivos, alvos)
+                 for item_id, url, title, status, prioridade, parcial, arquivos, alvos, video_id in linhas]
+        with self.fila_lock:
+            itens = [item for item in itens if self.fila.adicionar(item)]
+        if itens:
+            self._emit('fila_restaurada', itens=itens)
+        return len(itens)
+
+    def extrair_playlist(self, url, ao_lote, tamanho_lote=PLAYLIST_LOTE_TAMANHO,
+                         intervalo_lote=PLAYLIST_LOTE_INTERVALO):
+        """Extrai as entradas de uma playlist página a página, sem baixá-las.
+
+        As entradas válidas são entregues a `ao_lote(lote, encontrados)` em listas de
+        (título, url) assim que o extrator as produz, sem esperar a playlist inteira.
+        Retorna uma tupla (info, encontrados), em que encontrados é None se a URL não for
+        uma playlist.
+        """
+        # Usar uma configuração mínima de ydl_opts para a análise da playlist
+        # para não incluir post-processadores que podem falhar ou atrasar a análise.
+        playlist_analysis_opts = {
+            'extract_flat': True,
+            'lazy_playlist': True, # As páginas da playlist são buscadas conforme as entradas são lidas
+            'quiet': True,
+            'no_warnings': True,
+            'ignoreerrors': True # Ignorar erros de vídeos indisponíveis na playlist
+        }
+        chave_playlist = f"playlist:{url}"
+        if self.cache is not None:
+            guardada = self.cache.obter(chave_playlist)
+            if guardada is not None:
+                # Playlist analisada há pouco: as entradas vêm do cache, sem nenhuma requisição
+                entradas = [tuple(entrada) for entrada in guardada['entradas']]
+                for inicio in range(0, len(entradas), tamanho_lote):
+                    ao_lote(entradas[inicio:inicio + tamanho_lote],
+                            min(inicio + tamanho_lote, len(entradas)))
+                return {'title': guardada.get('title'), 'id': guardada.get('id')}, guardada['encontrados']
+
+        with carregar_yt_dlp().YoutubeDL(playlist_analysis_opts) as ydl:
+            # process=False mantém 'entries' como um gerador preguiçoso
+            info = ydl.extract_info(url, download=False, process=False)
+            if info and info.get('_type') in ('url', 'url_transparent'):
+                # A URL redireciona para outra página; deixa o yt-dlp resolver por completo
+                info = ydl.extract_info(url, download=False)
+
+            if not info or 'entries' not in info:
+                if info and info.get('id'):
+                    # Um vídeo avulso: o resultado serve também para o download (ver baixar_item)
+                    self._guardar_info_video(info.get('id'), url, ydl.sanitize_info(info))
+                return info, None
+            encontrados = 0
+            lote = []
+            todas = []
+            ultimo_envio = time.monotonic()
+            for entry in info['entries']:
+                encontrados += 1
+                if entry and 'url' in entry: # Garante que a entrada é válida
+                    lote.append((entry.get('title', 'Vídeo sem título'), entry['url'], entry.get('id')))
+                if lote and (len(lote) >= tamanho_lote or time.monotonic() - ultimo_envio >= intervalo_lote):
+                    todas.extend(lote)
+                    ao_lote(lote, encontrados)
+                    lote = []
+                    ultimo_envio = time.monotonic()
+            if lote:
+                todas.extend(lote)
+                ao_lote(lote, encontrados)
+        if self.cache is not None:
+            self.cache.guardar(chave_playlist, {'title': info.get('title'), 'id': info.get('id'),
+                                                'encontrados': encontrados, 'entradas': todas},
+                               ttl=self.cache_ttl_playlist)
+        return info, encontrados
+
+    def _chave_cache_video(self, video_id, url):
+        return f"video:{video_id}" if video_id else f"url:{url}"
+
+    def _guardar_info_video(self, video_id, url, info):
+        if self.cache is not None:
+            self.cache.guardar(self._chave_cache_video(video_id, url), info)
+
+    def adicionar_playlist(self, url, aceitar_video_unico=False, iniciar=False, alvos=None):
+        """Extrai a playlist e adiciona seus vídeos à fila conforme são encontrados. Bloqueante.
+
+        Cada lote vira uma única escrita no diário e um único evento 'itens_adicionados',
+        seguido de um evento 'playlist_progresso'. Com `iniciar`, os workers começam a
+        baixar já a partir do primeiro lote (respeitando uma pausa em andamento).
+        Retorna o número de itens adicionados, ou None se a URL não for uma playlist
+        (quando `aceitar_video_unico` é True, a URL é adicionada como um único item).
+        Os `alvos` são repassados a `adicionar_lote`.
+        """
+        alvos = normalizar_alvos(alvos)
+        contagem = {'lote': 0, 'enfileirados': 0, 'ja_baixados': 0}
+        video_id = extrair_video_id(url)
+        if 'list=' not in url and self.ja_baixado(video_id, alvos):
+            # Vídeo avulso já baixado: nem chega a consultar o YouTube
+            self._emit('playlist_progresso', url=url, lote=0, encontrados=1, enfileirados=0,
+                       ja_baixados=1, concluida=True)
+            return 0 if aceitar_video_unico else None
+
+        def ao_lote(lote, encontrados):
+            adicionados = len(self.adicionar_lote(lote, alvos))
+            contagem['lote'] += 1
+            contagem['enfileirados'] += adicionados
+            contagem['ja_baixados'] += len(lote) - adicionados
+            self._emit('playlist_progresso', url=url, lote=contagem['lote'], encontrados=encontrados,
+                       enfileirados=contagem['enfileirados'], ja_baixados=contagem['ja_baixados'],
+                       concluida=False)
+            if iniciar:
+                self.iniciar()
+
+        info, encontrados = self.extrair_playlist(url, ao_lote)
+        if encontrados is None:
+            if not aceitar_video_unico or not info:
+                return None
+            encontrados = 1
+            ao_lote([(info.get('title') or url, url, info.get('id'))], encontrados)
+        self._emit('playlist_progresso', url=url, lote=contagem['lote'], encontrados=encontrados,
+                   enfileirados=contagem['enfileirados'], ja_baixados=contagem['ja_baixados'],
+                   concluida=True)
+        return contagem['enfileirados']
+
+    def importar(self, linhas, formato_csv=False, alvos=None, iniciar=False, tamanho_lote=IMPORTACAO_LOTE):
+        """Importa muitos links de uma vez: linhas de um arquivo de texto, de um CSV ou da área de transferência.
+
+        As linhas são lidas sob demanda (um arquivo aberto pode ser passado direto). Cada
+        link é normalizado para o id do vídeo, e as repetições são descartadas com um
+        conjunto de hashes, tanto dentro da entrada quanto contra a fila atual e o índice
+        de downloads (ver `adicionar_lote`). Os vídeos do YouTube entram na fila em lotes,
+        sem consultar a rede; playlists e links de outros sites são analisados depois,
+        como por `adicionar_playlist`. Retorna o resumo também publicado no evento
+        'importacao_progresso': linhas lidas, itens enfileirados, duplicados na entrada,
+        descartados (já na fila ou já baixados), inválidos, links analisados e erros de análise.
+        """
+        alvos = normalizar_alvos(alvos)
+        resumo = dict.fromkeys(('lidas', 'enfileirados', 'duplicados', 'descartados', 'invalidas',
+                                'analisados', 'erros'), 0)
+        vistos = set() # (tipo, chave) das entradas já lidas
+        lote = []
+        outras = [] # Playlists e links de outros sites, analisados depois dos vídeos
+
+        def enviar_lote():
+            adicionados = len(self.adicionar_lote(lote, alvos))
+            resumo['enfileirados'] += adicionados
+            resumo['descartados'] += len(lote) - adicionados
+            lote.clear()
+            self._emit('importacao_progresso', concluida=False, **resumo)
+            if iniciar:
+                self.iniciar()
+
+        for titulo, entrada in entradas_importadas(linhas, formato_csv):
+            resumo['lidas'] += 1
+            if entrada is None:
+                resumo['invalidas'] += 1
+                continue
+            tipo, chave, url = entrada
+            if (tipo, chave) in vistos:
+                resumo['duplicados'] += 1
+                continue
+            vistos.add((tipo, chave))
+            if tipo != ENTRADA_VIDEO:
+                outras.append(url)
+                continue
+            lote.append((titulo or url, url, chave))
+            if len(lote) >= tamanho_lote:
+                enviar_lote()
+        if lote:
+            enviar_lote()
+
+        for url in outras:
+            try:
+                adicionados = self.adicionar_playlist(url, aceitar_video_unico=True, iniciar=iniciar, alvos=alvos)
+            except Exception as e:
+                adicionados = None
+                self._emit('erro', mensagem=f"🔴 Erro ao analisar {url}: {e}")
+            if adicionados is None:
+                resumo['erros'] += 1
+            else:
+                resumo['analisados'] += 1
+                resumo['enfileirados'] += adicionados
+            self._emit('importacao_progresso', concluida=False, **resumo)
+        self._emit('importacao_progresso', concluida=True, **resumo)
+        return resumo
+
+    def itens_ativos(self):
+        """Itens sendo baixados neste momento (no máximo um por worker)."""
+        with self.fila_lock:
+            return list(self._ativos.values())
+
+    def snapshot(self):
+        """Cópia da fila atual (em andamento primeiro, depois por prioridade), segura para outras threads."""
+        with self.fila_lock:
+            return self.fila.itens_ordenados()
+
+    def obter(self, item_id):
+        """Busca O(1) de um item da fila pelo id."""
+        with self.fila_lock:
+            return self.fila.obter(item_id)
+
+    def mover_para_topo(self, item_id):
+        """Faz um item pendente ser o próximo a ser baixado. Retorna False se ele não estiver pendente."""
+        with self.fila_lock:
+            item = self.fila.mover_para_topo(item_id)
+        if item is None:
+            return False
+        if self.journal is not None:
+            self.journal.atualizar_prioridade(item.id, item.prioridade)
+        self._emit('item_movido', item=item)
+        return True
+
+    def cancelar(self, item_id):
+        """Cancela um item: pendentes, pausados e os que aguardam nova tentativa saem da fila;
+        downloads em andamento são interrompidos.
+
+        Os arquivos .part do item são apagados. Itens já em conversão ou sendo movidos para o
+        destino não são interrompidos. Retorna False se o item não foi encontrado ou não pode
+        mais ser cancelado.
+        """
+        with self.fila_lock:
+            item = self.fila.obter(item_id)
+            if item is None or item.status in (STATUS_CONVERTENDO, STATUS_MOVENDO):
+                return False
+            if item.status == STATUS_BAIXANDO:
+                # O hook de progresso interrompe o download na próxima chamada
+                item.cancelado = True
+                return True
+            self.fila.remover(item_id)
+        if self.journal is not None:
+            self.journal.remover([item.id])
+        self._descartar_parciais(item)
+        self._emit('item_removido', item=item)
+        return True
+
+    def iniciar(self):
+        """Inicia workers de download até o limite de downloads simultâneos."""
+        if self.pausado:
+            return
+        with self.fila_lock:
+            vagas = max(self._limite_workers() - self.workers_ativos, 0)
+            novos = min(vagas, self.fila.pendentes)
+            self.workers_ativos += novos
+            if novos:
+                self.em_processamento = True
+                self._ocioso.clear()
+        for _ in range(novos):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def _limite_workers(self):
+        """Downloads simultâneos permitidos agora: o configurado, ou menos se o disjuntor abriu."""
+        limite = self.disjuntor.limite_workers
+        return self.max_workers if limite is None else min(limite, self.max_workers)
+
+    def pausar(self):
+        """Pausa a fila. Retorna False se a fila não estava ativa.
+
+        Os downloads em andamento são interrompidos na próxima chamada do hook de progresso
+        (em geral em menos de um segundo) e voltam para a fila como "Pausado", com os arquivos
+        .part preservados; ao retomar, o yt-dlp continua de onde parou. Conversões já iniciadas
+        terminam normalmente.
+        """
+        if self.pausado_pelo_disjuntor:
+            # A pausa automática vira uma pausa do usuário: o motor não se religa mais sozinho
+            self._cancelar_timer_disjuntor()
+            self._verificar_conclusao()
+            return True
+        if not self.em_processamento or self.pausado:
+            return False
+        self.pausado = True
+        return True
+
+    def retomar(self):
+        """Retoma o processamento da fila."""
+        self._cancelar_timer_disjuntor()
+        self.pausado = False
+        self.iniciar()
+
+    def limpar(self):
+        """Remove os itens pendentes e pausados da fila. Downloads em andamento são concluídos normalmente.
+
+        Retorna True se ainda há downloads em andamento.
+        """
+        with self.fila_lock:
+            removidos = self.fila.remover_pendentes()
+            ha_ativos = bool(self.fila)
+        if self.journal is not None:
+            self.journal.remover([item.id for item in removidos])
+        for item in removidos:
+            self._descartar_parciais(item)
+        self._cancelar_timer_disjuntor()
+        self.pausado = False
+        self._emit('fila_limpa', removidos=removidos)
+        return ha_ativos
+
+    def aguardar(self, timeout=None):
+        """Bloqueia até que nenhum worker esteja ativo. Retorna False em caso de timeout."""
+        return self._ocioso.wait(timeout)
+
+    # ---------------------------------------------------------------- Workers
+    def _proximo_item(self):
+        """Reserva o próximo item pendente da fila, ou None se não houver (ou se estiver pausada).
+
+        Com None o worker deve encerrar: ele já foi descontado de `workers_ativos`, sob o
+        mesmo lock, para que vários workers acima do limite do disjuntor não saiam juntos.
+        """
+        with self.fila_lock:
+            item = None
+            if not self.pausado and self.workers_ativos <= self._limite_workers():
+                item = self.fila.retirar_proximo(STATUS_BAIXANDO)
+            if item is None:
+                self.workers_ativos -= 1
+                return None
+            item.progresso = 0
+            item.pausado = False
+            item.bytes = 0 # Ao retomar, o yt-dlp informa de novo os arquivos já concluídos
+            item.tempos['iniciado'] = time.time()
+            self._ativos[item.id] = item
+        self._set_status(item, STATUS_BAIXANDO)
+        return item
+
+    def _remover_item(self, item):
+        """Remove um item específico da fila, pelo id."""
+        with self.fila_lock:
+            self._ativos.pop(item.id, None)
+            self.fila.remover(item.id)
+        self._descartar_progresso(item.id)
+        self._emit('item_removido', item=item)
+
+    def _devolver_item(self, item):
+        """Devolve à fila um download interrompido pela pausa, registrando o que já está em disco."""
+        with self.fila_lock:
+            self._ativos.pop(item.id, None)
+            self.fila.devolver(item.id, STATUS_PAUSADO)
+        item.velocidade = None
+        self._descartar_progresso(item.id)
+        if self.journal is not None:
+            self.journal.atualizar_parcial(item.id, STATUS_PAUSADO, item.parcial, item.arquivos_parciais)
+        self._emit('item_status', item=item)
+
+    def _descartar_parciais(self, item):
+        """Apaga os arquivos .part de um item que não será mais baixado."""
+        if item.arquivos_parciais:
+            remover_arquivos_parciais(item.arquivos_parciais)
+            item.arquivos_parciais = set()
+        item.parcial = 0
+
+    def _registrar_progresso(self, chave, d):
+        """Grava o estado mais recente de um download no snapshot. Retorna o percentual, se conhecido."""
+        percent = None
+        if d['status'] == 'downloading':
+            # Nos downloads em faixas o yt-dlp só estima o total; o tamanho do formato é exato
+            total_bytes = (d.get('total_bytes') or (d.get('info_dict') or {}).get('filesize')
+                           or d.get('total_bytes_estimate'))
+            if total_bytes:
+                percent = (d.get('downloaded_bytes', 0) / total_bytes) * 100
+        elif d['status'] == 'finished':
+            percent = 100
+        with self._progresso_lock:
+            self._progresso[chave] = {'status': d['status'], 'percent': percent,
+                                      'speed': d.get('speed'), 'eta': d.get('eta')}
+            self._progresso_versao += 1
+        return percent
+
+    def _descartar_progresso(self, chave):
+        with self._progresso_lock:
+            if self._progresso.pop(chave, None) is not None:
+                self._progresso_versao += 1
+
+    def progresso_atual(self):
+        """Retorna (versão, estados) do snapshot de progresso.
+
+        `estados` mapeia o id de cada item ativo (ou None, para o download avulso) a um
+        dicionário com status, percent, speed e eta. A versão muda a cada escrita, o que
+        permite ao cliente pular a renderização quando nada mudou.
+        """
+        with self._progresso_lock:
+            return self._progresso_versao, {chave: dict(estado) for chave, estado in self._progresso.items()}
+
+    def _interromper_se_preciso(self, item):
+        """Levanta DownloadCancelled no hook do yt-dlp se o item foi cancelado ou pausado."""
+        if self.pausado and not item.cancelado:
+            item.pausado = True
+        if item.cancelado or item.pausado:
+            # O yt-dlp repassa esta exceção mesmo com 'ignoreerrors'; o .part fica em disco
+            raise carregar_yt_dlp().utils.DownloadCancelled(f"Download interrompido: {item.title}")
+
+    def _peso_banda(self, item):
+        return self.peso_prioritario if item.prioridade < 0 else 1 # Prioridade < 0: movido para o topo
+
+    def _progresso_item(self, d, item):
+        """Hook de progresso do yt-dlp para um item da fila.
+
+        Roda na thread que está baixando: a espera pela banda (limite global) acontece
+        aqui, entre um bloco e o próximo.
+        """
+        self._interromper_se_preciso(item)
+        if d['status'] == 'downloading' and d.get('tmpfilename'):
+            self.banda.consumir_progresso(item.id, d['tmpfilename'], d.get('downloaded_bytes') or 0,
+                                          self._peso_banda(item),
+                                          lambda: item.cancelado or item.pausado or self.pausado)
+            self._interromper_se_preciso(item)
+        agora = time.time()
+        item.tempos.setdefault('download_inicio', agora)
+        if d['status'] == 'finished':
+            item.tempos['download_fim'] = agora # Com vários arquivos (vídeo + áudio), vale o último
+            item.bytes += d.get('total_bytes') or d.get('downloaded_bytes') or 0
+            item.parcial = item.bytes
+        percent = self._registrar_progresso(item.id, d)
+        if percent is not None:
+            item.progresso = percent
+        if d['status'] == 'downloading':
+            item.velocidade = d.get('speed')
+            item.parcial = item.bytes + (d.get('downloaded_bytes') or 0) # Inclui o que foi retomado do .part
+            if d.get('tmpfilename'):
+                item.arquivos_parciais.add(d['tmpfilename'])
+
+    def _pos_processamento_item(self, d, item):
+        """Hook de pós-processamento do yt-dlp (conversão dentro do worker): marca início e fim."""
+        if d['status'] == 'started':
+            item.tempos.setdefault('pos_inicio', time.time())
+        elif d['status'] == 'finished':
+            item.tempos['pos_fim'] = time.time()
+
+    def baixar_item(self, item):
+        """Baixa um item da fila na thread atual e atualiza seu status.
+
+        Retorna False quando o item foi entregue ao pool de conversão e ainda não terminou
+        (a finalização acontece em `_conversao_concluida`) ou quando a pausa interrompeu o
+        download e o item voltou para a fila.
+        """
+        if item.alvos is not None:
+            # Alvos gerados por uma execução anterior do mesmo job não são refeitos
+            item.alvos = self._alvos_faltando(item.video_id, item.alvos)
+            ja_baixado = not item.alvos
+        else:
+            ja_baixado = self.ja_baixado(item.video_id)
+        if ja_baixado:
+            # O formato/qualidade pode ter mudado desde que o item entrou na fila
+            self._set_status(item, STATUS_IGNORADO)
+            return True
+        yt_dlp = carregar_yt_dlp() # Espera o aquecimento, se ainda estiver em andamento
+        hook = lambda d: self._progresso_item(d, item)
+        # Jobs com vários alvos sempre convertem no pool: as saídas são geradas em paralelo
+        pipeline = self.pipeline_conversao or bool(item.alvos)
+        hook_pos = None if pipeline else (lambda d: self._pos_processamento_item(d, item))
+        chave, fabrica_opts = self._opts_fonte(item.alvos) if item.alvos else self._opts_fila()
+        try:
+            with self._emprestar(chave, fabrica_opts, hook, hook_pos, list(item.arquivos_parciais),
+                                 chave_banda=item.id, saidas=len(item.alvos or ()) or 1) as ydl:
+                info = self._extrair_e_baixar(ydl, item.url, item.video_id, item)
+                if info is not None and pipeline:
+                    info = ydl.sanitize_info(info)
+            if info is None:
+                self._set_status(item, STATUS_ERRO)
+                self._emit('erro', item=item, mensagem=f"🔴 Erro no download de {item.title}")
+                return True
+            self._registrar_resultado(True)
+            if pipeline:
+                self._enviar_para_conversao(item, info)
+                return False
+            if self.pasta_temporaria:
+                self._entregar(item, {(self.format_type, self.quality): caminho_baixado(info)})
+                return False # Finalizado quando o arquivo chegar ao destino
+            self._registrar_no_arquivo(item, info)
+            self._set_status(item, STATUS_CONCLUIDO)
+        except EspacoInsuficiente as e:
+            # Nada foi gravado ainda: o item falha e a fila para, em vez de encher o disco item a item
+            self._set_status(item, STATUS_ERRO)
+            self.pausar()
+            self._emit('erro', item=item, mensagem=f"💾 {item.title}: {e}. Fila pausada; libere espaço e retome.")
+        except yt_dlp.utils.DownloadCancelled as e:
+            if item.cancelado:
+                self._set_status(item, STATUS_CANCELADO)
+                self._descartar_parciais(item)
+            elif item.pausado:
+                self._devolver_item(item)
+                return False # Não é finalizado: continua na fila, pausado
+            else:
+                self._set_status(item, STATUS_ERRO)
+                self._emit('erro', item=item, mensagem=f"🔴 Download interrompido de {item.title}: {e}")
+        except yt_dlp.DownloadError as e:
+            transitorio = classificar_erro(e) == ERRO_TRANSITORIO
+            if transitorio:
+                self._registrar_resultado(False)
+                if item.tentativas < self.max_tentativas:
+                    self._agendar_retentativa(item, e)
+                    return False # Volta para a fila depois do backoff
+            self._set_status(item, STATUS_ERRO)
+            tentativas = f" (após {item.tentativas + 1} tentativas)" if transitorio else ""
+            self._emit('erro', item=item, mensagem=f"🔴 Erro no download de {item.title}{tentativas}: {e}")
+        except Exception as e:
+            self._set_status(item, STATUS_ERRO)
+            self._emit('erro', item=item, mensagem=f"🔴 Erro inesperado em {item.title}: {e}")
+        return True
+
+    # ---------------------------------------------------------------- Novas tentativas e disjuntor
+    def _agendar_retentativa(self, item, erro):
+        """Tira o item dos ativos e o devolve à fila depois de um backoff exponencial com jitter."""
+        item.tentativas += 1
+        atraso = atraso_backoff(item.tentativas, self.backoff_base, self.backoff_max)
+        with self.fila_lock:
+            self._ativos.pop(item.id, None)
+            item.status = STATUS_RETENTATIVA
+            self._retentativas_agendadas += 1
+        if self.journal is not None:
+            self.journal.atualizar_status(item.id, STATUS_RETENTATIVA)
+        item.velocidade = None
+        self._descartar_progresso(item.id)
+        self._emit('item_status', item=item)
+        self._emit('retentativa', item=item, tentativa=item.tentativas, atraso=atraso,
+                   mensagem=f"↻ {item.title}: nova tentativa {item.tentativas}/{self.max_tentativas} "
+                            f"em {atraso:.0f}s ({erro})")
+        timer = threading.Timer(atraso, self._fim_do_backoff, args=(item,))
+        timer.daemon = True
+        timer.start()
+
+    def _fim_do_backoff(self, item):
+        """Timer do backoff: o item volta a ser pendente (se não foi cancelado nesse meio-tempo)."""
+        with self.fila_lock:
+            self._retentativas_agendadas -= 1
+            devolvido = self.fila.devolver(item.id, STATUS_PENDENTE) is not None
+        if devolvido:
+            if self.journal is not None:
+                self.journal.atualizar_status(item.id, STATUS_PENDENTE)
+            self._emit('item_status', item=item)
+        self.iniciar()
+        self._verificar_conclusao()
+
+    def _registrar_resultado(self, sucesso):
+        """Informa o disjuntor do resultado de um download e aplica a decisão dele."""
+        acao = self.disjuntor.registrar(sucesso, self.max_workers)
+        if acao is None:
+            return
+        tipo, valor = acao
+        taxa = self.disjuntor.taxa_abertura
+        if tipo == 'pausar':
+            self.pausado = True
+            self.pausado_pelo_disjuntor = True
+            self._timer_disjuntor = threading.Timer(valor, self._religar)
+            self._timer_disjuntor.daemon = True
+            self._timer_disjuntor.start()
+            self._emit('disjuntor', acao=tipo, limite=1, pausa=valor, taxa=taxa,
+                       mensagem=f"⚠️ {taxa:.0%} de falhas temporárias: fila pausada por {valor:.0f}s")
+        elif tipo == 'reduzir':
+            self._emit('disjuntor', acao=tipo, limite=valor, pausa=None, taxa=taxa,
+                       mensagem=f"⚠️ {taxa:.0%} de falhas temporárias: reduzindo para {valor} download(s) "
+                                "simultâneo(s)")
+        else:
+            limite = valor if valor is not None else self.max_workers
+            self._emit('disjuntor', acao=tipo, limite=valor, pausa=None, taxa=taxa,
+                       mensagem=f"✔ Downloads normalizados: até {limite} simultâneo(s)")
+            self.iniciar() # Workers encerrados pela redução voltam a ser criados
+
+    def _religar(self):
+        """Fim da pausa do disjuntor: a fila volta com um download por vez ("meio aberto")."""
+        if not self.pausado_pelo_disjuntor:
+            return
+        self.pausado_pelo_disjuntor = False
+        self._timer_disjuntor = None
+        self.pausado = False
+        self._emit('disjuntor', acao='religar', limite=self.disjuntor.limite_workers, pausa=None,
+                   taxa=self.disjuntor.taxa_falhas(), mensagem="▶ Fim da pausa automática: retomando a fila")
+        self.iniciar()
+        self._verificar_conclusao()
+
+    def _cancelar_timer_disjuntor(self):
+        """Desfaz a pausa automática pendente (o usuário pausou, retomou ou limpou a fila)."""
+        timer, self._timer_disjuntor = self._timer_disjuntor, None
+        if timer is not None:
+            timer.cancel()
+        self.pausado_pelo_disjuntor = False
+
+    # ---------------------------------------------------------------- Conversão (pool de CPU)
+    def _obter_conversor(self):
+        with self.fila_lock:
+            if self._conversor is None:
+                self._conversor = concurrent.futures.ProcessPoolExecutor(max_workers=self.max_conversoes)
+            return self._conversor
+
+    def _enviar_para_conversao(self, item, info):
+        """Entrega o arquivo baixado ao pool de processos do FFmpeg e libera o worker.
+
+        Um job com vários alvos vira uma tarefa por alvo, todas a partir do mesmo arquivo-fonte,
+        executadas em paralelo; a fonte é apagada quando a última termina.
+        """
+        self._vagas_conversao.acquire() # Bloqueia se a etapa de CPU estiver sobrecarregada
+        with self.fila_lock:
+            self._conversoes_pendentes += 1
+        self._set_status(item, STATUS_CONVERTENDO)
+        self._emit('item_status', item=item)
+        filepath = caminho_baixado(info)
+        ffmpeg_location = os.path.dirname(FFMPEG_PATH) if os.path.exists(FFMPEG_PATH) else None
+        if item.alvos:
+            fonte = filepath
+            tarefas = {alvo: (transcodificar_alvo, filepath, info, *alvo, ffmpeg_location) for alvo in item.alvos}
+        else:
+            fonte = None
+            alvo = (self.format_type, self.quality)
+            tarefas = {alvo: (pos_processar_cronometrado, filepath, info, postprocessors_para(*alvo),
+                              ffmpeg_location)}
+        futuros = {}
+        for alvo, (funcao, *argumentos) in tarefas.items():
+            try:
+                futuros[alvo] = self._obter_conversor().submit(funcao, *argumentos)
+            except Exception as e:
+                futuros[alvo] = concurrent.futures.Future()
+                futuros[alvo].set_exception(e)
+        restantes = [len(futuros)]
+        contador_lock = threading.Lock()
+
+        def ao_concluir(_):
+            with contador_lock:
+                restantes[0] -= 1
+                ultimo = restantes[0] == 0
+            if ultimo:
+                self._conversao_concluida(item, futuros, fonte)
+        for futuro in list(futuros.values()):
+            futuro.add_done_callback(ao_concluir)
+
+    def _conversao_concluida(self, item, futuros, fonte=None):
+        """Chamado quando todas as conversões de um item terminam: entrega os resultados e o finaliza."""
+        self._vagas_conversao.release()
+        saidas, erros, inicios, fins = {}, [], [], []
+        for (formato, qualidade), futuro in futuros.items():
+            try:
+                caminho, inicio, fim = futuro.result()
+            except Exception as e:
+                erros.append(f"{formato} {qualidade}: {e}" if fonte is not None else str(e))
+                continue
+            inicios.append(inicio)
+            fins.append(fim)
+            saidas[(formato, qualidade)] = caminho
+        if inicios:
+            item.tempos['pos_inicio'], item.tempos['pos_fim'] = min(inicios), max(fins)
+        if fonte is not None:
+            with contextlib.suppress(OSError):
+                os.remove(fonte)
+        erro = f"🔴 Erro na conversão de {item.title}: {'; '.join(erros)}" if erros else None
+        self._entregar(item, saidas, erro)
+        with self.fila_lock:
+            self._conversoes_pendentes -= 1
+        self._verificar_conclusao()
+
+    # ---------------------------------------------------------------- Entrega na pasta de destino
+    def _entregar(self, item, saidas, erro=None):
+        """Registra as saídas prontas de um item ({(formato, qualidade): caminho}) e o finaliza.
+
+        Com a pasta temporária, as saídas primeiro vão para a pasta de destino pelo movedor,
+        em segundo plano; o item só é registrado no índice e finalizado quando todas chegam.
+        """
+        if not self.pasta_temporaria or not saidas:
+            self._concluir_saidas(item, saidas, erro)
+            return
+        with self.fila_lock:
+            self._movimentos_pendentes += 1
+        self._set_status(item, STATUS_MOVENDO)
+        self._emit('item_status', item=item)
+        futuros = {alvo: self.movedor.mover(caminho, self.download_folder) for alvo, caminho in saidas.items()}
+        restantes = [len(futuros)]
+        contador_lock = threading.Lock()
+
+        def ao_mover(_):
+            with contador_lock:
+                restantes[0] -= 1
+                if restantes[0]:
+                    return
+            finais, falhas = {}, []
+            for alvo, futuro in futuros.items():
+                try:
+                    finais[alvo] = futuro.result()
+                except Exception as e:
+                    falhas.append(f"{os.path.basename(saidas[alvo])}: {e}")
+            mensagem = erro
+            if falhas:
+                mensagem = (f"{erro}; " if erro else "") + \
+                    f"🔴 Erro ao mover {item.title} para a pasta de destino: {'; '.join(falhas)}"
+            self._concluir_saidas(item, finais, mensagem)
+            with self.fila_lock:
+                self._movimentos_pendentes -= 1
+            self._verificar_conclusao()
+        for futuro in list(futuros.values()):
+            futuro.add_done_callback(ao_mover)
+
+    def _concluir_saidas(self, item, saidas, erro=None):
+        """Grava as saídas no índice de downloads e finaliza o item (Concluído, ou Erro com `erro`)."""
+        if self.archive is not None and item.video_id:
+            for (formato, qualidade), caminho in saidas.items():
+                self.archive.registrar(item.video_id, formato, qualidade, caminho)
+        if erro:
+            self._set_status(item, STATUS_ERRO)
+            self._emit('erro', item=item, mensagem=erro)
+        else:
+            self._set_status(item, STATUS_CONCLUIDO)
+        self._finalizar_item(item)
+
+    def encerrar(self, aguardar=True):
+        """Libera o pool de conversão (e as instâncias do yt-dlp). Chamado ao fechar o aplicativo."""
+        with self.fila_lock:
+            conversor, self._conversor = self._conversor, None
+        if conversor is not None:
+            conversor.shutdown(wait=aguardar, cancel_futures=not aguardar)
+        self.movedor.encerrar(aguardar) # As cópias já iniciadas terminam mesmo sem esperar
+        self.ydl_pool.invalidar()
+
+    def _extrair_e_baixar(self, ydl, url, video_id=None, item=None):
+        """Baixa a URL, reaproveitando os metadados do cache quando possível.
+
+        Equivale a `ydl.extract_info(url)`, mas a extração (process=False) e o download
+        (process_ie_result) são separados: assim o tempo de cada um é medido no `item` e,
+        com cache, retentativas e ressincronizações pulam a ida ao extrator. Se o download a
+        partir de metadados guardados falhar (URLs de mídia expiradas, por exemplo), a
+        entrada é invalidada e a extração é refeita.
+        """
+        def marcar(marco):
+            if item is not None:
+                item.tempos[marco] = time.time()
+
+        chave = self._chave_cache_video(video_id, url)
+        guardada = self.cache.obter(chave) if self.cache is not None else None
+        if guardada is not None:
+            try:
+                info = ydl.process_ie_result(guardada, download=True)
+            except carregar_yt_dlp().DownloadError:
+                info = None # Metadados guardados vencidos (403 na URL de mídia, por exemplo)
+            if self._download_ok(info):
+                return info
+            self.cache.invalidar(chave)
+        marcar('extracao_inicio')
+        info = ydl.extract_info(url, download=False, process=False)
+        marcar('extracao_fim')
+        if info is None:
+            return None
+        if self.cache is not None and info.get('_type', 'video') == 'video':
+            self.cache.guardar(self._chave_cache_video(video_id or info.get('id'), url), ydl.sanitize_info(info))
+        return ydl.process_ie_result(info, download=True)
+
+    def _download_ok(self, info):
+        """True se o resultado do yt-dlp aponta para um arquivo final existente."""
+        if not info:
+            return False
+        caminho = caminho_baixado(info)
+        return bool(caminho) and os.path.exists(caminho)
+
+    def _registrar_no_arquivo(self, item, info):
+        """Grava no índice de downloads o arquivo final produzido para o item."""
+        if self.archive is None:
+            return
+        video_id = item.video_id or info.get('id')
+        caminho = caminho_baixado(info)
+        if video_id and caminho:
+            self.archive.registrar(video_id, self.format_type, self.quality, caminho)
+
+    def _finalizar_item(self, item):
+        item.tempos['finalizado'] = time.time()
+        if self.metricas is not None:
+            try:
+                self.metricas.registrar(item)
+            except OSError as e:
+                self._emit('erro', item=item, mensagem=f"⚠️ Não foi possível gravar as métricas: {e}")
+        self._emit('item_status', item=item) # Status final (Concluído/Erro/Cancelado)
+        # Remove o item da fila após tentar o download (sucesso ou erro)
+        self._remover_item(item)
+
+    def _worker(self):
+        """Loop de um worker: consome itens pendentes da fila até ela esvaziar ou ser pausada."""
+        while True:
+            item = self._proximo_item()
+            if item is None:
+                break
+            self._emit('item_status', item=item)
+            finalizado = True
+            try:
+                finalizado = self.baixar_item(item)
+            finally:
+                if finalizado:
+                    self._finalizar_item(item)
+        self._verificar_conclusao(worker_encerrado=True)
+
+    def _verificar_conclusao(self, worker_encerrado=False):
+        """Emite 'fila_concluida' quando não há mais workers, conversões nem cópias para o destino em andamento."""
+        with self.fila_lock:
+            sem_workers = self.workers_ativos == 0
+            # Itens adicionados enquanto o último worker encerrava
+            restantes = self.fila.pendentes > 0
+            # Uma pausa do disjuntor não encerra a execução: a fila se religa sozinha
+            pausa_definitiva = self.pausado and not self.pausado_pelo_disjuntor
+            concluida = (self.em_processamento and sem_workers and self._conversoes_pendentes == 0
+                         and self._movimentos_pendentes == 0
+                         and (pausa_definitiva or (not restantes and self._retentativas_agendadas == 0)))
+            if concluida:
+                self.em_processamento = False
+                self._ocioso.set()
+        if concluida:
+            self._exportar_metricas()
+            self._emit('fila_concluida', pausado=self.pausado)
+        elif worker_encerrado and sem_workers and restantes and not self.pausado:
+            self.iniciar()
+
+    def _exportar_metricas(self):
+        """Atualiza o textfile do Prometheus ao fim de cada execução da fila."""
+        if self.metricas is None:
+            return
+        try:
+            self.metricas.escrever_prometheus()
+        except OSError as e:
+            self._emit('erro', mensagem=f"⚠️ Não foi possível gravar o textfile do Prometheus: {e}")
+
+    # ---------------------------------------------------------------- Download avulso
+    def _progresso_unico(self, d):
+        """Hook de progresso do yt-dlp para downloads fora da fila."""
+        if d['status'] == 'downloading' and d.get('tmpfilename'):
+            self.banda.consumir_progresso(None, d['tmpfilename'], d.get('downloaded_bytes') or 0)
+        self._registrar_progresso(None, d)
+        if d['status'] == 'finished':
+            self._emit('download_unico', status='finished')
+
+    def baixar_agora(self, url):
+        """Baixa uma URL imediatamente, fora da fila. Bloqueante."""
+        yt_dlp = carregar_yt_dlp()
+        try:
+            with self._emprestar(self._chave_opts(), self.build_ydl_opts, self._progresso_unico) as ydl:
+                info = ydl.extract_info(url)
+            if self.pasta_temporaria and self._download_ok(info):
+                self.movedor.mover(caminho_baixado(info), self.download_folder).result()
+        except EspacoInsuficiente as e:
+            self._emit('download_unico', status='error', erro=f"💾 {e}")
+        except yt_dlp.DownloadError as e:
+            self._emit('download_unico', status='error', erro=f"🔴 Erro no download: {e}")
+        except Exception as e:
+            self._emit('download_unico', status='error', erro=f"🔴 Erro inesperado: {e}")
+        finally:
+            self._descartar_progresso(None)
+
+# --------------------------------------------------------------------------------------------------
+# 6. Modo em Lote (sem interface gráfica)
+# --------------------------------------------------------------------------------------------------
+def ler_arquivo_de_urls(path):
+    """Lê um arquivo de URLs (uma por linha). Linhas vazias e comentários (#) são ignorados."""
+    with open(path, 'r', encoding='utf-8-sig', errors='replace', newline='') as f: # BOM e CSV do Excel
+        for linha in f:
+            linha = linha.strip()
+            if linha and not linha.startswith('#'):
+                yield linha
+
+def executar_lote(urls, format_type, quality, download_folder, max_workers, journal=None,
+                  archive=None, cache=None, cache_ttl_playlist=None, pipeline_conversao=True,
+                  metricas=None, max_tentativas=None, backoff_base=None, backoff_max=None, alvos=None,
+                  conexoes_por_item=None, conexoes_max=None, limite_banda_kbs=None, peso_prioritario=None,
+                  formato_csv=False, pasta_temporaria=None, espaco_livre_min_mb=None, saida=sys.stdout):
+    """Baixa todas as URLs (vídeos ou playlists) usando o motor, sem GUI.
+
+    As `urls` passam por `DownloadEngine.importar` (linhas de texto, ou de um CSV com
+    `formato_csv`): links repetidos são descartados e os vídeos entram na fila sem
+    consultar a rede.
+
+    Com `alvos` (lista de (formato, qualidade)), cada vídeo é baixado uma vez e convertido
+    para todas as saídas pedidas, em vez de usar `format_type` e `quality`.
+    Com um `journal`, itens pendentes de uma execução interrompida são retomados e, nesse
+    caso, a lista de URLs não é analisada novamente. Com `metricas`, o resumo dos tempos
+    por fase é impresso ao final.
+    Retorna o código de saída do processo: 0 se tudo foi baixado, 1 se houve erros.
+    """
+    engine = DownloadEngine(download_folder, format_type, quality, max_workers, journal=journal,
+                            archive=archive, cache=cache,
+                            cache_ttl_playlist=cache_ttl_playlist, pipeline_conversao=pipeline_conversao,
+                            metricas=metricas, max_tentativas=max_tentativas, backoff_base=backoff_base,
+                            backoff_max=backoff_max, conexoes_por_item=conexoes_por_item,
+                            conexoes_max=conexoes_max, limite_banda_kbs=limite_banda_kbs,
+                            peso_prioritario=peso_prioritario, pasta_temporaria=pasta_temporaria,
+                            espaco_livre_min_mb=espaco_livre_min_mb)
+    resultado = {STATUS_CONCLUIDO: 0, STATUS_ERRO: 0, STATUS_IGNORADO: 0}
+
+    def on_evento(evento):
+        tipo = evento['tipo']
+        if tipo == 'item_status':
+            item = evento['item']
+            if item.status in resultado:
+                resultado[item.status] += 1
+            print(f"[{item.id}] {item.status} {item.title}", file=saida, flush=True)
+        elif tipo in ('erro', 'retentativa', 'disjuntor'):
+            print(evento['mensagem'], file=saida, flush=True)
+        elif tipo == 'playlist_progresso' and evento['concluida']:
+            resultado[STATUS_IGNORADO] += evento['ja_baixados']
+        elif tipo == 'importacao_progresso' and evento['concluida']:
+            print(f"➕ {evento['enfileirados']} item(ns) na fila de {evento['lidas']} link(s) | "
+                  f"Repetidos: {evento['duplicados']} | Já na fila ou baixados: {evento['descartados']} | "
+                  f"Inválidos: {evento['invalidas']}", file=saida, flush=True)
+
+    engine.subscribe(on_evento)
+    if metricas is not None:
+        metricas.nova_execucao()
+    restaurados = engine.restaurar()
+    if restaurados:
+        print(f"↺ {restaurados} item(ns) retomados do diário; a lista de URLs não será reanalisada.",
+              file=saida, flush=True)
+        engine.iniciar()
+    else:
+        # Os workers começam já no primeiro lote, enquanto o restante é lido e analisado
+        resumo = engine.importar(urls, formato_csv, alvos=alvos, iniciar=True)
+        resultado[STATUS_IGNORADO] += resumo['descartados']
+        resultado[STATUS_ERRO] += resumo['invalidas'] + resumo['erros']
+
+    engine.aguardar()
+    engine.encerrar()
+    print(f"Concluídos: {resultado[STATUS_CONCLUIDO]} | Já baixados: {resultado[STATUS_IGNORADO]} | "
+          f"Erros: {resultado[STATUS_ERRO]}", file=saida, flush=True)
+    if cache is not None:
+        estatisticas = cache.estatisticas()
+        print(f"Cache de metadados: {estatisticas['hits']} acertos, {estatisticas['misses']} faltas",
+              file=saida, flush=True)
+    if metricas is not None:
+        engine._exportar_metricas()
+        print("Tempos por fase:", file=saida)
+        print(metricas.formatar_resumo(), file=saida, flush=True)
+    return 0 if resultado[STATUS_ERRO] == 0 else 1
@@ -0,0 +1,129 @@
+# YouTube MP3 Downloader PRO - Download de um arquivo por várias conexões (faixas de bytes via HTTP Range)
+
+# --------------------------------------------------------------------------------------------------
+# 1. Importações de Módulos
+# --------------------------------------------------------------------------------------------------
+import math
+import threading
+
+# --------------------------------------------------------------------------------------------------
+# 2. Configurações Globais
+# --------------------------------------------------------------------------------------------------
+# O tamanho da faixa depende só do tamanho do arquivo (nunca do número de conexões), para que
+# um download pausado continue com as mesmas faixas registradas no .ytdl
+FAIXAS_POR_ARQUIVO = 32
+FAIXA_MIN_BYTES = 1024 * 1024
+FAIXA_MAX_BYTES = 8 * 1024 * 1024 # O YouTube limita a velocidade de requisições acima de ~10 MB
+PROTOCOLOS_DIVISIVEIS = ('http', 'https')
+PROTOCOLO_FAIXAS = 'faixas_http' # Registrado no yt-dlp por registrar_protocolo()
+
+# Parâmetros próprios repassados ao yt-dlp junto com as opções de cada download
+PARAM_DIVIDIR = 'dividir_em_faixas'
+
+# --------------------------------------------------------------------------------------------------
+# 3. Divisão em Faixas
+# --------------------------------------------------------------------------------------------------
+def tamanho_faixa(tamanho_arquivo):
+    """Tamanho, em bytes, de cada faixa de um arquivo de `tamanho_arquivo` bytes."""
+    faixa = math.ceil(tamanho_arquivo / FAIXAS_POR_ARQUIVO)
+    return max(FAIXA_MIN_BYTES, min(FAIXA_MAX_BYTES, faixa))
+
+def divisivel(formato):
+    """True se o formato é um único arquivo HTTP de tamanho conhecido e grande o bastante."""
+    tamanho = formato.get('filesize')
+    return (formato.get('protocol') in PROTOCOLOS_DIVISIVEIS and not formato.get('fragments')
+            and not formato.get('is_live') and bool(formato.get('url'))
+            and isinstance(tamanho, int) and tamanho >= 2 * FAIXA_MIN_BYTES)
+
+def dividir_em_faixas(formato):
+    """Reescreve um formato HTTP como uma lista de faixas de bytes (in place).
+
+    Cada fragmento é a mesma URL com um cabeçalho Range. Os fragmentos são baixados em
+    paralelo (até `concurrent_fragment_downloads`) para arquivos temporários e anexados ao
+    .part em ordem, um de cada vez: a memória usada é limitada ao tamanho de uma faixa.
+    """
+    tamanho = formato['filesize']
+    passo = tamanho_faixa(tamanho)
+    formato['fragments'] = [
+        {'url': formato['url'], 'byte_range': {'start': inicio, 'end': min(inicio + passo, tamanho)}}
+        for inicio in range(0, tamanho, passo)]
+    formato['protocol'] = PROTOCOLO_FAIXAS
+    formato.pop('downloader_options', None) # http_chunk_size não se aplica aos fragmentos
+    return formato
+
+def registrar_protocolo(yt_dlp):
+    """Registra no yt-dlp o downloader de PROTOCOLO_FAIXAS. Pode ser chamada mais de uma vez.
+
+    É o downloader de segmentos DASH do yt-dlp (threads, .ytdl para retomar, progresso
+    somado entre as faixas), repassando a faixa de bytes de cada fragmento, que o DASH
+    ignora.
+    """
+    mapa = yt_dlp.downloader.PROTOCOL_MAP
+    if PROTOCOLO_FAIXAS in mapa:
+        return
+
+    class DownloaderFaixas(yt_dlp.downloader.DashSegmentsFD):
+        FD_NAME = 'faixas'
+
+        def _get_fragments(self, fmt, ctx, extra_query):
+            for fragmento in super()._get_fragments(fmt, ctx, extra_query):
+                fragmento['byte_range'] = fmt['fragments'][fragmento['index']]['byte_range']
+                yield fragmento
+
+    mapa[PROTOCOLO_FAIXAS] = DownloaderFaixas
+
+class DivisorFaixas:
+    """Etapa 'before_dl' do yt-dlp: divide em faixas os arquivos escolhidos para download.
+
+    Roda depois da seleção de formato, para não alterar a preferência do yt-dlp entre os
+    formatos, e só age quando o download atual pede (parâmetro PARAM_DIVIDIR). Com
+    vídeo + áudio separados, cada um é dividido por conta própria.
+    """
+
+    def __init__(self):
+        self._downloader = None
+
+    def set_downloader(self, downloader):
+        self._downloader = downloader
+
+    def add_progress_hook(self, hook):
+        pass # Não reporta progresso: a divisão é instantânea
+
+    def run(self, info):
+        if self._downloader is not None and self._downloader.params.get(PARAM_DIVIDIR):
+            for formato in info.get('requested_formats') or [info]:
+                if divisivel(formato):
+                    dividir_em_faixas(formato)
+        return [], info
+
+# --------------------------------------------------------------------------------------------------
+# 4. Limite Global de Conexões
+# --------------------------------------------------------------------------------------------------
+class LimiteConexoes:
+    """Reparte um total de conexões entre os downloads simultâneos.
+
+    Cada download reserva até `por_item` conexões entre as livres no momento em que começa
+    e as devolve ao terminar. Um download sempre recebe ao menos uma conexão, mesmo com o
+    total esgotado, para que a fila nunca trave esperando conexões.
+    """
+
+    def __init__(self, por_item, total):
+        self.por_item = max(1, int(por_item))
+        self.total = max(1, int(total))
+        self._em_uso = 0
+        self._lock = threading.Lock()
+
+    def reservar(self):
+        with self._lock:
+            conexoes = max(1, min(self.por_item, self.total - self._em_uso))
+            self._em_uso += conexoes
+            return conexoes
+
+    def liberar(self, conexoes):
+        with self._lock:
+            self._em_uso = max(0, self._em_uso - conexoes)
+
+    @property
+    def em_uso(self):
+        with self._lock:
+            return self._em_uso
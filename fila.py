@@ -0,0 +1,186 @@
+# YouTube MP3 Downloader PRO - Estrutura da fila de downloads
+
+# --------------------------------------------------------------------------------------------------
+# 1. Importações de Módulos
+# --------------------------------------------------------------------------------------------------
+import heapq
+import itertools
+
+# --------------------------------------------------------------------------------------------------
+# 2. Status dos Itens
+# --------------------------------------------------------------------------------------------------
+STATUS_PENDENTE = "Pendente"
+STATUS_BAIXANDO = "Baixando..."
+STATUS_CONVERTENDO = "Convertendo..." # Baixado; aguardando/executando o FFmpeg no pool de CPU
+STATUS_MOVENDO = "Movendo..." # Pronto na pasta temporária; sendo copiado para a pasta de destino
+STATUS_CONCLUIDO = "Concluído"
+STATUS_ERRO = "Erro"
+STATUS_IGNORADO = "Já baixado" # Encontrado no índice de downloads; não é baixado de novo
+STATUS_CANCELADO = "Cancelado"
+STATUS_PAUSADO = "Pausado" # Interrompido no meio do download; continua do arquivo .part
+STATUS_RETENTATIVA = "Aguardando nova tentativa" # Falha transitória; volta à fila após o backoff
+STATUS_EM_ANDAMENTO = (STATUS_BAIXANDO, STATUS_CONVERTENDO, STATUS_MOVENDO)
+STATUS_AGUARDANDO = (STATUS_PENDENTE, STATUS_PAUSADO) # Itens que um worker pode retirar da fila
+
+# --------------------------------------------------------------------------------------------------
+# 3. Item da Fila
+# --------------------------------------------------------------------------------------------------
+class FilaItem:
+    """Registro compacto de um item da fila (com __slots__, sem o dicionário por instância)."""
+
+    __slots__ = ('id', 'title', 'url', 'status', 'video_id', 'prioridade', 'seq', 'alvos',
+                 'progresso', 'velocidade', 'cancelado', 'pausado', 'tentativas', 'tempos', 'bytes',
+                 'parcial', 'arquivos_parciais')
+
+    def __init__(self, item_id, title, url, status=STATUS_PENDENTE, video_id=None, prioridade=0):
+        self.id = item_id
+        self.title = title
+        self.url = url
+        self.status = status
+        self.video_id = video_id
+        self.prioridade = prioridade # Menor valor = baixado antes
+        self.seq = 0 # Ordem de chegada, desempata itens com a mesma prioridade
+        self.alvos = None # [(formato, qualidade), ...] de um job com várias saídas; None = configuração atual
+        self.progresso = None
+        self.velocidade = None
+        self.cancelado = False
+        self.pausado = False # Download interrompido pela pausa da fila (volta para a fila)
+        self.tentativas = 0 # Novas tentativas já agendadas após falhas transitórias
+        self.tempos = {} # Marco ('enfileirado', 'download_inicio', ...) -> time.time()
+        self.bytes = 0 # Bytes baixados (soma dos arquivos do item)
+        self.parcial = 0 # Bytes já em disco (arquivos concluídos + .part atual), para retomar
+        self.arquivos_parciais = set() # Arquivos .part criados pelo yt-dlp para este item
+
+    def __repr__(self):
+        return f"FilaItem(id={self.id!r}, title={self.title!r}, status={self.status!r})"
+
+# --------------------------------------------------------------------------------------------------
+# 4. Fila Indexada com Prioridade
+# --------------------------------------------------------------------------------------------------
+class FilaIndexada:
+    """Fila de prioridade (heap) indexada pelo id do item.
+
+    - inserção e retirada do próximo pendente em O(log n);
+    - busca, cancelamento e mudança de prioridade por id em O(1) (+ O(log n) no heap);
+    - deduplicação por id de vídeo com um dicionário.
+
+    Entradas do heap que ficaram obsoletas (item removido ou com nova prioridade) são
+    descartadas preguiçosamente na retirada. Não é thread-safe: o motor a protege com
+    seu próprio lock.
+    """
+
+    def __init__(self):
+        self._heap = [] # (prioridade, seq, id)
+        self._itens = {} # id -> FilaItem
+        self._por_video = {} # id do vídeo -> id do item
+        self._pendentes = 0
+        self._seq = itertools.count()
+        self._topo = 0 # Menor prioridade já atribuída (usada por mover_para_topo)
+
+    def __len__(self):
+        return len(self._itens)
+
+    def __bool__(self):
+        return bool(self._itens)
+
+    def __iter__(self):
+        return iter(self.itens_ordenados())
+
+    @property
+    def pendentes(self):
+        """Número de itens aguardando download, em O(1)."""
+        return self._pendentes
+
+    def obter(self, item_id):
+        return self._itens.get(item_id)
+
+    def contem_video(self, video_id):
+        return video_id is not None and video_id in self._por_video
+
+    def adicionar(self, item, prioridade=None):
+        """Insere um item. Retorna False se o id ou o vídeo já estiverem na fila."""
+        if item.id in self._itens or self.contem_video(item.video_id):
+            return False
+        if prioridade is not None:
+            item.prioridade = prioridade
+        self._topo = min(self._topo, item.prioridade)
+        item.seq = next(self._seq)
+        self._itens[item.id] = item
+        if item.video_id is not None:
+            self._por_video[item.video_id] = item.id
+        if item.status in STATUS_AGUARDANDO:
+            self._pendentes += 1
+            heapq.heappush(self._heap, (item.prioridade, item.seq, item.id))
+        return True
+
+    def retirar_proximo(self, novo_status):
+        """Retira o pendente (ou pausado) de maior prioridade, marcando-o com `novo_status`. None se não houver."""
+        while self._heap:
+            prioridade, seq, item_id = heapq.heappop(self._heap)
+            item = self._itens.get(item_id)
+            if (item is None or item.status not in STATUS_AGUARDANDO
+                    or item.prioridade != prioridade or item.seq != seq):
+                continue # Entrada obsoleta
+            item.status = novo_status
+            self._pendentes -= 1
+            return item
+        return None
+
+    def remover(self, item_id):
+        """Remove um item (pendente ou não) pelo id e o retorna, ou None."""
+        item = self._itens.pop(item_id, None)
+        if item is None:
+            return None
+        if item.video_id is not None and self._por_video.get(item.video_id) == item_id:
+            del self._por_video[item.video_id]
+        if item.status in STATUS_AGUARDANDO:
+            self._pendentes -= 1
+        self._compactar()
+        return item
+
+    def devolver(self, item_id, status=STATUS_PAUSADO):
+        """Devolve à fila um item em andamento (ou aguardando nova tentativa), na mesma posição
+        de antes. Retorna o item, ou None."""
+        item = self._itens.get(item_id)
+        if item is None or (item.status not in STATUS_EM_ANDAMENTO and item.status != STATUS_RETENTATIVA):
+            return None
+        item.status = status
+        self._pendentes += 1
+        heapq.heappush(self._heap, (item.prioridade, item.seq, item_id))
+        return item
+
+    def remover_pendentes(self):
+        """Remove todos os itens que não estão em andamento. Retorna os itens removidos."""
+        removidos = [item for item in self._itens.values() if item.status not in STATUS_EM_ANDAMENTO]
+        for item in removidos:
+            self.remover(item.id)
+        self._heap = []
+        return removidos
+
+    def definir_prioridade(self, item_id, prioridade):
+        """Muda a prioridade de um item pendente. Retorna o item, ou None se não for pendente."""
+        item = self._itens.get(item_id)
+        if item is None or item.status not in STATUS_AGUARDANDO:
+            return None
+        item.prioridade = prioridade
+        item.seq = next(self._seq)
+        self._topo = min(self._topo, prioridade)
+        heapq.heappush(self._heap, (prioridade, item.seq, item_id))
+        self._compactar()
+        return item
+
+    def mover_para_topo(self, item_id):
+        """Coloca um item pendente à frente de todos os outros."""
+        return self.definir_prioridade(item_id, self._topo - 1)
+
+    def itens_ordenados(self):
+        """Todos os itens na ordem de exibição: em andamento primeiro, depois por prioridade. O(n log n)."""
+        return sorted(self._itens.values(),
+                      key=lambda item: (item.status in STATUS_AGUARDANDO, item.prioridade, item.seq))
+
+    def _compactar(self):
+        """Reconstrói o heap quando as entradas obsoletas passam a dominar."""
+        if len(self._heap) > 2 * self._pendentes + 64:
+            self._heap = [(item.prioridade, item.seq, item.id) for item in self._itens.values()
+                          if item.status in STATUS_AGUARDANDO]
+            heapq.heapify(self._heap)
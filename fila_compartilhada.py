@@ -0,0 +1,402 @@
+# YouTube MP3 Downloader PRO - Fila compartilhada entre vários processos/máquinas (pasta com leases)
+
+# --------------------------------------------------------------------------------------------------
+# 1. Importações de Módulos
+# --------------------------------------------------------------------------------------------------
+import os
+import json
+import time
+import uuid
+import socket
+import hashlib
+import threading
+import contextlib
+
+from fila import STATUS_CONCLUIDO, STATUS_ERRO, STATUS_IGNORADO, STATUS_CANCELADO
+from importacao import ENTRADA_VIDEO, entradas_importadas
+
+# --------------------------------------------------------------------------------------------------
+# 2. Configurações Globais
+# --------------------------------------------------------------------------------------------------
+LEASE_TTL_S = 60.0 # Sem batimento por esse tempo, o item de um worker é considerado abandonado
+BATIMENTOS_POR_TTL = 4 # Renovações dos leases dentro de um TTL (tolera algumas perdidas)
+CONSULTA_S = 2.0 # Intervalo entre as buscas por itens novos ou abandonados
+RECUPERACOES_MAX = 3 # Workers que podem morrer com o mesmo item antes de ele virar "Erro"
+
+PASTA_ITENS = 'itens' # Um JSON por item ainda não concluído
+PASTA_LEASES = 'leases' # Um arquivo por item em andamento: quem o pegou (o mtime é o último batimento)
+PASTA_CHAVES = 'chaves' # Um marcador por vídeo já enfileirado: evita repetidos entre os produtores
+PASTA_CONCLUIDOS = 'concluidos' # O resultado de cada item finalizado
+SUFIXO_LEASE = '.lease'
+SUFIXO_RECUPERACAO = '.recuperacao' # Marcador de quem venceu a recuperação de um lease vencido
+STATUS_FINAIS = (STATUS_CONCLUIDO, STATUS_ERRO, STATUS_IGNORADO)
+
+# --------------------------------------------------------------------------------------------------
+# 3. Pasta da Fila
+# --------------------------------------------------------------------------------------------------
+def _gravar_json(caminho, dados):
+    """Grava um JSON sem que outro processo leia o arquivo pela metade (temporário + rename)."""
+    pasta, nome = os.path.split(caminho)
+    temporario = os.path.join(pasta, f".{nome}.{uuid.uuid4().hex[:8]}.tmp")
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+def _ler_json(caminho):
+    with open(caminho, encoding='utf-8') as f:
+        return json.load(f)
+
+class FilaCompartilhada:
+    """Fila de downloads em uma pasta compartilhada (disco local ou de rede) por vários workers.
+
+    Cada item é um arquivo em `itens/`, nomeado pela ordem de chegada. Para pegar um item,
+    o worker cria o seu lease em `leases/` com O_EXCL, que só um processo consegue criar;
+    enquanto trabalha, renova o mtime do lease (batimento). Um lease sem batimento há mais
+    de `ttl` segundos pertence a um worker que morreu: outro worker o recupera (um marcador
+    criado com O_EXCL decide quem vence) e refaz o item. Ao terminar, o resultado vai para
+    `concluidos/` e o item e o lease são apagados. Só usa operações atômicas também em NFS
+    e SMB (criação exclusiva e rename); os relógios das máquinas devem estar sincronizados
+    com folga bem menor que o TTL.
+    """
+
+    def __init__(self, pasta, ttl=LEASE_TTL_S, dono=None):
+        self.pasta = pasta
+        self.ttl = ttl
+        # Identifica este worker nos leases e nos resultados
+        self.dono = dono or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._recuperacoes = {} # id -> vezes que o item foi retomado de um worker que morreu
+        for nome in (PASTA_ITENS, PASTA_LEASES, PASTA_CHAVES, PASTA_CONCLUIDOS):
+            os.makedirs(os.path.join(pasta, nome), exist_ok=True)
+
+    def _caminho(self, subpasta, nome):
+        return os.path.join(self.pasta, subpasta, nome)
+
+    def _lease(self, item_id):
+        return self._caminho(PASTA_LEASES, item_id + SUFIXO_LEASE)
+
+    def _ids_itens(self):
+        with contextlib.suppress(FileNotFoundError):
+            return sorted(nome[:-5] for nome in os.listdir(os.path.join(self.pasta, PASTA_ITENS))
+                          if nome.endswith('.json') and not nome.startswith('.'))
+        return []
+
+    # ---------------------------------------------------------------- Produtores
+    def enfileirar(self, entradas, alvos=None):
+        """Adiciona entradas (título, (tipo, chave, url)) à fila. Retorna quantas eram novas.
+
+        Um vídeo (ou playlist) que já passou por esta fila, por qualquer produtor, não entra
+        de novo: o marcador em `chaves/` é criado com O_EXCL antes do item.
+        """
+        novos = 0
+        for titulo, (tipo, chave, url) in entradas:
+            marcador = hashlib.sha1(f"{tipo}:{chave}".encode('utf-8')).hexdigest()
+            try:
+                os.close(os.open(self._caminho(PASTA_CHAVES, marcador), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            except FileExistsError:
+                continue
+            item_id = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}" # Ordem de chegada entre máquinas
+            _gravar_json(self._caminho(PASTA_ITENS, item_id + '.json'),
+                         {'tipo': tipo, 'chave': chave, 'url': url, 'titulo': titulo,
+                          'alvos': [list(alvo) for alvo in alvos] if alvos else None, 'recuperacoes': 0})
+            novos += 1
+        return novos
+
+    def importar(self, linhas, formato_csv=False, alvos=None):
+        """Enfileira os links de um arquivo de texto ou CSV (ver importacao.entradas_importadas).
+
+        Retorna {'lidas', 'enfileirados', 'duplicados', 'invalidas'}.
+        """
+        resumo = dict.fromkeys(('lidas', 'enfileirados', 'duplicados', 'invalidas'), 0)
+        for titulo, entrada in entradas_importadas(linhas, formato_csv):
+            resumo['lidas'] += 1
+            if entrada is None:
+                resumo['invalidas'] += 1
+            elif self.enfileirar([(titulo, entrada)], alvos):
+                resumo['enfileirados'] += 1
+            else:
+                resumo['duplicados'] += 1
+        return resumo
+
+    # ---------------------------------------------------------------- Workers
+    def _criar_lease(self, item_id):
+        try:
+            fd = os.open(self._lease(item_id), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(self.dono)
+        return True
+
+    def _recuperar_lease(self, item_id):
+        """Toma o lease vencido de um worker que parou de bater. Retorna True se este worker venceu."""
+        lease = self._lease(item_id)
+        try:
+            vencido = os.stat(lease)
+        except FileNotFoundError:
+            return False
+        if time.time() - vencido.st_mtime <= self.ttl:
+            return False
+        # Vários workers podem ver o mesmo lease vencido. O marcador desta versão do lease (inode e
+        # mtime) é criado com O_EXCL: só um vence, mesmo que os outros só cheguem depois que o
+        # vencedor já pôs o próprio lease no lugar (um rename do lease roubaria o novo)
+        marcador = self._caminho(PASTA_LEASES,
+                                 f".{item_id}.{vencido.st_ino}-{vencido.st_mtime_ns}{SUFIXO_RECUPERACAO}")
+        try:
+            os.close(os.open(marcador, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+        try:
+            atual = os.stat(lease)
+        except FileNotFoundError: # Devolvido nesse meio tempo
+            return self._criar_lease(item_id)
+        if (atual.st_ino, atual.st_mtime_ns) != (vencido.st_ino, vencido.st_mtime_ns):
+            return False # O dono voltou a bater, ou outro worker pegou o item devolvido
+        novo = self._caminho(PASTA_LEASES, f".{item_id}.{uuid.uuid4().hex[:8]}.tmp")
+        with open(novo, 'w', encoding='utf-8') as f:
+            f.write(self.dono)
+        os.replace(novo, lease)
+        return True
+
+    def reivindicar(self, n, ignorar=()):
+        """Pega até `n` itens livres ou abandonados, na ordem de chegada.
+
+        Retorna uma lista de dicts com o conteúdo de cada item e seu 'id'. Itens em
+        `ignorar` (os que este worker já tem) são pulados. Um item abandonado mais de
+        RECUPERACOES_MAX vezes é concluído como "Erro" em vez de ser refeito.
+        """
+        pegos = []
+        for item_id in self._ids_itens():
+            if len(pegos) >= n:
+                break
+            if item_id in ignorar:
+                continue
+            recuperado = False
+            if not self._criar_lease(item_id):
+                recuperado = self._recuperar_lease(item_id)
+                if not recuperado:
+                    continue
+            try:
+                item = _ler_json(self._caminho(PASTA_ITENS, item_id + '.json'))
+            except (FileNotFoundError, ValueError):
+                self.liberar(item_id) # Concluído por outro worker entre a listagem e o lease
+                continue
+            if os.path.exists(self._caminho(PASTA_CONCLUIDOS, item_id + '.json')):
+                self._apagar(item_id) # O worker anterior morreu depois de gravar o resultado
+                continue
+            if recuperado:
+                item['recuperacoes'] = item.get('recuperacoes', 0) + 1
+                if item['recuperacoes'] > RECUPERACOES_MAX:
+                    self.concluir(item_id, STATUS_ERRO, mensagem=f"abandonado por {RECUPERACOES_MAX} workers")
+                    continue
+                _gravar_json(self._caminho(PASTA_ITENS, item_id + '.json'), item)
+            if item.get('recuperacoes'):
+                self._recuperacoes[item_id] = item['recuperacoes']
+            item['id'] = item_id
+            pegos.append(item)
+        return pegos
+
+    def renovar(self, ids):
+        """Batimento: renova os leases dos itens `ids`. Retorna os que este worker perdeu."""
+        perdidos = []
+        for item_id in ids:
+            lease = self._lease(item_id)
+            try:
+                with open(lease, encoding='utf-8') as f:
+                    dono = f.read()
+                if dono != self.dono:
+                    perdidos.append(item_id) # Recuperado por outro worker depois de um batimento atrasado
+                    continue
+                os.utime(lease)
+            except FileNotFoundError:
+                perdidos.append(item_id)
+        return perdidos
+
+    def concluir(self, item_id, status, **dados):
+        """Grava o resultado de um item deste worker e o retira da fila."""
+        _gravar_json(self._caminho(PASTA_CONCLUIDOS, item_id + '.json'),
+                     {'status': status, 'dono': self.dono, 'fim': time.time(),
+                      'recuperacoes': self._recuperacoes.pop(item_id, 0), **dados})
+        self._apagar(item_id)
+
+    def _apagar(self, item_id):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._caminho(PASTA_ITENS, item_id + '.json'))
+        self.liberar(item_id)
+        with contextlib.suppress(FileNotFoundError):
+            for nome in os.listdir(os.path.join(self.pasta, PASTA_LEASES)):
+                if nome.startswith(f".{item_id}.") and nome.endswith(SUFIXO_RECUPERACAO):
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(self._caminho(PASTA_LEASES, nome))
+
+    def liberar(self, item_id):
+        """Devolve um item à fila sem concluí-lo (outro worker pode pegá-lo na hora)."""
+        lease = self._lease(item_id)
+        with contextlib.suppress(OSError):
+            with open(lease, encoding='utf-8') as f:
+                if f.read() != self.dono:
+                    return
+            os.remove(lease)
+
+    def vazia(self):
+        """True se não há nenhum item pendente nem em andamento em nenhum worker."""
+        return not self._ids_itens()
+
+    def resumo(self):
+        """Contagem dos itens por situação: pendentes, em andamento e por status final."""
+        itens = self._ids_itens()
+        em_andamento = sum(nome.endswith(SUFIXO_LEASE) and not nome.startswith('.')
+                           for nome in os.listdir(os.path.join(self.pasta, PASTA_LEASES)))
+        contagem = {'pendentes': max(len(itens) - em_andamento, 0), 'em_andamento': em_andamento}
+        for nome in os.listdir(os.path.join(self.pasta, PASTA_CONCLUIDOS)):
+            if nome.endswith('.json') and not nome.startswith('.'):
+                with contextlib.suppress(OSError, ValueError):
+                    status = _ler_json(self._caminho(PASTA_CONCLUIDOS, nome))['status']
+                    contagem[status] = contagem.get(status, 0) + 1
+        return contagem
+
+# --------------------------------------------------------------------------------------------------
+# 4. Worker
+# --------------------------------------------------------------------------------------------------
+class TrabalhadorDistribuido:
+    """Alimenta um DownloadEngine com itens da fila compartilhada e devolve os resultados a ela.
+
+    Mantém no motor no máximo `max_workers` itens da fila compartilhada (o resto fica
+    disponível para os outros workers); cada item concluído abre vaga para o próximo.
+    Uma thread renova os leases enquanto os itens estão na fila local, sendo baixados,
+    aguardando nova tentativa, em conversão ou, no caso das playlists, em análise. Um item
+    cujo lease foi perdido é cancelado no motor. Playlists e links de outros sites são
+    analisados pelo worker que os pega, e os vídeos encontrados voltam para a fila
+    compartilhada.
+    """
+
+    def __init__(self, engine, fila, consulta_s=CONSULTA_S, ao_erro=None):
+        self.engine = engine
+        self.fila = fila
+        self.consulta_s = consulta_s
+        self.ao_erro = ao_erro # Recebe a mensagem dos erros de análise (os de download vêm do motor)
+        self.resultado = {STATUS_CONCLUIDO: 0, STATUS_ERRO: 0, STATUS_IGNORADO: 0}
+        self._locais = {} # id do item no motor -> id na fila compartilhada
+        self._analisando = set() # Ids na fila compartilhada das playlists em análise
+        self._lock = threading.Lock()
+        self._acordar = threading.Event() # Um item terminou: há vaga para pegar o próximo
+        self._parar = threading.Event()
+
+    def _em_andamento(self):
+        with self._lock:
+            return set(self._locais.values()) | self._analisando
+
+    def _on_evento(self, evento):
+        tipo = evento['tipo']
+        if tipo == 'item_status' and evento['item'].status in STATUS_FINAIS + (STATUS_CANCELADO,):
+            item = evento['item']
+            with self._lock:
+                item_id = self._locais.pop(item.id, None)
+            if item_id is None:
+                return
+            if item.status == STATUS_CANCELADO:
+                self.fila.liberar(item_id)
+            else:
+                self._concluir(item_id, item.status)
+            self._acordar.set()
+        elif tipo == 'item_removido':
+            with self._lock:
+                item_id = self._locais.pop(evento['item'].id, None)
+            if item_id is not None:
+                self.fila.liberar(item_id)
+                self._acordar.set()
+
+    def _concluir(self, item_id, status):
+        self.fila.concluir(item_id, status)
+        self.resultado[status] = self.resultado.get(status, 0) + 1
+
+    def _batimentos(self):
+        """Thread que renova os leases; itens perdidos para outro worker são cancelados no motor."""
+        while not self._parar.wait(self.fila.ttl / BATIMENTOS_POR_TTL):
+            for perdido in self.fila.renovar(self._em_andamento()):
+                with self._lock:
+                    self._analisando.discard(perdido) # A análise termina, mas sem renovar o lease
+                    locais = [local for local, item_id in self._locais.items() if item_id == perdido]
+                    for local in locais:
+                        del self._locais[local]
+                for local in locais:
+                    self.engine.cancelar(local)
+
+    def _processar(self, item):
+        """Entrega ao motor um item recém-pego da fila compartilhada."""
+        alvos = [tuple(alvo) for alvo in item['alvos']] if item.get('alvos') else None
+        if item['tipo'] != ENTRADA_VIDEO:
+            self._analisar(item, alvos)
+            return
+        # O lock cobre a adição: o item pode terminar (já baixado) antes de ser mapeado
+        with self._lock:
+            locais = self.engine.adicionar_lote([(item.get('titulo') or item['url'], item['url'], item['chave'])],
+                                                alvos)
+            if locais:
+                self._locais[locais[0].id] = item['id']
+        if locais:
+            self.engine.iniciar()
+        else:
+            self._concluir(item['id'], STATUS_IGNORADO) # No índice de downloads desta máquina
+
+    def _analisar(self, item, alvos):
+        """Expande uma playlist (ou link de outro site) em vídeos na fila compartilhada."""
+        def ao_lote(lote, encontrados):
+            self.fila.enfileirar([(titulo, (ENTRADA_VIDEO, video_id or url, url))
+                                  for titulo, url, video_id in lote], alvos)
+        with self._lock: # Uma playlist grande leva mais que o TTL: os batimentos mantêm o lease
+            self._analisando.add(item['id'])
+        try:
+            info, encontrados = self.engine.extrair_playlist(item['url'], ao_lote)
+            if encontrados is None:
+                if not info:
+                    raise ValueError("nenhum vídeo encontrado")
+                ao_lote([(info.get('title'), item['url'], info.get('id'))], 1)
+        except Exception as e:
+            self.fila.concluir(item['id'], STATUS_ERRO, mensagem=str(e))
+            self.resultado[STATUS_ERRO] += 1
+            if self.ao_erro is not None:
+                self.ao_erro(f"🔴 Erro ao analisar {item['url']}: {e}")
+            return
+        finally:
+            with self._lock:
+                self._analisando.discard(item['id'])
+        self.fila.concluir(item['id'], STATUS_CONCLUIDO, encontrados=encontrados or 1)
+
+    def executar(self):
+        """Trabalha até a fila compartilhada esvaziar (ou até `parar`). Bloqueante.
+
+        Ao ser interrompido, ou se o motor for pausado (por exemplo, sem espaço em disco),
+        devolve à fila os itens que não terminou, para que outro worker os pegue sem
+        esperar o TTL. Retorna a contagem dos itens finalizados por este worker, por status.
+        """
+        self.engine.subscribe(self._on_evento)
+        batimentos = threading.Thread(target=self._batimentos, daemon=True)
+        batimentos.start()
+        try:
+            while not self._parar.is_set():
+                self._acordar.clear()
+                if self.engine.pausado and not self.engine.pausado_pelo_disjuntor:
+                    break # O disjuntor religa o motor sozinho; as outras pausas não
+                em_andamento = self._em_andamento()
+                vagas = self.engine.max_workers - len(em_andamento)
+                if vagas > 0 and not self.engine.pausado:
+                    for item in self.fila.reivindicar(vagas, ignorar=em_andamento):
+                        self._processar(item)
+                if not self._em_andamento() and self.fila.vazia():
+                    break
+                self._acordar.wait(self.consulta_s)
+        finally:
+            self._parar.set()
+            batimentos.join()
+            self.engine.unsubscribe(self._on_evento)
+            if self._em_andamento():
+                if self.engine.pausar():
+                    self.engine.aguardar(timeout=self.fila.ttl / BATIMENTOS_POR_TTL)
+                for item_id in self._em_andamento():
+                    self.fila.liberar(item_id)
+        return self.resultado
+
+    def parar(self):
+        """Pede que `executar` termine (de outra thread)."""
+        self._parar.set()
+        self._acordar.set()
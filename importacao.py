@@ -0,0 +1,115 @@
+# YouTube MP3 Downloader PRO - Importação de URLs em massa (arquivo de texto, CSV ou área de transferência)
+
+# --------------------------------------------------------------------------------------------------
+# 1. Importações de Módulos
+# --------------------------------------------------------------------------------------------------
+import re
+import csv
+import itertools
+
+from archive import extrair_video_id
+
+# --------------------------------------------------------------------------------------------------
+# 2. Configurações Globais
+# --------------------------------------------------------------------------------------------------
+IMPORTACAO_LOTE = 1000 # Vídeos por escrita no diário (e por evento 'itens_adicionados')
+
+ENTRADA_VIDEO = 'video' # Vídeo do YouTube: entra direto na fila, sem consultar a rede
+ENTRADA_PLAYLIST = 'playlist' # Playlist do YouTube: analisada depois, como pelo botão "Adicionar Playlist"
+ENTRADA_URL = 'url' # Link de outro site suportado pelo yt-dlp: analisado depois, um a um
+
+URL_VIDEO = "https://www.youtube.com/watch?v={}"
+URL_PLAYLIST = "https://www.youtube.com/playlist?list={}"
+
+_ID_VIDEO_RE = re.compile(r'[0-9A-Za-z_-]{11}')
+_YOUTUBE_RE = re.compile(r'(?:https?://)?(?:[\w-]+\.)*(?:youtube\.com|youtu\.be|youtube-nocookie\.com)/', re.IGNORECASE)
+_NOCOOKIE_RE = re.compile(r'youtube-nocookie\.com/embed/([0-9A-Za-z_-]{11})', re.IGNORECASE)
+_PLAYLIST_RE = re.compile(r'[?&]list=([0-9A-Za-z_-]+)')
+_URL_RE = re.compile(r'https?://[^\s/]+', re.IGNORECASE)
+_SEPARADORES_RE = re.compile(r'[\s,;|]+') # Em texto solto: vários links por linha
+DELIMITADORES_CSV = (',', ';', '\t') # O Excel em português grava com ';'
+
+# --------------------------------------------------------------------------------------------------
+# 3. Normalização
+# --------------------------------------------------------------------------------------------------
+def normalizar_entrada(texto, aceitar_id=True):
+    """(tipo, chave, url canônica) de um link ou id de vídeo; None se não for reconhecido.
+
+    Todas as formas de um mesmo vídeo (youtu.be, watch?v=, shorts, embed, m./music.,
+    com &list=, &t= ou &si=) viram o mesmo id e a mesma URL watch?v=. Um link de vídeo
+    dentro de uma playlist conta como o vídeo; só links sem vídeo contam como playlist.
+    Ids soltos (11 caracteres) só são aceitos com `aceitar_id`, já que uma palavra
+    qualquer de 11 letras também se parece com um id.
+    """
+    texto = texto.strip().strip('<>()[]"\'')
+    if aceitar_id and _ID_VIDEO_RE.fullmatch(texto):
+        return ENTRADA_VIDEO, texto, URL_VIDEO.format(texto)
+    if _YOUTUBE_RE.match(texto):
+        if not texto[:8].lower().startswith(('http://', 'https://')):
+            texto = "https://" + texto
+        video_id = extrair_video_id(texto)
+        if video_id is None:
+            nocookie = _NOCOOKIE_RE.search(texto)
+            video_id = nocookie.group(1) if nocookie else None
+        if video_id is not None:
+            return ENTRADA_VIDEO, video_id, URL_VIDEO.format(video_id)
+        lista = _PLAYLIST_RE.search(texto)
+        if lista is not None:
+            return ENTRADA_PLAYLIST, lista.group(1), URL_PLAYLIST.format(lista.group(1))
+        return None # Canal, busca, página inicial...
+    if _URL_RE.match(texto):
+        url = texto.split('#', 1)[0]
+        return ENTRADA_URL, url, url
+    return None
+
+# --------------------------------------------------------------------------------------------------
+# 4. Leitura
+# --------------------------------------------------------------------------------------------------
+def _delimitador(linha):
+    return max(DELIMITADORES_CSV, key=linha.count)
+
+def entradas_importadas(linhas, formato_csv=False):
+    """Gera (título, entrada normalizada ou None) para cada link das `linhas`, sem carregá-las.
+
+    Em texto solto, cada linha pode ter vários links (separados por espaço, vírgula ou
+    ponto e vírgula); linhas vazias e iniciadas por '#' são ignoradas, e uma linha sem
+    nenhum link reconhecido gera uma única entrada None. Em CSV, cada linha é um vídeo:
+    o link é a primeira célula reconhecida e o título, a primeira outra célula não vazia;
+    o delimitador vem da primeira linha, que é ignorada se for um cabeçalho.
+    """
+    linhas = iter(linhas)
+    if not formato_csv:
+        for linha in linhas:
+            linha = linha.strip()
+            if not linha or linha.startswith('#'):
+                continue
+            partes = _SEPARADORES_RE.split(linha)
+            # Um id solto só vale sozinho na linha, não no meio de um texto
+            entradas = [entrada for entrada in (normalizar_entrada(parte, len(partes) == 1) for parte in partes)
+                        if entrada is not None]
+            if not entradas:
+                yield None, None
+            for entrada in entradas:
+                yield None, entrada
+        return
+
+    primeira = next(linhas, None)
+    if primeira is None:
+        return
+    leitor = csv.reader(itertools.chain([primeira], linhas), delimiter=_delimitador(primeira))
+    for numero, celulas in enumerate(leitor):
+        celulas = [celula.strip() for celula in celulas]
+        if not any(celulas) or celulas[0].startswith('#'):
+            continue
+        entrada = None
+        # Links têm preferência sobre ids soltos: um título de 11 letras não deve virar o vídeo
+        for aceitar_id, (posicao, celula) in itertools.product((False, True), enumerate(celulas)):
+            entrada = normalizar_entrada(celula, aceitar_id) if celula else None
+            if entrada is not None:
+                break
+        if entrada is None:
+            if numero > 0: # Na primeira linha, é o cabeçalho
+                yield None, None
+            continue
+        titulo = next((celula for i, celula in enumerate(celulas) if celula and i != posicao), None)
+        yield titulo, entrada
@@ -0,0 +1,145 @@
+# YouTube MP3 Downloader PRO - Diário persistente da fila (SQLite em modo WAL)
+
+# --------------------------------------------------------------------------------------------------
+# 1. Importações de Módulos
+# --------------------------------------------------------------------------------------------------
+import json
+import sqlite3
+import threading
+import time
+
+# --------------------------------------------------------------------------------------------------
+# 2. Configurações Globais
+# --------------------------------------------------------------------------------------------------
+# Colunas acrescentadas depois da primeira versão do diário (migradas com ALTER TABLE)
+COLUNAS_NOVAS = {
+    'video_id': "TEXT", # Id do vídeo; nem sempre dá para deduzi-lo da URL (outros sites, ids informados)
+    'prioridade': "INTEGER NOT NULL DEFAULT 0",
+    'bytes_parciais': "INTEGER NOT NULL DEFAULT 0", # Bytes já em disco de um download pausado
+    'arquivos_parciais': "TEXT", # Lista JSON dos arquivos .part de um download pausado
+    'alvos': "TEXT", # Lista JSON de [formato, qualidade] de um item com várias saídas
+}
+
+# --------------------------------------------------------------------------------------------------
+# 3. Diário da Fila
+# --------------------------------------------------------------------------------------------------
+class FilaJournal:
+    """Registra em disco cada item da fila e suas mudanças de status.
+
+    Cada operação é uma escrita incremental (um INSERT ou UPDATE por item), nunca uma
+    regravação da fila inteira. O modo WAL com `synchronous=NORMAL` mantém as escritas
+    baratas e ainda garante que o diário sobreviva a um travamento do aplicativo.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # A conexão é compartilhada entre os workers; o acesso é serializado por self._lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS itens (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                title TEXT NOT NULL,
+                status TEXT NOT NULL,
+                atualizado_em REAL NOT NULL
+            )
+        """)
+        colunas = {linha[1] for linha in self._conn.execute("PRAGMA table_info(itens)")}
+        for coluna, definicao in COLUNAS_NOVAS.items():
+            if coluna not in colunas: # Diários criados por versões anteriores
+                self._conn.execute(f"ALTER TABLE itens ADD COLUMN {coluna} {definicao}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_itens_status ON itens(status)")
+
+    def registrar(self, url, title, status, video_id=None):
+        """Grava um novo item e retorna o id atribuído a ele."""
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO itens (url, title, status, atualizado_em, video_id) VALUES (?, ?, ?, ?, ?)",
+                (url, title, status, time.time(), video_id))
+            return cur.lastrowid
+
+    def registrar_lote(self, itens, status, alvos=None):
+        """Grava vários itens (url, título, id do vídeo) em uma única transação e retorna seus ids.
+
+        `alvos`, se informado, vale para todos os itens do lote: a lista de (formato,
+        qualidade) que cada um deve produzir.
+        """
+        agora = time.time()
+        alvos_json = json.dumps([list(alvo) for alvo in alvos]) if alvos else None
+        ids = []
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for url, title, video_id in itens:
+                    cur = self._conn.execute(
+                        "INSERT INTO itens (url, title, status, atualizado_em, alvos, video_id) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (url, title, status, agora, alvos_json, video_id))
+                    ids.append(cur.lastrowid)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return ids
+
+    def atualizar_status(self, item_id, status):
+        """Atualiza o status de um item já registrado."""
+        with self._lock:
+            self._conn.execute("UPDATE itens SET status = ?, atualizado_em = ? WHERE id = ?",
+                               (status, time.time(), item_id))
+
+    def atualizar_prioridade(self, item_id, prioridade):
+        """Grava a nova prioridade de um item (menor valor = baixado antes)."""
+        with self._lock:
+            self._conn.execute("UPDATE itens SET prioridade = ?, atualizado_em = ? WHERE id = ?",
+                               (prioridade, time.time(), item_id))
+
+    def atualizar_parcial(self, item_id, status, bytes_parciais, arquivos):
+        """Grava o status de um download interrompido e o que dele já está em disco."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE itens SET status = ?, bytes_parciais = ?, arquivos_parciais = ?, atualizado_em = ? "
+                "WHERE id = ?",
+                (status, bytes_parciais, json.dumps(sorted(arquivos)) if arquivos else None, time.time(), item_id))
+
+    def remover(self, item_ids):
+        """Apaga os itens informados do diário."""
+        with self._lock:
+            self._conn.executemany("DELETE FROM itens WHERE id = ?", [(i,) for i in item_ids])
+
+    def carregar_pendentes(self, status_pendentes, status_interrompidos, status_reinicio):
+        """Retorna (id, url, título, status, prioridade, bytes parciais, arquivos parciais, alvos,
+        id do vídeo) dos itens que ainda precisam ser baixados, ordenados por prioridade e ordem de inclusão.
+
+        Itens que estavam em andamento quando o aplicativo foi fechado são marcados com
+        `status_reinicio` antes de serem retornados. Itens já finalizados são descartados.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                marcadores = ",".join("?" * len(status_interrompidos))
+                self._conn.execute(
+                    f"UPDATE itens SET status = ?, atualizado_em = ? WHERE status IN ({marcadores})",
+                    (status_reinicio, time.time(), *status_interrompidos))
+                ativos = (*status_pendentes, status_reinicio)
+                marcadores = ",".join("?" * len(ativos))
+                self._conn.execute(f"DELETE FROM itens WHERE status NOT IN ({marcadores})", ativos)
+                linhas = self._conn.execute(
+                    "SELECT id, url, title, status, prioridade, bytes_parciais, arquivos_parciais, alvos, video_id "
+                    f"FROM itens WHERE status IN ({marcadores}) ORDER BY prioridade, id",
+                    ativos).fetchall()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [(*linha[:6], set(json.loads(linha[6])) if linha[6] else set(),
+                 [tuple(alvo) for alvo in json.loads(linha[7])] if linha[7] else None, linha[8])
+                for linha in linhas]
+
+    def fechar(self):
+        """Fecha a conexão com o banco de dados."""
+        with self._lock:
+            self._conn.close()
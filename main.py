@@ -3,54 +3,231 @@
 # --------------------------------------------------------------------------------------------------
 # 1. Importações de Módulos
 # --------------------------------------------------------------------------------------------------
-import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
+try:
+    import tkinter as tk
+    from tkinter import ttk, messagebox, filedialog
+except ImportError: # Python sem Tk (servidores, contêineres): só os modos de linha de comando funcionam
+    tk = None
 import os
 import threading
-import re
-import yt_dlp
-import json
+import argparse
+import multiprocessing
 import sys
 
+import engine
+from servico import ServidorMotor, MotorRemoto, ErroServico
+from fila_compartilhada import FilaCompartilhada, TrabalhadorDistribuido
+from journal import FilaJournal
+from archive import DownloadArchive
+from cache import MetadataCache
+from metricas import RegistroMetricas, FASES, PERCENTIS
+from engine import (DownloadEngine, APPLICATION_BASE_PATH, MIN_WORKERS, MAX_WORKERS,
+                    STATUS_BAIXANDO, STATUS_CONVERTENDO, STATUS_MOVENDO, STATUS_CONCLUIDO, STATUS_ERRO,
+                    STATUS_IGNORADO, STATUS_CANCELADO, STATUS_PAUSADO, STATUS_RETENTATIVA,
+                    STATUS_AGUARDANDO,
+                    format_bytes, format_eta)
+
 # --------------------------------------------------------------------------------------------------
 # 2. Configurações Globais e Carregamento Inicial
 # --------------------------------------------------------------------------------------------------
-CONFIG_PATH = 'config.json'
-DEFAULT_FOLDER = 'downloads_mp3' # Pasta padrão para downloads
 ICONS_SUBFOLDER_NAME = 'icons'
-
-# Determina o caminho base da aplicação para encontrar recursos (ícones, config.json)
-# Funciona tanto em modo de desenvolvimento quanto em executável PyInstaller
-if getattr(sys, 'frozen', False):
-    # Se estiver rodando como executável PyInstaller
-    APPLICATION_BASE_PATH = sys._MEIPASS
-else:
-    # Se estiver rodando como script Python
-    APPLICATION_BASE_PATH = os.path.dirname(os.path.abspath(__file__))
-
 ICONS_FULL_PATH = os.path.join(APPLICATION_BASE_PATH, ICONS_SUBFOLDER_NAME)
-CONFIG_FULL_PATH = os.path.join(APPLICATION_BASE_PATH, CONFIG_PATH)
-FFMPEG_PATH = os.path.join(APPLICATION_BASE_PATH, 'bin', 'ffmpeg.exe')
-FFPROBE_PATH = os.path.join(APPLICATION_BASE_PATH, 'bin', 'ffprobe.exe')
 
 # Carrega configurações ou define valores padrão
-initial_download_folder = os.path.join(APPLICATION_BASE_PATH, DEFAULT_FOLDER)
-initial_quality = "192kbps"
-initial_format_type = "MP3"
-
+config = engine.carregar_config()
+initial_download_folder = config['pasta']
+initial_quality = config['qualidade']
+initial_format_type = config['formato_tipo']
+initial_max_workers = engine.clamp_workers(config['downloads_simultaneos'])
+
+def criar_cache():
+    """Cria o cache de metadados com a validade e o tamanho definidos no config.json."""
+    return MetadataCache(engine.CACHE_FULL_PATH, ttl=config['cache_ttl_video'],
+                         max_bytes=config['cache_max_mb'] * 1024 * 1024)
+
+def criar_metricas(path_jsonl=None, path_prometheus=None):
+    """Cria o registro de tempos por fase; sem caminhos explícitos, segue o config.json."""
+    if path_jsonl is None and config['metricas_log']:
+        path_jsonl = engine.METRICAS_FULL_PATH
+    return RegistroMetricas(path_jsonl, path_prometheus or config['metricas_prometheus'] or None)
+
+def criar_motor(download_folder=None, format_type=None, quality=None, max_workers=None, **opcoes):
+    """Cria o motor de downloads com as configurações do config.json (as informadas têm precedência)."""
+    parametros = dict(cache_ttl_playlist=config['cache_ttl_playlist'],
+                      pipeline_conversao=config['pipeline_conversao'],
+                      max_tentativas=config['retentativas_max'],
+                      backoff_base=config['retentativa_base_s'],
+                      backoff_max=config['retentativa_max_s'],
+                      conexoes_por_item=config['conexoes_por_item'],
+                      conexoes_max=config['conexoes_max'],
+                      limite_banda_kbs=config['limite_banda_kbs'],
+                      peso_prioritario=config['banda_peso_prioritario'],
+                      pasta_temporaria=config['pasta_temporaria'],
+                      espaco_livre_min_mb=config['espaco_livre_min_mb'])
+    parametros.update(opcoes)
+    if parametros.get('metricas') is None:
+        parametros['metricas'] = criar_metricas()
+    return DownloadEngine(download_folder or initial_download_folder, format_type or initial_format_type,
+                          quality or initial_quality,
+                          max_workers if max_workers is not None else initial_max_workers, **parametros)
+
+TEXTO_AQUECENDO = "⏳ Preparando o motor de downloads..."
+PAUSA_AO_FECHAR_TIMEOUT = 3.0 # Segundos de espera para os downloads gravarem o estado ao fechar
+
+# Frequência (por segundo) com que a GUI redesenha o progresso dos downloads ativos
+PROGRESSO_HZ_PADRAO = 10
 try:
-    if os.path.exists(CONFIG_FULL_PATH):
-        with open(CONFIG_FULL_PATH, 'r') as f:
-            config = json.load(f)
-            initial_download_folder = config.get('pasta', initial_download_folder)
-            initial_quality = config.get('qualidade', initial_quality)
-            initial_format_type = config.get('formato_tipo', initial_format_type)
-except (json.JSONDecodeError, FileNotFoundError):
-    # Se o arquivo de configuração estiver corrompido ou não for encontrado, usa os valores padrão
-    pass
+    progresso_hz = max(1, min(60, int(config.get('progresso_hz', PROGRESSO_HZ_PADRAO))))
+except (TypeError, ValueError):
+    progresso_hz = PROGRESSO_HZ_PADRAO
+
+# --------------------------------------------------------------------------------------------------
+# 3. Componentes da Interface
+# --------------------------------------------------------------------------------------------------
+class FilaView:
+    """Exibição virtualizada e incremental da fila em uma Listbox.
+
+    A Listbox tem sempre apenas as linhas visíveis (uma "janela" sobre a fila); a barra de
+    rolagem é controlada aqui, com base no tamanho total da fila. Mudanças nos itens apenas
+    marcam a view como suja, e a renderização (agendada uma única vez com `after_idle`)
+    reescreve só as linhas visíveis cujo texto ou cor mudou. Assim o custo por atualização
+    não depende do tamanho da fila.
+    """
+
+    STATUS_CORES = {
+        STATUS_BAIXANDO: '#1E88E5', # Azul
+        STATUS_CONVERTENDO: '#8E24AA', # Roxo
+        STATUS_MOVENDO: '#00897B', # Verde-azulado
+        STATUS_CONCLUIDO: '#4CAF50', # Verde
+        STATUS_ERRO: '#E53935', # Vermelho
+        STATUS_IGNORADO: '#90A4AE', # Cinza
+        STATUS_CANCELADO: '#FB8C00', # Laranja
+        STATUS_PAUSADO: '#6D4C41', # Marrom
+        STATUS_RETENTATIVA: '#F9A825', # Amarelo
+    }
+    COR_PADRAO = '#333333' # "Pendente"
+
+    def __init__(self, listbox, scrollbar):
+        self.listbox = listbox
+        self.scrollbar = scrollbar
+        self.linhas_visiveis = int(listbox.cget('height'))
+        self._ordem = [] # Itens na ordem da fila
+        self._offset = 0 # Índice do primeiro item visível
+        self._cache = [None] * self.linhas_visiveis # (texto, cor) exibido em cada linha da Listbox
+        self._render_agendado = False
+
+        for _ in range(self.linhas_visiveis):
+            self.listbox.insert(tk.END, "")
+        self.scrollbar.config(command=self._on_scrollbar)
+        self.listbox.config(yscrollcommand="")
+        self.listbox.bind("<MouseWheel>", self._on_mousewheel)
+        self.listbox.bind("<Button-4>", lambda event: self._rolar(-3))
+        self.listbox.bind("<Button-5>", lambda event: self._rolar(3))
+
+    # ---------------------------------------------------------------- Modelo
+    def recarregar(self, itens):
+        """Substitui todo o conteúdo da view pelos itens informados."""
+        self._ordem = list(itens)
+        self._agendar_render()
+
+    def adicionar(self, itens):
+        self._ordem.extend(itens)
+        self._agendar_render()
+
+    def remover(self, item):
+        try:
+            pos = self._ordem.index(item) # Itens removidos costumam estar no início da fila
+        except ValueError:
+            return
+        del self._ordem[pos]
+        if pos < self._offset:
+            self._offset -= 1
+        self._agendar_render()
+
+    def mover_para_topo(self, item):
+        """Reposiciona um item logo após os downloads em andamento."""
+        try:
+            self._ordem.remove(item)
+        except ValueError:
+            return
+        destino = next((pos for pos, outro in enumerate(self._ordem) if outro.status in STATUS_AGUARDANDO),
+                       len(self._ordem))
+        self._ordem.insert(destino, item)
+        self._agendar_render()
+
+    def itens_selecionados(self):
+        """Itens correspondentes às linhas selecionadas na Listbox."""
+        itens = (self.item_na_linha(linha) for linha in self.listbox.curselection())
+        return [item for item in itens if item is not None]
+
+    def atualizar(self, item):
+        """Marca um item como alterado. Apenas linhas visíveis são de fato redesenhadas."""
+        self._agendar_render()
+
+    def item_na_linha(self, linha):
+        """Retorna o item exibido na linha `linha` da Listbox, ou None."""
+        pos = self._offset + linha
+        return self._ordem[pos] if 0 <= pos < len(self._ordem) else None
+
+    # ---------------------------------------------------------------- Rolagem
+    def _max_offset(self):
+        return max(len(self._ordem) - self.linhas_visiveis, 0)
+
+    def _rolar(self, linhas):
+        self._offset = max(0, min(self._offset + linhas, self._max_offset()))
+        self._agendar_render()
+        return "break" # Impede a rolagem nativa da Listbox
+
+    def _on_mousewheel(self, event):
+        return self._rolar(-1 if event.delta > 0 else 1)
+
+    def _on_scrollbar(self, acao, valor, unidade=None):
+        if acao == 'moveto':
+            self._offset = max(0, min(int(float(valor) * len(self._ordem)), self._max_offset()))
+            self._agendar_render()
+        elif acao == 'scroll':
+            passo = self.linhas_visiveis if unidade == 'pages' else 1
+            self._rolar(int(valor) * passo)
+
+    # ---------------------------------------------------------------- Renderização
+    def _agendar_render(self):
+        if not self._render_agendado:
+            self._render_agendado = True
+            self.listbox.after_idle(self._render)
+
+    def _texto_e_cor(self, pos):
+        if pos >= len(self._ordem):
+            return "", self.COR_PADRAO
+        item = self._ordem[pos]
+        texto = f"{pos+1}. {item.title} - {item.status}"
+        if item.status == STATUS_BAIXANDO and item.progresso is not None:
+            texto += f" {item.progresso:.1f}%"
+        elif item.status == STATUS_PAUSADO and item.parcial:
+            texto += f" ({format_bytes(item.parcial)} em disco)"
+        return texto, self.STATUS_CORES.get(item.status, self.COR_PADRAO)
+
+    def _render(self):
+        self._render_agendado = False
+        self._offset = min(self._offset, self._max_offset())
+        for linha in range(self.linhas_visiveis):
+            conteudo = self._texto_e_cor(self._offset + linha)
+            if self._cache[linha] == conteudo:
+                continue
+            selecionada = self.listbox.selection_includes(linha)
+            self.listbox.delete(linha)
+            self.listbox.insert(linha, conteudo[0])
+            self.listbox.itemconfig(linha, {'fg': conteudo[1]})
+            if selecionada:
+                self.listbox.selection_set(linha)
+            self._cache[linha] = conteudo
+        total = len(self._ordem)
+        if total <= self.linhas_visiveis:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self._offset / total, (self._offset + self.linhas_visiveis) / total)
 
 # --------------------------------------------------------------------------------------------------
-# 3. Classe Principal da Aplicação
+# 4. Classe Principal da Aplicação
 # --------------------------------------------------------------------------------------------------
 class YouTubeMP3Downloader:
     def __init__(self, root):
@@ -59,24 +236,31 @@ class YouTubeMP3Downloader:
         self.root.geometry("800x650") # Tamanho inicial da janela
         self.root.resizable(False, False) # Impede redimensionamento
         self.root.configure(bg='#ECEFF1') # Cor de fundo leve
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
 
-        self.fila = [] # Fila de URLs para download
-        self.em_processamento = False # Flag para indicar se há um download ativo
-        self.pausado = False # Flag para pausar/retomar a fila
-        self.download_folder = initial_download_folder
-        os.makedirs(self.download_folder, exist_ok=True) # Garante que a pasta exista
+        # O motor mantém a fila e os workers; a janela apenas exibe seus eventos.
+        # Os bancos SQLite e o yt-dlp do motor local são carregados depois que a janela aparece;
+        # antes disso, se houver um serviço no ar (--servico), a janela passa a usar o motor dele
+        self.engine = criar_motor()
+        self.remoto = False
+        self.engine.subscribe(self._on_engine_event)
+        self._pronto = threading.Event() # Sinalizado quando diário, índice e cache estão abertos
+        self._aquecido = threading.Event() # Sinalizado quando o yt-dlp já está carregado
 
         # Variáveis de controle para a GUI
         self.url_var = tk.StringVar()
-        self.status_var = tk.StringVar(value="Pronto")
+        self.status_var = tk.StringVar(value=TEXTO_AQUECENDO)
         self.progress_var = tk.DoubleVar(value=0)
         self.quality_var = tk.StringVar(value=initial_quality)
         self.format_type_var = tk.StringVar(value=initial_format_type)
+        self.max_workers_var = tk.IntVar(value=initial_max_workers)
+        self.limite_banda_var = tk.StringVar(value=str(self.engine.limite_banda_kbs))
 
         # Referência ao widget OptionMenu de qualidade para atualização dinâmica
         self.quality_option_menu = None # Será inicializado em setup_ui
 
-        self._load_icons()
+        self.icons = {}
+        self._botoes_com_icone = [] # (botão, nome do ícone), preenchidos depois do primeiro frame
         self.setup_ui() # setup_ui cria o self.quality_option_menu primeiro
         self._configure_ydl_opts() # Configura yt-dlp com base nas opções iniciais
         self._center_window() # Centraliza a janela após a criação da UI
@@ -85,6 +269,96 @@ class YouTubeMP3Downloader:
         # Chamado APÓS self.setup_ui() para garantir que self.quality_option_menu existe
         self._update_quality_options(self.format_type_var.get())
 
+        self._ingestoes = {} # url -> (encontrados, enfileirados) das playlists em análise
+        self._janela_metricas = None # Toplevel com o resumo dos tempos por fase, se aberta
+
+        # Um único "tick" periódico desenha o progresso de todos os downloads ativos
+        self._progresso_versao = None
+        self._intervalo_progresso_ms = max(1, 1000 // progresso_hz)
+        self.root.after(self._intervalo_progresso_ms, self._tick_progresso)
+
+        # Só depois que a janela é desenhada: ícones, bancos de dados e aquecimento do yt-dlp
+        self.root.after_idle(self._apos_primeiro_frame)
+
+    def _apos_primeiro_frame(self):
+        self._load_icons()
+        for botao, nome in self._botoes_com_icone:
+            if nome in self.icons:
+                botao.configure(image=self.icons[nome])
+        threading.Thread(target=self._aquecer, daemon=True).start()
+
+    def _aquecer(self):
+        """Procura o serviço ou, sem ele, abre os bancos de dados e carrega o yt-dlp, em segundo plano."""
+        remoto = MotorRemoto.conectar(config['servico_host'], config['servico_porta'])
+        if remoto is not None: # Bancos de dados e yt-dlp ficam com o serviço
+            self.root.after(0, self._conectado_ao_servico, remoto)
+            return
+        try:
+            self.engine.journal = FilaJournal(engine.JOURNAL_FULL_PATH)
+            self.engine.archive = DownloadArchive(engine.ARCHIVE_FULL_PATH)
+            self.engine.cache = criar_cache()
+        finally:
+            self._pronto.set()
+        self.root.after(0, self._restaurar_sessao)
+        try:
+            self.engine.aquecer()
+        except Exception:
+            pass # O primeiro download tentará de novo e mostrará o erro
+        self._aquecido.set()
+        self.root.after(0, self._aquecimento_concluido)
+
+    def _restaurar_sessao(self):
+        """Retoma os itens que ficaram pendentes ou foram interrompidos na última execução."""
+        restaurados = self.engine.restaurar()
+        if restaurados:
+            self.status_var.set(f"↺ {restaurados} item(ns) restaurados da última sessão.")
+            self.processar_fila() # Os workers esperam o fim do aquecimento, se necessário
+
+    def _conectado_ao_servico(self, remoto):
+        """Troca o motor local, ainda sem bancos de dados nem itens, pelo do serviço."""
+        local = self.engine
+        local.unsubscribe(self._on_engine_event)
+        local.encerrar(aguardar=False)
+        local.metricas.fechar()
+        self.engine = remoto
+        self.remoto = True
+        self.root.title("YouTube MP3/MP4 Downloader PRO (serviço)")
+        self.engine.subscribe(self._on_engine_event)
+        self.limite_banda_var.set(str(self.engine.limite_banda_kbs))
+        self._configure_ydl_opts()
+        self._pronto.set() # As ações que aguardavam o motor local já usam o do serviço
+        self._aquecido.set()
+        self.atualizar_fila()
+        self.status_var.set(f"🔗 Conectado ao serviço em {self.engine.endereco}: {len(self.engine.fila)} item(ns) na fila.")
+
+    def _aquecimento_concluido(self):
+        if self.status_var.get() == TEXTO_AQUECENDO:
+            self.status_var.set("Pronto")
+
+    def _com_icone(self, botao, nome):
+        """Registra um botão cujo ícone será aplicado depois que a janela aparecer."""
+        self._botoes_com_icone.append((botao, nome))
+        return botao
+
+    @property
+    def download_folder(self):
+        return self.engine.download_folder
+
+    @property
+    def fila(self):
+        return self.engine.fila
+
+    def _on_close(self):
+        """Pausa os downloads em andamento (guardando os .part) e encerra o pool de conversão.
+
+        Conectada a um serviço, a janela apenas se desconecta: os downloads continuam nele.
+        """
+        self.engine.unsubscribe(self._on_engine_event) # A thread da GUI vai bloquear em aguardar()
+        if not self.remoto and self.engine.pausar():
+            self.engine.aguardar(timeout=PAUSA_AO_FECHAR_TIMEOUT)
+        self.engine.encerrar(aguardar=False)
+        self.engine.metricas.fechar()
+        self.root.destroy()
 
     def _center_window(self):
         self.root.update_idletasks()
@@ -95,7 +369,6 @@ class YouTubeMP3Downloader:
         self.root.geometry(f'{width}x{height}+{x}+{y}')
 
     def _load_icons(self):
-        self.icons = {}
         icon_names = {
             "download": "download.png",
             "playlist": "playlist.png",
@@ -119,43 +392,9 @@ class YouTubeMP3Downloader:
             # self.root.destroy() 
 
     def _configure_ydl_opts(self):
-        selected_format_type = self.format_type_var.get()
-        selected_quality = self.quality_var.get()
-
-        self.ydl_opts = {
-            'outtmpl': os.path.join(self.download_folder, '%(title)s.%(ext)s'),
-            'no_color': True,
-            'ignoreerrors': True,
-            'quiet': True,
-            'no_warnings': True,
-            'progress_hooks': [self.progresso],
-            'extract_flat': True, # Para playlists, para extrair URLs sem baixar imediatamente
-        }
-
-        # Configura o caminho do FFmpeg se existir na pasta bin/
-        if os.path.exists(FFMPEG_PATH):
-            self.ydl_opts['ffmpeg_location'] = os.path.dirname(FFMPEG_PATH)
-
-        if selected_format_type == "MP3":
-            preferred_quality_audio = selected_quality.replace("kbps", "")
-            self.ydl_opts['format'] = 'bestaudio/best'
-            self.ydl_opts['postprocessors'] = [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': preferred_quality_audio
-            }]
-        elif selected_format_type == "MP4":
-            resolution_map = {
-                "360p": "bestvideo[height<=360][ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
-                "480p": "bestvideo[height<=480][ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
-                "720p": "bestvideo[height<=720][ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
-                "1080p": "bestvideo[height<=1080][ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
-            }
-            self.ydl_opts['format'] = resolution_map.get(selected_quality, "best[ext=mp4]/best") # Padrão para melhor MP4 se não mapeado
-            self.ydl_opts['postprocessors'] = [
-                {'key': 'FFmpegVideoRemuxer', 'preferedformat': 'mp4'},
-                {'key': 'FFmpegMetadata'}
-            ]
+        """Repassa ao motor o formato e a qualidade selecionados na GUI."""
+        self.engine.configure(format_type=self.format_type_var.get(),
+                              quality=self.quality_var.get())
 
     def setup_ui(self):
         # Estilos
@@ -206,15 +445,17 @@ class YouTubeMP3Downloader:
         button_frame = ttk.Frame(main_frame, style='TFrame')
         button_frame.pack(pady=10)
 
-        ttk.Button(button_frame, text=" Baixar Agora", command=self.baixar_imediato_threaded,
-                   image=self.icons["download"], compound=tk.LEFT,
-                   style='TButton').pack(side=tk.LEFT, padx=5)
-        ttk.Button(button_frame, text=" Adicionar Playlist", command=self.adicionar_playlist_threaded,
-                   image=self.icons["playlist"], compound=tk.LEFT,
-                   style='TButton').pack(side=tk.LEFT, padx=5)
-        ttk.Button(button_frame, text=" Escolher Pasta", command=self.escolher_pasta,
-                   image=self.icons["folder"], compound=tk.LEFT,
+        self._com_icone(ttk.Button(button_frame, text=" Baixar Agora", command=self.baixar_imediato_threaded,
+                                   compound=tk.LEFT, style='TButton'), "download").pack(side=tk.LEFT, padx=5)
+        self._com_icone(ttk.Button(button_frame, text=" Adicionar Playlist", command=self.adicionar_playlist_threaded,
+                                   compound=tk.LEFT, style='TButton'), "playlist").pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="🎯 Vários Formatos", command=self.adicionar_varios_formatos,
                    style='TButton').pack(side=tk.LEFT, padx=5)
+        self.importar_button = ttk.Button(button_frame, text="📋 Importar URLs", command=self.menu_importar,
+                                          style='TButton')
+        self.importar_button.pack(side=tk.LEFT, padx=5)
+        self._com_icone(ttk.Button(button_frame, text=" Escolher Pasta", command=self.escolher_pasta,
+                                   compound=tk.LEFT, style='TButton'), "folder").pack(side=tk.LEFT, padx=5)
 
         # Frame para controle de qualidade e formato
         control_frame = ttk.Frame(main_frame, style='TFrame')
@@ -242,6 +483,33 @@ class YouTubeMP3Downloader:
         )
         self.quality_option_menu.pack(side=tk.LEFT, padx=5)
 
+        # Seleção do número de downloads simultâneos da fila
+        tk.Label(control_frame, text="⚡ Simultâneos:", bg='#ECEFF1', fg='#333333').pack(side=tk.LEFT, padx=(15, 5))
+        ttk.Spinbox(
+            control_frame,
+            from_=MIN_WORKERS,
+            to=MAX_WORKERS,
+            width=4,
+            textvariable=self.max_workers_var,
+            state='readonly',
+            command=self._on_max_workers_changed
+        ).pack(side=tk.LEFT, padx=5)
+
+        # Limite global de banda (KB/s, 0 = sem limite); aplicado também aos downloads em andamento
+        tk.Label(control_frame, text="📶 KB/s:", bg='#ECEFF1', fg='#333333').pack(side=tk.LEFT, padx=(15, 5))
+        limite_banda = ttk.Spinbox(
+            control_frame,
+            from_=0,
+            to=1024 * 1024,
+            increment=256,
+            width=7,
+            textvariable=self.limite_banda_var,
+            command=self._on_limite_banda_changed
+        )
+        limite_banda.pack(side=tk.LEFT, padx=5)
+        limite_banda.bind('<Return>', lambda e: self._on_limite_banda_changed())
+        limite_banda.bind('<FocusOut>', lambda e: self._on_limite_banda_changed())
+
         # Status e Progresso
         tk.Label(main_frame, textvariable=self.status_var,
                  font=('Helvetica', 10, 'italic'), bg='#ECEFF1', fg='#546E7A').pack(pady=5)
@@ -254,32 +522,35 @@ class YouTubeMP3Downloader:
         list_frame = ttk.Frame(main_frame, style='TFrame')
         list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
 
-        self.listbox = tk.Listbox(list_frame, height=10, font=('Consolas', 9),
+        self.listbox = tk.Listbox(list_frame, height=10, font=('Consolas', 9), selectmode=tk.EXTENDED,
                                   bg='white', fg='#333333', selectbackground='#B0BEC5', selectforeground='black')
         self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.listbox.yview)
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical")
         scrollbar.pack(side=tk.RIGHT, fill="y")
-        self.listbox.config(yscrollcommand=scrollbar.set)
+        self.fila_view = FilaView(self.listbox, scrollbar) # Controla a rolagem e o conteúdo da Listbox
 
         # Botões de Controle da Fila
         queue_control_frame = ttk.Frame(main_frame, style='TFrame')
         queue_control_frame.pack(pady=10)
 
-        ttk.Button(queue_control_frame, text=" Pausar", command=self.pausar_download,
-                   image=self.icons["pause"], compound=tk.LEFT,
+        self._com_icone(ttk.Button(queue_control_frame, text=" Pausar", command=self.pausar_download,
+                                   compound=tk.LEFT, style='TButton'), "pause").pack(side=tk.LEFT, padx=5)
+        self._com_icone(ttk.Button(queue_control_frame, text=" Retomar", command=self.retomar_download,
+                                   compound=tk.LEFT, style='TButton'), "play").pack(side=tk.LEFT, padx=5)
+        self._com_icone(ttk.Button(queue_control_frame, text=" Limpar Fila", command=self.limpar_fila,
+                                   compound=tk.LEFT, style='TButton'), "clear").pack(side=tk.LEFT, padx=5)
+        ttk.Button(queue_control_frame, text="⏫ Mover p/ Topo", command=self.mover_selecionados_para_topo,
                    style='TButton').pack(side=tk.LEFT, padx=5)
-        ttk.Button(queue_control_frame, text=" Retomar", command=self.retomar_download,
-                   image=self.icons["play"], compound=tk.LEFT,
+        ttk.Button(queue_control_frame, text="✖ Cancelar", command=self.cancelar_selecionados,
                    style='TButton').pack(side=tk.LEFT, padx=5)
-        ttk.Button(queue_control_frame, text=" Limpar Fila", command=self.limpar_fila,
-                   image=self.icons["clear"], compound=tk.LEFT,
+        ttk.Button(queue_control_frame, text="📊 Métricas", command=self.mostrar_metricas,
                    style='TButton').pack(side=tk.LEFT, padx=5)
 
         # Botão "Abrir Pasta" (inicialmente oculto)
-        self.open_folder_button = ttk.Button(main_frame, text=" Abrir Pasta", command=self.open_download_folder,
-                                             image=self.icons["open_folder"], compound=tk.LEFT,
-                                             style='TButton')
+        self.open_folder_button = self._com_icone(
+            ttk.Button(main_frame, text=" Abrir Pasta", command=self.open_download_folder,
+                       compound=tk.LEFT, style='TButton'), "open_folder")
         self.open_folder_button.pack(side=tk.LEFT, pady=10, padx=10)
         self.open_folder_button.pack_forget() # Oculta inicialmente
 
@@ -298,11 +569,7 @@ class YouTubeMP3Downloader:
 
     def _get_quality_options_for_format(self, format_type):
         """Retorna a lista de opções de qualidade com base no tipo de formato."""
-        if format_type == "MP3":
-            return ["128kbps", "192kbps", "256kbps", "320kbps"]
-        elif format_type == "MP4":
-            return ["360p", "480p", "720p", "1080p"]
-        return []
+        return engine.get_quality_options_for_format(format_type)
 
     def _update_quality_options(self, selected_format_type):
         """Atualiza as opções do menu de qualidade e o valor padrão."""
@@ -339,71 +606,145 @@ class YouTubeMP3Downloader:
         self._configure_ydl_opts()
         self.salvar_config()
 
+    def _get_max_workers(self):
+        """Retorna o limite atual de downloads simultâneos."""
+        try:
+            return engine.clamp_workers(self.max_workers_var.get())
+        except tk.TclError:
+            return initial_max_workers
+
+    def _on_max_workers_changed(self):
+        """Repassa o novo limite ao motor (que inicia workers adicionais, se preciso) e salva."""
+        self.engine.configure(max_workers=self._get_max_workers())
+        self.salvar_config()
+
+    def _on_limite_banda_changed(self):
+        """Aplica o novo limite de banda aos downloads (inclusive os em andamento) e salva."""
+        self.engine.definir_limite_banda(self.limite_banda_var.get())
+        self.limite_banda_var.set(str(self.engine.limite_banda_kbs)) # Valores inválidos voltam a 0
+        self.salvar_config()
+
     def salvar_config(self):
         """Salva as configurações atuais em um arquivo JSON."""
-        config = {
-            'pasta': self.download_folder,
-            'qualidade': self.quality_var.get(),
-            'formato_tipo': self.format_type_var.get()
-        }
+        config.update(self.engine.config_dict()) # Preserva chaves que o motor não conhece
         try:
-            with open(CONFIG_FULL_PATH, 'w') as f:
-                json.dump(config, f, indent=4)
+            engine.salvar_config(config)
         except Exception as e:
             messagebox.showerror("Erro ao Salvar Configurações", f"Não foi possível salvar as configurações: {e}")
 
-    def sanitize_filename(self, filename):
-        """Remove caracteres inválidos de um nome de arquivo."""
-        filename = re.sub(r'[<>:"/\\|?*]', '', filename)
-        filename = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', filename)
-        filename = re.sub(r'\s+', '_', filename).strip()
-        filename = re.sub(r'_+', '_', filename)
-        return filename
-
-    def progresso(self, d):
-        """Callback de progresso para yt-dlp, atualiza a GUI."""
-        if d['status'] == 'downloading':
-            total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate')
-            downloaded_bytes = d.get('downloaded_bytes', 0)
-            if total_bytes:
-                percent = (downloaded_bytes / total_bytes) * 100
-                self.root.after(0, self.progress_var.set, percent)
-                speed = d.get('speed')
-                eta = d.get('eta')
+    def _on_engine_event(self, evento):
+        """Recebe eventos do motor (em threads de download) e os repassa à thread da GUI."""
+        self.root.after(0, self._processar_evento, evento)
+
+    def _processar_evento(self, evento):
+        """Atualiza a interface de acordo com um evento do motor."""
+        tipo = evento['tipo']
+        if tipo in ('itens_adicionados', 'fila_restaurada'):
+            self.fila_view.adicionar(evento['itens'])
+        elif tipo == 'item_status':
+            self.fila_view.atualizar(evento['item'])
+        elif tipo == 'item_removido':
+            self.fila_view.remover(evento['item'])
+        elif tipo == 'item_movido':
+            self.fila_view.mover_para_topo(evento['item'])
+        elif tipo in ('fila_limpa', 'fila_recarregada'): # Recarregada: reconectou ao serviço
+            self.atualizar_fila()
+        elif tipo == 'playlist_progresso':
+            self._on_playlist_progresso(evento)
+        elif tipo == 'importacao_progresso':
+            self._on_importacao_progresso(evento)
+        elif tipo == 'download_unico':
+            self.progresso(evento)
+        elif tipo == 'erro':
+            self.status_var.set(evento['mensagem'])
+        elif tipo in ('retentativa', 'disjuntor'):
+            self.status_var.set(evento['mensagem'])
+        elif tipo == 'fila_concluida':
+            self._finalizar_fila(evento['pausado'])
+
+    def _on_playlist_progresso(self, evento):
+        """Mostra as contagens ao vivo da análise de uma playlist."""
+        if evento['concluida']:
+            self._ingestoes.pop(evento['url'], None) # Playlists enviadas por outros clientes do serviço
+            status_text = f"Playlist adicionada! {evento['enfileirados']} vídeos na fila."
+            if evento['ja_baixados']:
+                status_text += f" {evento['ja_baixados']} já baixados foram ignorados."
+            self.status_var.set(status_text)
+            return
+        self._ingestoes[evento['url']] = (evento['encontrados'], evento['enfileirados'])
+        if evento['lote'] == 1:
+            self.processar_fila() # Começa a baixar já com as primeiras entradas
+        if not self.engine.itens_ativos():
+            self.status_var.set(f"🔍 Analisando playlist... {self._texto_ingestao()}")
+
+    def _on_importacao_progresso(self, evento):
+        """Mostra as contagens ao vivo de uma importação em massa."""
+        texto = (f"{evento['enfileirados']} na fila de {evento['lidas']} link(s), {evento['duplicados']} repetidos, "
+                 f"{evento['descartados']} já na fila ou baixados, {evento['invalidas']} inválidos")
+        if evento['concluida']:
+            self.status_var.set(f"📋 Importação concluída: {texto}.")
+        elif not self.engine.itens_ativos():
+            self.status_var.set(f"📋 Importando... {texto}")
+
+    def _texto_ingestao(self):
+        encontrados = sum(e for e, _ in self._ingestoes.values())
+        enfileirados = sum(q for _, q in self._ingestoes.values())
+        return f"{encontrados} encontrados, {enfileirados} na fila"
+
+    def _tick_progresso(self):
+        """Redesenha o progresso a partir do snapshot do motor, no ritmo de `progresso_hz`.
+
+        Os hooks do yt-dlp podem disparar centenas de vezes por segundo; aqui o custo
+        por tick é fixo, independentemente de quantos eventos chegaram desde o último.
+        """
+        versao, estados = self.engine.progresso_atual()
+        if versao != self._progresso_versao:
+            self._progresso_versao = versao
+            unico = estados.pop(None, None)
+            if estados:
+                self.fila_view.atualizar(None) # Redesenha as linhas visíveis com o novo percentual
+                self._atualizar_progresso_global(estados)
+            elif unico is not None:
+                self.progresso(unico)
+        self.root.after(self._intervalo_progresso_ms, self._tick_progresso)
+
+    def progresso(self, evento):
+        """Exibe o progresso de um download avulso (fora da fila)."""
+        status = evento['status']
+        if status == 'downloading':
+            percent = evento.get('percent')
+            if percent is not None:
+                self.progress_var.set(percent)
                 status_text = f"⬇️ Baixando: {percent:.1f}%"
-                if speed:
-                    status_text += f" | Velocidade: {self._format_bytes(speed)}/s"
-                if eta is not None:
-                    status_text += f" | ETA: {self._format_eta(eta)}"
-                self.root.after(0, self.status_var.set, status_text)
+                if evento.get('speed'):
+                    status_text += f" | Velocidade: {format_bytes(evento['speed'])}/s"
+                if evento.get('eta') is not None:
+                    status_text += f" | ETA: {format_eta(evento['eta'])}"
+                self.status_var.set(status_text)
             else:
-                self.root.after(0, self.status_var.set, "⬇️ Baixando...")
-        elif d['status'] == 'finished':
-            self.root.after(0, self.progress_var.set, 100)
-            self.root.after(0, self.status_var.set, "🟢 Download concluído!")
-            self.root.after(0, self.open_folder_button.pack) # Mostra o botão Abrir Pasta
-            self.root.after(0, self.url_var.set, "") # Limpa o campo de URL
-            self.root.after(0, self._set_placeholder) # Restaura o placeholder
-        elif d['status'] == 'error':
-            self.root.after(0, self.status_var.set, "🔴 Erro no download!")
-            self.root.after(0, self.progress_var.set, 0)
-
-    def _format_bytes(self, bytes_val):
-        """Formata bytes para KB/MB/GB."""
-        if bytes_val is None:
-            return "N/A"
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if bytes_val < 1024.0:
-                return f"{bytes_val:.1f}{unit}"
-            bytes_val /= 1024.0
-
-    def _format_eta(self, seconds):
-        """Formata segundos para HH:MM:SS."""
-        if seconds is None:
-            return "N/A"
-        m, s = divmod(int(seconds), 60)
-        h, m = divmod(m, 60)
-        return f"{h:02d}:{m:02d}:{s:02d}"
+                self.status_var.set("⬇️ Baixando...")
+        elif status == 'finished':
+            self.progress_var.set(100)
+            self.status_var.set("🟢 Download concluído!")
+            self.open_folder_button.pack() # Mostra o botão Abrir Pasta
+            self.url_var.set("") # Limpa o campo de URL
+            self._set_placeholder() # Restaura o placeholder
+        elif status == 'error':
+            self.status_var.set(evento.get('erro') or "🔴 Erro no download!")
+            self.progress_var.set(0)
+
+    def _atualizar_progresso_global(self, estados):
+        """Mostra na barra de progresso a média dos itens ativos da fila."""
+        media = sum(estado['percent'] or 0 for estado in estados.values()) / len(estados)
+        self.progress_var.set(media)
+        velocidade_total = sum(estado['speed'] or 0 for estado in estados.values()
+                               if estado['status'] == 'downloading')
+        status_text = f"⬇️ Baixando {len(estados)} item(ns): {media:.1f}%"
+        if velocidade_total:
+            status_text += f" | Velocidade: {format_bytes(velocidade_total)}/s"
+        if self._ingestoes:
+            status_text += f" | Playlist: {self._texto_ingestao()}"
+        self.status_var.set(status_text)
 
     def baixar_imediato_threaded(self):
         """Inicia o download de um único vídeo em uma nova thread."""
@@ -415,20 +756,11 @@ class YouTubeMP3Downloader:
         self.open_folder_button.pack_forget() # Oculta o botão Abrir Pasta
         self.status_var.set("🔍 Buscando informações...")
         self.progress_var.set(0)
-        threading.Thread(target=self._executar_download_unico, args=(url,)).start()
+        threading.Thread(target=self._baixar_agora, args=(url,), daemon=True).start()
 
-    def _executar_download_unico(self, url):
-        """Executa o download de um único vídeo/áudio."""
-        try:
-            self._configure_ydl_opts() # Garante que as opções estão atualizadas antes do download
-            with yt_dlp.YoutubeDL(self.ydl_opts) as ydl:
-                ydl.download([url])
-        except yt_dlp.DownloadError as e:
-            self.root.after(0, self.status_var.set, f"🔴 Erro no download: {e}")
-            self.root.after(0, self.progress_var.set, 0)
-        except Exception as e:
-            self.root.after(0, self.status_var.set, f"🔴 Erro inesperado: {e}")
-            self.root.after(0, self.progress_var.set, 0)
+    def _baixar_agora(self, url):
+        self._pronto.wait() # O índice e o cache são abertos logo após a janela aparecer
+        self.engine.baixar_agora(url)
 
     def adicionar_playlist_threaded(self):
         """Adiciona uma playlist à fila em uma nova thread."""
@@ -440,142 +772,249 @@ class YouTubeMP3Downloader:
         self.open_folder_button.pack_forget() # Oculta o botão Abrir Pasta
         self.status_var.set("🔍 Analisando playlist...")
         self.progress_var.set(0)
-        threading.Thread(target=self._processar_playlist, args=(url,)).start()
+        threading.Thread(target=self._processar_playlist, args=(url,), daemon=True).start()
+
+    def adicionar_varios_formatos(self):
+        """Escolhe vários formatos/qualidades para a URL: a fonte é baixada uma vez e convertida para cada um."""
+        url = self.url_var.get()
+        if not url or url == "Cole a URL do vídeo ou playlist aqui...":
+            messagebox.showwarning("URL Vazia", "Por favor, insira uma URL de vídeo ou playlist.")
+            return
+        janela = tk.Toplevel(self.root)
+        janela.title("Vários Formatos")
+        janela.configure(bg='#ECEFF1')
+        janela.resizable(False, False)
+        janela.transient(self.root)
+        escolhas = {}
+        atual = (self.format_type_var.get(), self.quality_var.get())
+        for coluna, formato in enumerate(("MP3", "MP4")):
+            quadro = ttk.LabelFrame(janela, text=formato)
+            quadro.grid(row=0, column=coluna, padx=10, pady=10, sticky=tk.N)
+            for qualidade in self._get_quality_options_for_format(formato):
+                escolhas[(formato, qualidade)] = tk.BooleanVar(value=(formato, qualidade) == atual)
+                ttk.Checkbutton(quadro, text=qualidade, variable=escolhas[(formato, qualidade)]).pack(
+                    anchor=tk.W, padx=10, pady=2)
+
+        def confirmar():
+            alvos = [alvo for alvo, marcado in escolhas.items() if marcado.get()]
+            if not alvos:
+                messagebox.showwarning("Nenhum Formato", "Marque ao menos um formato.", parent=janela)
+                return
+            janela.destroy()
+            self.open_folder_button.pack_forget()
+            self.status_var.set(f"🔍 Analisando URL para {len(alvos)} formato(s)...")
+            self.progress_var.set(0)
+            threading.Thread(target=self._processar_playlist, args=(url, alvos), daemon=True).start()
+        ttk.Button(janela, text="Adicionar à Fila", command=confirmar, style='TButton').grid(
+            row=1, column=0, columnspan=2, pady=(0, 10))
+        janela.grab_set()
+
+    def menu_importar(self):
+        """Mostra as origens da importação em massa logo abaixo do botão."""
+        menu = tk.Menu(self.root, tearoff=0)
+        menu.add_command(label="Arquivo de texto ou CSV...", command=self.importar_arquivo)
+        menu.add_command(label="Área de transferência", command=self.importar_area_de_transferencia)
+        botao = self.importar_button
+        menu.tk_popup(botao.winfo_rootx(), botao.winfo_rooty() + botao.winfo_height())
+
+    def importar_arquivo(self):
+        """Adiciona à fila todos os links de um arquivo de texto (um ou mais por linha) ou CSV."""
+        path = filedialog.askopenfilename(title="Importar URLs",
+                                          filetypes=[("Listas de URLs", "*.txt *.csv *.tsv"), ("Todos", "*.*")])
+        if path:
+            self._iniciar_importacao(path, path.lower().endswith(('.csv', '.tsv')))
+
+    def importar_area_de_transferencia(self):
+        """Adiciona à fila todos os links copiados (de uma planilha, página ou lista)."""
+        try:
+            texto = self.root.clipboard_get()
+        except tk.TclError:
+            texto = ""
+        if not texto.strip():
+            messagebox.showwarning("Área de Transferência Vazia", "Copie uma lista de URLs e tente novamente.")
+            return
+        self._iniciar_importacao(texto.splitlines(), '\t' in texto) # Células copiadas de planilhas vêm com tabs
+
+    def _iniciar_importacao(self, origem, formato_csv):
+        self.open_folder_button.pack_forget()
+        self.status_var.set("📋 Importando URLs...")
+        threading.Thread(target=self._importar, args=(origem, formato_csv), daemon=True).start()
 
-    def _processar_playlist(self, url):
-        """Processa a URL da playlist para adicionar vídeos à fila."""
+    def _importar(self, origem, formato_csv):
+        """Lê a origem (caminho de arquivo ou linhas) e envia ao motor, sem carregar o arquivo inteiro."""
+        self._pronto.wait()
         try:
-            # Usar uma configuração mínima de ydl_opts para a análise da playlist
-            # para não incluir post-processadores que podem falhar ou atrasar a análise.
-            playlist_analysis_opts = {
-                'extract_flat': True,
-                'quiet': True,
-                'no_warnings': True,
-                'ignoreerrors': True # Ignorar erros de vídeos indisponíveis na playlist
-            }
-            with yt_dlp.YoutubeDL(playlist_analysis_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-
-            if 'entries' in info:
-                added_count = 0
-                for entry in info['entries']:
-                    if entry and 'url' in entry: # Garante que a entrada é válida
-                        title = self.sanitize_filename(entry.get('title', 'Vídeo sem título'))
-                        self.root.after(0, lambda t=title, u=entry['url']: self.fila.append({"title": t, "url": u, "status": "Pendente"}))
-                        added_count += 1
-                self.root.after(0, self.atualizar_fila)
-                self.root.after(0, self.status_var.set, f"Playlist adicionada! {added_count} vídeos na fila.")
-                if added_count > 0: # Só inicia se houver vídeos adicionados
-                    self.root.after(0, self.processar_fila)
+            self._iniciar_execucao_metricas()
+            if isinstance(origem, str):
+                # A mensagem final vem do evento 'importacao_progresso'
+                self.engine.importar(engine.ler_arquivo_de_urls(origem), formato_csv, iniciar=True)
+            else:
+                self.engine.importar(origem, formato_csv, iniciar=True)
+        except (OSError, ErroServico) as e:
+            self.root.after(0, self.status_var.set, f"🔴 Erro ao importar URLs: {e}")
+        except Exception as e:
+            self.root.after(0, self.status_var.set, f"🔴 Erro inesperado ao importar URLs: {e}")
+
+    def _processar_playlist(self, url, alvos=None):
+        """Processa a URL da playlist, adicionando os vídeos à fila conforme são encontrados.
+
+        Com `alvos`, a URL também pode ser um vídeo avulso, e cada item gera todas as saídas pedidas.
+        """
+        self._pronto.wait()
+        try:
+            self._iniciar_execucao_metricas()
+            # Os workers são iniciados no primeiro lote (ver _processar_evento)
+            added_count = self.engine.adicionar_playlist(url, aceitar_video_unico=alvos is not None,
+                                                         iniciar=True, alvos=alvos)
+            if added_count is not None: # A mensagem final vem do evento 'playlist_progresso'
                 self.root.after(0, self.url_var.set, "") # Limpa o campo de URL
                 self.root.after(0, self._set_placeholder) # Restaura o placeholder
             else:
                 self.root.after(0, self.status_var.set, "🔴 URL não é uma playlist válida ou não contém vídeos.")
-        except yt_dlp.DownloadError as e:
+        except ErroServico as e:
+            self.root.after(0, self.status_var.set, f"🔴 Erro ao analisar playlist: {e}")
+        except engine.carregar_yt_dlp().DownloadError as e:
             self.root.after(0, self.status_var.set, f"🔴 Erro ao analisar playlist: {e}")
         except Exception as e:
             self.root.after(0, self.status_var.set, f"🔴 Erro inesperado ao analisar playlist: {e}")
+        finally:
+            self.root.after(0, self._encerrar_ingestao, url)
+
+    def _encerrar_ingestao(self, url):
+        self._ingestoes.pop(url, None)
 
     def atualizar_fila(self):
-        """Atualiza a exibição da fila na Listbox."""
-        self.listbox.delete(0, tk.END)
-        for i, item in enumerate(self.fila):
-            display_text = f"{i+1}. {item['title']} - {item['status']}"
-            self.listbox.insert(tk.END, display_text)
-            # Adicionando cores para status
-            if item['status'] == "Baixando...":
-                self.listbox.itemconfig(i, {'fg': '#1E88E5'}) # Azul
-            elif item['status'] == "Concluído":
-                self.listbox.itemconfig(i, {'fg': '#4CAF50'}) # Verde
-            elif item['status'] == "Erro":
-                self.listbox.itemconfig(i, {'fg': '#E53935'}) # Vermelho
-            else: # "Pendente"
-                self.listbox.itemconfig(i, {'fg': '#333333'})
+        """Recarrega toda a exibição da fila a partir do motor."""
+        self.fila_view.recarregar(self.engine.snapshot())
 
     def limpar_fila(self):
-        """Limpa todos os itens da fila."""
+        """Limpa todos os itens pendentes da fila.
+
+        Downloads já em andamento nos workers são concluídos normalmente; apenas os
+        itens que ainda não começaram são removidos.
+        """
         if messagebox.askyesno("Limpar Fila", "Tem certeza que deseja limpar a fila de downloads?"):
-            self.fila.clear()
-            self.atualizar_fila()
-            self.status_var.set("Fila limpa. Pronto.")
-            self.pausado = False
-            self.em_processamento = False
-            self.progress_var.set(0)
+            if self.engine.limpar():
+                self.status_var.set("Fila limpa. Concluindo downloads em andamento...")
+            else:
+                self.status_var.set("Fila limpa. Pronto.")
+                self.progress_var.set(0)
             self.open_folder_button.pack_forget()
 
+    def mover_selecionados_para_topo(self):
+        """Faz os itens pendentes selecionados serem os próximos a baixar, na ordem da seleção."""
+        selecionados = self.fila_view.itens_selecionados()
+        if not selecionados:
+            self.status_var.set("Selecione itens pendentes na fila.")
+            return
+        # Do último para o primeiro, para que o primeiro selecionado fique no topo
+        movidos = sum(self.engine.mover_para_topo(item.id) for item in reversed(selecionados))
+        self.listbox.selection_clear(0, tk.END)
+        self.status_var.set(f"⏫ {movidos} item(ns) movido(s) para o topo da fila.")
+
+    def cancelar_selecionados(self):
+        """Cancela os itens selecionados (pendentes saem da fila; downloads em andamento são interrompidos)."""
+        selecionados = self.fila_view.itens_selecionados()
+        if not selecionados:
+            self.status_var.set("Selecione itens na fila para cancelar.")
+            return
+        cancelados = sum(self.engine.cancelar(item.id) for item in selecionados)
+        self.listbox.selection_clear(0, tk.END)
+        self.status_var.set(f"✖ {cancelados} item(ns) cancelado(s).")
+
     def pausar_download(self):
         """Pausa o processamento da fila."""
-        if self.em_processamento and not self.pausado:
-            self.pausado = True
-            self.status_var.set("⏸ Fila pausada. Concluindo download atual...")
-        elif not self.em_processamento:
+        if self.engine.pausar():
+            self.status_var.set("⏸ Pausando... os downloads atuais continuam de onde pararam ao retomar.")
+        elif not self.engine.em_processamento:
             self.status_var.set("Fila não está ativa para pausar.")
 
     def retomar_download(self):
         """Retoma o processamento da fila."""
-        if self.pausado:
-            self.pausado = False
+        if self.engine.pausado:
             self.status_var.set("▶ Retomando fila...")
-            self.processar_fila()
-        elif not self.em_processamento and self.fila:
+            self.processar_fila(retomar=True)
+        elif not self.engine.em_processamento and self.engine.fila:
             self.status_var.set("Iniciando processamento da fila...")
             self.processar_fila()
         else:
             self.status_var.set("Fila já está ativa ou vazia.")
 
-    def processar_fila(self):
-        """Inicia o processamento da fila em uma nova thread se não estiver ativo."""
-        if not self.em_processamento and self.fila:
-            self.em_processamento = True
-            self.pausado = False
-            self.open_folder_button.pack_forget()
-            threading.Thread(target=self.executar_fila).start()
-
-    def executar_fila(self):
-        """Loop principal que processa os downloads da fila."""
-        while self.fila and not self.pausado:
-            current_item_dict = self.fila[0] # Pega o primeiro item como dicionário
-            
-            # Atualiza status visualmente na Listbox
-            self.root.after(0, lambda: self.listbox.itemconfig(0, {'fg': '#1E88E5'})) # Azul para "baixando"
-            self.root.after(0, self.progress_var.set, 0) # Zera barra para novo item
-
-            current_item_dict['status'] = "Baixando..."
-            self.root.after(0, self.atualizar_fila) # Atualiza a Listbox com o novo status
-
-            self.root.after(0, lambda: self.status_var.set(f"Baixando: {current_item_dict['title']}"))
-            
-            try:
-                self._configure_ydl_opts() # Garante que as opções (formato, qualidade) estão atualizadas
-                with yt_dlp.YoutubeDL(self.ydl_opts) as ydl:
-                    ydl.download([current_item_dict['url']])
-                
-                current_item_dict['status'] = "Concluído"
-            except yt_dlp.DownloadError as e:
-                current_item_dict['status'] = "Erro"
-                self.root.after(0, self.status_var.set, f"🔴 Erro no download de {current_item_dict['title']}: {e}")
-            except Exception as e:
-                current_item_dict['status'] = "Erro"
-                self.root.after(0, self.status_var.set, f"🔴 Erro inesperado em {current_item_dict['title']}: {e}")
-            finally:
-                self.root.after(0, self.atualizar_fila) # Atualiza Listbox com status final (Concluído/Erro)
-                # Remove o item da fila após tentar o download (sucesso ou erro)
-                self.root.after(0, lambda: self.fila.pop(0))
-                self.root.after(0, self.atualizar_fila) # Atualiza a Listbox para remover o item concluído/com erro
-
-        self.em_processamento = False
-        if not self.fila and not self.pausado:
-            self.root.after(0, self.status_var.set, "Todos os downloads concluídos! Pronto.")
-            self.root.after(0, self.progress_var.set, 0)
-            self.root.after(0, self.open_folder_button.pack) # Mostra o botão Abrir Pasta
-        elif self.pausado:
-            self.root.after(0, self.status_var.set, "Fila pausada.")
+    def processar_fila(self, retomar=False):
+        """Inicia os workers do motor para processar a fila; com `retomar`, desfaz também a pausa.
+
+        Só o botão Retomar tira a fila da pausa: com o motor de um serviço, a pausa vale para
+        todos os clientes conectados a ele.
+        """
+        self._configure_ydl_opts() # Lê as opções da GUI na thread principal, antes de iniciar os workers
+        self.open_folder_button.pack_forget()
+        self._iniciar_execucao_metricas()
+        if retomar:
+            self.engine.retomar()
+        else:
+            self.engine.iniciar()
+
+    def _iniciar_execucao_metricas(self):
+        """Uma fila parada que volta a andar é uma nova execução: o resumo das fases recomeça."""
+        if not self.engine.em_processamento:
+            self.engine.metricas.nova_execucao()
+
+    def _finalizar_fila(self, pausado):
+        """Executado na thread da GUI quando o último worker termina."""
+        if pausado:
+            self.status_var.set("Fila pausada.")
+        else:
+            self.status_var.set("Todos os downloads concluídos! Pronto.")
+            self.progress_var.set(0)
+            self.open_folder_button.pack() # Mostra o botão Abrir Pasta
+        self._atualizar_janela_metricas()
+
+    def mostrar_metricas(self):
+        """Abre (ou traz para a frente) a janela com os percentis de cada fase da última execução."""
+        if self._janela_metricas is not None and self._janela_metricas.winfo_exists():
+            self._janela_metricas.lift()
+            self._atualizar_janela_metricas()
+            return
+        janela = tk.Toplevel(self.root)
+        janela.title("Tempos por Fase")
+        janela.configure(bg='#ECEFF1')
+        janela.resizable(False, False)
+        colunas = ("fase", "n") + tuple(f"p{p}" for p in PERCENTIS) + ("max",)
+        tabela = ttk.Treeview(janela, columns=colunas, show='headings', height=len(FASES))
+        for coluna in colunas:
+            tabela.heading(coluna, text=coluna.capitalize() if coluna == "fase" else coluna)
+            tabela.column(coluna, width=150 if coluna == "fase" else 80, anchor=tk.W if coluna == "fase" else tk.E)
+        tabela.pack(padx=10, pady=(10, 5))
+        janela.totais_var = tk.StringVar()
+        tk.Label(janela, textvariable=janela.totais_var, font=('Helvetica', 9, 'italic'),
+                 bg='#ECEFF1', fg='#546E7A').pack(pady=(0, 10))
+        janela.tabela = tabela
+        self._janela_metricas = janela
+        self._atualizar_janela_metricas()
+
+    def _atualizar_janela_metricas(self):
+        """Recalcula o resumo exibido na janela de métricas, se ela estiver aberta."""
+        janela = self._janela_metricas
+        if janela is None or not janela.winfo_exists():
+            return
+        tabela = janela.tabela
+        tabela.delete(*tabela.get_children())
+        for fase, estatisticas in self.engine.metricas.resumo().items():
+            valores = [estatisticas[f"p{p}"] for p in PERCENTIS] + [estatisticas['max']]
+            tabela.insert('', tk.END, values=(fase, estatisticas['n'],
+                                              *("-" if v is None else f"{v:.2f}s" for v in valores)))
+        itens, total_bytes = self.engine.metricas.totais_execucao()
+        janela.totais_var.set(f"{itens} item(ns) finalizados | {format_bytes(total_bytes)} baixados")
 
     def escolher_pasta(self):
         """Abre uma caixa de diálogo para o usuário escolher a pasta de download."""
         new_folder = filedialog.askdirectory(initialdir=self.download_folder)
         if new_folder:
-            self.download_folder = new_folder
+            try:
+                self.engine.configure(download_folder=new_folder)
+            except ErroServico as e: # O serviço só aceita subpastas da pasta com que foi iniciado
+                messagebox.showerror("Pasta Recusada", f"O serviço não aceitou a pasta:\n{e}")
+                return
             self._update_ydl_options_and_save() # Salva a nova pasta e reconfigura yt-dlp
             messagebox.showinfo("Pasta Selecionada", f"A pasta de downloads foi definida para:\n{self.download_folder}")
 
@@ -592,9 +1031,209 @@ class YouTubeMP3Downloader:
             messagebox.showerror("Erro ao Abrir Pasta", f"Não foi possível abrir a pasta:\n{e}")
 
 # --------------------------------------------------------------------------------------------------
-# 4. Ponto de Entrada da Aplicação
+# 5. Ponto de Entrada da Aplicação
 # --------------------------------------------------------------------------------------------------
+def parse_args(argv=None):
+    """Lê os argumentos de linha de comando."""
+    parser = argparse.ArgumentParser(description="YouTube MP3/MP4 Downloader PRO")
+    parser.add_argument('--batch', metavar='ARQUIVO',
+                        help="Baixa as URLs do arquivo (texto ou .csv; repetidas são ignoradas) sem abrir a interface gráfica")
+    parser.add_argument('--format', choices=['mp3', 'mp4'], type=str.lower,
+                        help="Formato de saída (padrão: o salvo em config.json)")
+    parser.add_argument('--quality', help="Qualidade, ex.: 192kbps ou 720p (padrão: o salvo em config.json)")
+    parser.add_argument('--workers', type=int, help=f"Downloads simultâneos ({MIN_WORKERS}-{MAX_WORKERS})")
+    parser.add_argument('--pasta', help="Pasta de destino dos downloads")
+    parser.add_argument('--limite-banda', type=int, metavar='KBS',
+                        help="Banda total dos downloads em KB/s (padrão: o salvo em config.json; 0 = sem limite)")
+    parser.add_argument('--conexoes', type=int, metavar='N',
+                        help="Conexões paralelas por arquivo baixado (padrão: o salvo em config.json; 1 desativa)")
+    parser.add_argument('--pasta-temporaria', metavar='PASTA',
+                        help="Pasta local onde os downloads e conversões são feitos antes de irem para a "
+                             "pasta de destino (padrão: o salvo em config.json; vazio = direto no destino)")
+    parser.add_argument('--fila-compartilhada', metavar='PASTA',
+                        help="Trabalha, junto com outros processos ou máquinas, na fila guardada nesta pasta "
+                             "(com --batch, enfileira o arquivo antes)")
+    parser.add_argument('--so-enfileirar', action='store_true',
+                        help="Com --fila-compartilhada e --batch, apenas enfileira as URLs, sem baixá-las")
+    parser.add_argument('--servico', action='store_true',
+                        help="Roda o motor como serviço local (API HTTP/JSON), compartilhado pela GUI e por scripts")
+    parser.add_argument('--porta', type=int,
+                        help=f"Porta da API do serviço (padrão: o salvo em config.json, {engine.DEFAULT_CONFIG['servico_porta']})")
+    parser.add_argument('--reconstruir-arquivo', action='store_true',
+                        help="Reconstrói o índice de downloads concluídos a partir da pasta de destino")
+    parser.add_argument('--journal', metavar='ARQUIVO',
+                        help="Diário SQLite da fila; permite retomar um lote interrompido")
+    parser.add_argument('--metricas', metavar='ARQUIVO',
+                        help="Log JSON-lines com os tempos por fase de cada item (padrão: metricas.jsonl)")
+    parser.add_argument('--prometheus', metavar='ARQUIVO',
+                        help="Textfile do Prometheus atualizado ao fim do lote")
+    parser.add_argument('--alvos', nargs='+', metavar='FORMATO:QUALIDADE',
+                        help="Várias saídas por vídeo com um único download, ex.: mp3:320kbps mp3:128kbps mp4:720p")
+    return parser.parse_args(argv)
+
+def _formato_da_linha_de_comando(args):
+    """(formato, qualidade, alvos) pedidos na linha de comando; None se forem inválidos (o erro já foi impresso)."""
+    format_type = args.format.upper() if args.format else initial_format_type
+    quality = args.quality or initial_quality
+    if quality not in engine.get_quality_options_for_format(format_type):
+        if args.quality:
+            opcoes = ", ".join(engine.get_quality_options_for_format(format_type))
+            print(f"Qualidade inválida para {format_type}: {quality} (opções: {opcoes})", file=sys.stderr)
+            return None
+        quality = engine.default_quality_for_format(format_type)
+    alvos = None
+    if args.alvos:
+        try:
+            alvos = engine.normalizar_alvos(alvo.split(':', 1) for alvo in args.alvos)
+        except ValueError as e:
+            print(f"Alvo inválido: {e} (use FORMATO:QUALIDADE, ex.: mp3:320kbps)", file=sys.stderr)
+            return None
+    return format_type, quality, alvos
+
+def main_batch(args):
+    """Executa o modo em lote, sem GUI. Retorna o código de saída."""
+    pedido = _formato_da_linha_de_comando(args)
+    if pedido is None:
+        return 2
+    format_type, quality, alvos = pedido
+    workers = args.workers if args.workers is not None else initial_max_workers
+    journal = FilaJournal(args.journal) if args.journal else None
+    return engine.executar_lote(engine.ler_arquivo_de_urls(args.batch), format_type, quality,
+                                args.pasta or initial_download_folder, workers, journal=journal,
+                                archive=DownloadArchive(engine.ARCHIVE_FULL_PATH),
+                                cache=criar_cache(), cache_ttl_playlist=config['cache_ttl_playlist'],
+                                pipeline_conversao=config['pipeline_conversao'],
+                                metricas=criar_metricas(args.metricas, args.prometheus),
+                                max_tentativas=config['retentativas_max'], backoff_base=config['retentativa_base_s'],
+                                backoff_max=config['retentativa_max_s'], alvos=alvos,
+                                conexoes_por_item=args.conexoes or config['conexoes_por_item'],
+                                conexoes_max=config['conexoes_max'],
+                                limite_banda_kbs=(args.limite_banda if args.limite_banda is not None
+                                                  else config['limite_banda_kbs']),
+                                peso_prioritario=config['banda_peso_prioritario'],
+                                formato_csv=args.batch.lower().endswith(('.csv', '.tsv')),
+                                pasta_temporaria=(args.pasta_temporaria if args.pasta_temporaria is not None
+                                                  else config['pasta_temporaria']),
+                                espaco_livre_min_mb=config['espaco_livre_min_mb'])
+
+def main_distribuido(args):
+    """Trabalha na fila compartilhada (--fila-compartilhada) até ela esvaziar. Retorna o código de saída.
+
+    Com --batch, as URLs do arquivo são enfileiradas antes; com --so-enfileirar, só isso.
+    Vários processos, na mesma máquina ou em máquinas que enxergam a mesma pasta, podem
+    trabalhar na mesma fila ao mesmo tempo.
+    """
+    pedido = _formato_da_linha_de_comando(args)
+    if pedido is None:
+        return 2
+    format_type, quality, alvos = pedido
+    fila = FilaCompartilhada(args.fila_compartilhada)
+    if args.batch:
+        resumo = fila.importar(engine.ler_arquivo_de_urls(args.batch), args.batch.lower().endswith(('.csv', '.tsv')),
+                               alvos)
+        print(f"➕ {resumo['enfileirados']} item(ns) na fila compartilhada de {resumo['lidas']} link(s) | "
+              f"Já enfileirados: {resumo['duplicados']} | Inválidos: {resumo['invalidas']}", flush=True)
+    if args.so_enfileirar:
+        return 0
+    motor = criar_motor(args.pasta, format_type, quality, args.workers,
+                        archive=DownloadArchive(engine.ARCHIVE_FULL_PATH), cache=criar_cache(),
+                        metricas=criar_metricas(args.metricas, args.prometheus),
+                        conexoes_por_item=args.conexoes or config['conexoes_por_item'],
+                        limite_banda_kbs=(args.limite_banda if args.limite_banda is not None
+                                          else config['limite_banda_kbs']),
+                        pasta_temporaria=(args.pasta_temporaria if args.pasta_temporaria is not None
+                                          else config['pasta_temporaria']))
+
+    def on_evento(evento):
+        if evento['tipo'] == 'item_status' and evento['item'].status in (STATUS_CONCLUIDO, STATUS_ERRO, STATUS_IGNORADO):
+            item = evento['item']
+            print(f"[{fila.dono}] {item.status} {item.title}", flush=True)
+        elif evento['tipo'] in ('erro', 'retentativa', 'disjuntor'):
+            print(evento['mensagem'], flush=True)
+
+    motor.subscribe(on_evento)
+    motor.metricas.nova_execucao()
+    trabalhador = TrabalhadorDistribuido(motor, fila, ao_erro=lambda mensagem: print(mensagem, flush=True))
+    print(f"Worker {fila.dono} na fila {args.fila_compartilhada} (Ctrl+C devolve os itens em andamento)", flush=True)
+    try:
+        resultado = trabalhador.executar()
+    except KeyboardInterrupt:
+        resultado = trabalhador.resultado
+    finally:
+        motor.encerrar(aguardar=False)
+        motor.metricas.fechar()
+    print(f"Concluídos: {resultado[STATUS_CONCLUIDO]} | Já baixados: {resultado[STATUS_IGNORADO]} | "
+          f"Erros: {resultado[STATUS_ERRO]}", flush=True)
+    restantes = fila.resumo()
+    print(f"Fila compartilhada: {restantes['pendentes']} pendente(s), {restantes['em_andamento']} em andamento "
+          f"em outros workers", flush=True)
+    return 0 if resultado[STATUS_ERRO] == 0 else 1
+
+def main_servico(args):
+    """Executa o motor como serviço, até Ctrl+C. Retorna o código de saída."""
+    format_type = args.format.upper() if args.format else initial_format_type
+    quality = args.quality or initial_quality
+    if quality not in engine.get_quality_options_for_format(format_type):
+        quality = engine.default_quality_for_format(format_type)
+    motor = criar_motor(args.pasta, format_type, quality, args.workers,
+                        journal=FilaJournal(args.journal or engine.JOURNAL_FULL_PATH),
+                        archive=DownloadArchive(engine.ARCHIVE_FULL_PATH), cache=criar_cache(),
+                        metricas=criar_metricas(args.metricas, args.prometheus),
+                        conexoes_por_item=args.conexoes or config['conexoes_por_item'],
+                        limite_banda_kbs=(args.limite_banda if args.limite_banda is not None
+                                          else config['limite_banda_kbs']),
+                        pasta_temporaria=(args.pasta_temporaria if args.pasta_temporaria is not None
+                                          else config['pasta_temporaria']))
+    try:
+        servidor = ServidorMotor(motor, config['servico_host'], args.porta or config['servico_porta'])
+    except OSError as e:
+        print(f"Não foi possível abrir a porta do serviço: {e}", file=sys.stderr)
+        motor.encerrar()
+        return 1
+    restaurados = motor.restaurar()
+    if restaurados:
+        print(f"↺ {restaurados} item(ns) restaurados da última sessão.")
+        motor.metricas.nova_execucao()
+        motor.iniciar()
+    print(f"Serviço no ar em {servidor.endereco} (Ctrl+C para encerrar)")
+    try:
+        servidor.servir()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.parar()
+        # Como ao fechar a GUI: os downloads em andamento guardam os .part para a próxima execução
+        if motor.pausar():
+            motor.aguardar(timeout=PAUSA_AO_FECHAR_TIMEOUT)
+        motor.encerrar(aguardar=False)
+        motor.metricas.fechar()
+    return 0
+
+def main_reconstruir_arquivo(args):
+    """Reescaneia a pasta de downloads e reconstrói o índice de downloads concluídos."""
+    pasta = args.pasta or initial_download_folder
+    ffprobe = engine.FFPROBE_PATH if os.path.exists(engine.FFPROBE_PATH) else 'ffprobe'
+    archive = DownloadArchive(engine.ARCHIVE_FULL_PATH)
+    qualidades = {formato: engine.get_quality_options_for_format(formato) for formato in ("MP3", "MP4")}
+    mantidos, adicionados, removidos = archive.reconstruir(pasta, ffprobe, qualidades, saida=sys.stdout)
+    print(f"Índice reconstruído: {mantidos} mantidos, {adicionados} adicionados, {removidos} removidos.")
+    return 0
+
 if __name__ == "__main__":
+    multiprocessing.freeze_support() # Necessário para o pool de conversão no executável PyInstaller
+    args = parse_args()
+    if args.reconstruir_arquivo:
+        sys.exit(main_reconstruir_arquivo(args))
+    if args.fila_compartilhada:
+        sys.exit(main_distribuido(args))
+    if args.batch:
+        sys.exit(main_batch(args))
+    if args.servico:
+        sys.exit(main_servico(args))
+    if tk is None:
+        print("A interface gráfica precisa do tkinter, que não está disponível neste Python. "
+              "Use --batch, --servico ou --fila-compartilhada.", file=sys.stderr)
+        sys.exit(1)
     root = tk.Tk()
     app = YouTubeMP3Downloader(root)
     root.mainloop()
\ No newline at end of file
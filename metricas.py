@@ -0,0 +1,173 @@
+# YouTube MP3 Downloader PRO - Tempos por fase dos itens da fila (log JSONL e textfile do Prometheus)
+
+# --------------------------------------------------------------------------------------------------
+# 1. Importações de Módulos
+# --------------------------------------------------------------------------------------------------
+import os
+import json
+import math
+import threading
+from collections import deque
+
+# --------------------------------------------------------------------------------------------------
+# 2. Configurações Globais
+# --------------------------------------------------------------------------------------------------
+# Cada fase é medida entre dois marcos gravados em item.tempos
+FASES = {
+    'espera': ('enfileirado', 'iniciado'), # Aguardando um worker livre
+    'extracao': ('extracao_inicio', 'extracao_fim'), # extract_info (metadados)
+    'download': ('download_inicio', 'download_fim'), # Transferência pela rede
+    'pos_processamento': ('pos_inicio', 'pos_fim'), # FFmpeg
+    'total': ('enfileirado', 'finalizado'),
+}
+PERCENTIS = (50, 90, 99)
+AMOSTRAS_PROMETHEUS = 1000 # Amostras recentes por fase usadas nos quantis do textfile
+
+# --------------------------------------------------------------------------------------------------
+# 3. Funções Auxiliares
+# --------------------------------------------------------------------------------------------------
+def percentil(valores_ordenados, p):
+    """Percentil p (0-100) pelo método do posto mais próximo; None para uma lista vazia."""
+    if not valores_ordenados:
+        return None
+    posto = max(math.ceil(p / 100 * len(valores_ordenados)), 1)
+    return valores_ordenados[posto - 1]
+
+def duracoes(tempos):
+    """Duração (s) de cada fase cujos dois marcos foram registrados."""
+    resultado = {}
+    for fase, (inicio, fim) in FASES.items():
+        if inicio in tempos and fim in tempos:
+            resultado[fase] = max(tempos[fim] - tempos[inicio], 0.0)
+    return resultado
+
+def _rotulo(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# --------------------------------------------------------------------------------------------------
+# 4. Registro de Métricas
+# --------------------------------------------------------------------------------------------------
+class RegistroMetricas:
+    """Recebe os itens finalizados e registra o tempo gasto em cada fase.
+
+    Cada item vira uma linha no log JSON-lines (`path_jsonl`), gravada assim que o item
+    termina. As durações da execução atual alimentam `resumo()`, com os percentis por fase;
+    `nova_execucao()` zera esse resumo. Com `path_prometheus`, `escrever_prometheus()` grava
+    contadores e quantis no formato de textfile do node_exporter.
+    """
+
+    def __init__(self, path_jsonl=None, path_prometheus=None, prefixo='ytdl'):
+        self.path_jsonl = path_jsonl
+        self.path_prometheus = path_prometheus
+        self.prefixo = prefixo
+        self._lock = threading.Lock()
+        self._arquivo = open(path_jsonl, 'a', encoding='utf-8') if path_jsonl else None
+        self._execucao = {fase: [] for fase in FASES}
+        self._itens_execucao = 0
+        self._bytes_execucao = 0
+        # Acumulados desde a criação (contadores do Prometheus)
+        self._recentes = {fase: deque(maxlen=AMOSTRAS_PROMETHEUS) for fase in FASES}
+        self._soma = {fase: 0.0 for fase in FASES}
+        self._contagem = {fase: 0 for fase in FASES}
+        self._por_status = {}
+        self._bytes_total = 0
+
+    def nova_execucao(self):
+        """Começa um novo resumo (chamado quando a fila volta a ser processada)."""
+        with self._lock:
+            self._execucao = {fase: [] for fase in FASES}
+            self._itens_execucao = 0
+            self._bytes_execucao = 0
+
+    def registrar(self, item):
+        """Registra um item finalizado (qualquer status) e retorna a linha gravada no log."""
+        fases = duracoes(item.tempos)
+        segundos_download = fases.get('download')
+        linha = {
+            'id': item.id,
+            'video_id': item.video_id,
+            'url': item.url,
+            'title': item.title,
+            'status': item.status,
+            'tempos': item.tempos,
+            'duracoes': fases,
+            'bytes': item.bytes,
+            'velocidade_media': item.bytes / segundos_download if segundos_download else None,
+        }
+        with self._lock:
+            for fase, segundos in fases.items():
+                self._execucao[fase].append(segundos)
+                self._recentes[fase].append(segundos)
+                self._soma[fase] += segundos
+                self._contagem[fase] += 1
+            self._itens_execucao += 1
+            self._bytes_execucao += item.bytes
+            self._por_status[item.status] = self._por_status.get(item.status, 0) + 1
+            self._bytes_total += item.bytes
+            if self._arquivo is not None:
+                self._arquivo.write(json.dumps(linha, ensure_ascii=False) + "\n")
+                self._arquivo.flush()
+        return linha
+
+    def resumo(self):
+        """Percentis por fase da execução atual: {fase: {'n', 'p50', 'p90', 'p99', 'max'}}."""
+        with self._lock:
+            amostras = {fase: sorted(valores) for fase, valores in self._execucao.items()}
+        resultado = {}
+        for fase, valores in amostras.items():
+            estatisticas = {'n': len(valores), 'max': valores[-1] if valores else None}
+            for p in PERCENTIS:
+                estatisticas[f'p{p}'] = percentil(valores, p)
+            resultado[fase] = estatisticas
+        return resultado
+
+    def totais_execucao(self):
+        """(itens, bytes) finalizados na execução atual."""
+        with self._lock:
+            return self._itens_execucao, self._bytes_execucao
+
+    def formatar_resumo(self):
+        """O resumo da execução como uma tabela de texto (modo em lote)."""
+        colunas = ["n"] + [f"p{p}" for p in PERCENTIS] + ["max"]
+        linhas = [f"{'Fase':<18}" + "".join(f"{c:>10}" for c in colunas)]
+        for fase, estatisticas in self.resumo().items():
+            valores = [str(estatisticas['n'])] + [
+                "-" if estatisticas[c] is None else f"{estatisticas[c]:.2f}s" for c in colunas[1:]]
+            linhas.append(f"{fase:<18}" + "".join(f"{v:>10}" for v in valores))
+        return "\n".join(linhas)
+
+    def escrever_prometheus(self):
+        """Grava o textfile do Prometheus (substituição atômica). Sem `path_prometheus`, não faz nada."""
+        if not self.path_prometheus:
+            return
+        p = self.prefixo
+        with self._lock:
+            recentes = {fase: sorted(valores) for fase, valores in self._recentes.items()}
+            soma, contagem = dict(self._soma), dict(self._contagem)
+            por_status, bytes_total = dict(self._por_status), self._bytes_total
+        linhas = [f"# HELP {p}_fase_segundos Duração das fases dos itens da fila.",
+                  f"# TYPE {p}_fase_segundos summary"]
+        for fase in FASES:
+            for q in PERCENTIS:
+                valor = percentil(recentes[fase], q)
+                if valor is not None:
+                    linhas.append(f'{p}_fase_segundos{{fase="{fase}",quantile="{q / 100}"}} {valor:.6f}')
+            linhas.append(f'{p}_fase_segundos_sum{{fase="{fase}"}} {soma[fase]:.6f}')
+            linhas.append(f'{p}_fase_segundos_count{{fase="{fase}"}} {contagem[fase]}')
+        linhas += [f"# HELP {p}_itens_total Itens da fila finalizados, por status.",
+                   f"# TYPE {p}_itens_total counter"]
+        linhas += [f'{p}_itens_total{{status="{_rotulo(status)}"}} {n}' for status, n in por_status.items()]
+        linhas += [f"# HELP {p}_bytes_total Bytes baixados pelos itens da fila.",
+                   f"# TYPE {p}_bytes_total counter",
+                   f"{p}_bytes_total {bytes_total}"]
+        temporario = self.path_prometheus + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            f.write("\n".join(linhas) + "\n")
+        os.replace(temporario, self.path_prometheus) # O coletor nunca lê um arquivo pela metade
+
+    def fechar(self):
+        """Fecha o log JSON-lines."""
+        with self._lock:
+            if self._arquivo is not None:
+                self._arquivo.close()
+                self._arquivo = None
@@ -0,0 +1,177 @@
+# YouTube MP3 Downloader PRO - Classificação de erros, backoff com jitter e disjuntor de falhas
+
+# --------------------------------------------------------------------------------------------------
+# 1. Importações de Módulos
+# --------------------------------------------------------------------------------------------------
+import re
+import random
+import threading
+import time
+from collections import deque
+
+# --------------------------------------------------------------------------------------------------
+# 2. Configurações Globais
+# --------------------------------------------------------------------------------------------------
+ERRO_TRANSITORIO = 'transitorio' # Vale tentar de novo mais tarde (limite de taxa, rede, servidor)
+ERRO_PERMANENTE = 'permanente' # Tentar de novo não adianta (vídeo removido, privado, URL inválida)
+
+HTTP_TRANSITORIOS = {403, 408, 425, 429, 500, 502, 503, 504} # 403: URLs de mídia expiradas/limitadas
+HTTP_PERMANENTES = {400, 401, 404, 410, 451}
+
+# Mensagens do yt-dlp, verificadas quando a exceção original não informa um status HTTP
+_PERMANENTES_RE = re.compile(
+    r'Video unavailable|Private video|has been removed|no longer available|not available in your country'
+    r'|copyright|Unsupported URL|is not a valid URL|Sign in to confirm your age|members-only'
+    r'|Requested format is not available|Incomplete YouTube ID|HTTP Error (?:400|401|404|410|451)',
+    re.IGNORECASE)
+_TRANSITORIOS_RE = re.compile(
+    r'HTTP Error (?:403|408|425|429|5\d\d)|Too Many Requests|rate.?limit|not a bot|timed? ?out'
+    r'|Connection (?:reset|refused|aborted)|Remote end closed|Temporary failure|Network is unreachable'
+    r'|IncompleteRead|bytes read|urlopen error|Read timed out|Got server HTTP error',
+    re.IGNORECASE)
+# Classes de exceção (pelo nome, para não importar o yt-dlp) que indicam falha de rede
+_CLASSES_TRANSITORIAS = {'TransportError', 'IncompleteRead', 'ContentTooShortError', 'ConnectionError',
+                         'TimeoutError', 'timeout', 'ProxyError', 'SSLError'}
+
+# Disjuntor: quando a taxa de falhas transitórias dispara, a fila desacelera ou para um pouco
+DISJUNTOR_JANELA = 20 # Resultados recentes considerados
+DISJUNTOR_JANELA_S = 120.0 # Resultados mais antigos que isso saem da janela
+DISJUNTOR_MINIMO = 8 # Resultados necessários antes de qualquer decisão
+DISJUNTOR_LIMITE = 0.5 # Fração de falhas que abre o disjuntor
+DISJUNTOR_PAUSA_S = 60.0 # Primeira pausa da fila; dobra a cada nova abertura seguida
+DISJUNTOR_PAUSA_MAX_S = 600.0
+DISJUNTOR_RECUPERACAO = 10 # Sucessos seguidos para devolver um passo de concorrência
+
+# --------------------------------------------------------------------------------------------------
+# 3. Classificação e Backoff
+# --------------------------------------------------------------------------------------------------
+def _cadeia(erro):
+    """A exceção e as que ela encapsula (exc_info do DownloadError, cause do ExtractorError, __cause__)."""
+    vistos = set()
+    pendentes = [erro]
+    while pendentes:
+        atual = pendentes.pop()
+        if atual is None or id(atual) in vistos or not isinstance(atual, BaseException):
+            continue
+        vistos.add(id(atual))
+        yield atual
+        exc_info = getattr(atual, 'exc_info', None)
+        if isinstance(exc_info, tuple) and len(exc_info) > 1:
+            pendentes.append(exc_info[1])
+        pendentes += [getattr(atual, 'cause', None), atual.__cause__, atual.__context__]
+
+def _status_http(erro):
+    status = getattr(erro, 'status', None) or getattr(erro, 'code', None)
+    return status if isinstance(status, int) and 100 <= status <= 599 else None
+
+def classificar_erro(erro):
+    """Classifica uma falha de download como ERRO_TRANSITORIO ou ERRO_PERMANENTE.
+
+    A ordem de decisão é: status HTTP da exceção original, mensagens conhecidas do
+    yt-dlp, erros de extração "esperados" (permanentes) e classes de erro de rede
+    (transitórias). O que não se encaixa em nada é tratado como permanente, para não
+    gastar tentativas com um erro que vai se repetir.
+    """
+    cadeia = list(_cadeia(erro))
+    for excecao in cadeia:
+        status = _status_http(excecao)
+        if status in HTTP_TRANSITORIOS:
+            return ERRO_TRANSITORIO
+        if status in HTTP_PERMANENTES:
+            return ERRO_PERMANENTE
+    mensagem = " ".join(str(excecao) for excecao in cadeia)
+    if _PERMANENTES_RE.search(mensagem):
+        return ERRO_PERMANENTE
+    if _TRANSITORIOS_RE.search(mensagem):
+        return ERRO_TRANSITORIO
+    for excecao in cadeia:
+        if getattr(excecao, 'expected', False):
+            return ERRO_PERMANENTE
+        classes = {classe.__name__ for classe in type(excecao).__mro__}
+        if classes & _CLASSES_TRANSITORIAS:
+            return ERRO_TRANSITORIO
+    return ERRO_PERMANENTE
+
+def atraso_backoff(tentativa, base, maximo, aleatorio=random.random):
+    """Espera antes da `tentativa`-ésima nova tentativa: backoff exponencial com jitter.
+
+    O teto dobra a cada tentativa (base, 2·base, 4·base, ... até `maximo`) e a espera é
+    sorteada entre metade do teto e o teto, para que os itens que falharam juntos (um 429
+    em uma playlist inteira) não voltem todos no mesmo instante.
+    """
+    teto = min(maximo, base * 2 ** max(tentativa - 1, 0))
+    return teto / 2 + aleatorio() * teto / 2
+
+# --------------------------------------------------------------------------------------------------
+# 4. Disjuntor de Falhas
+# --------------------------------------------------------------------------------------------------
+class DisjuntorFalhas:
+    """Acompanha a taxa de falhas transitórias da fila e decide quando desacelerar.
+
+    `registrar(sucesso)` recebe o resultado de cada download. Quando, entre os últimos
+    resultados, a fração de falhas passa de `limite`, o disjuntor "abre": o limite de
+    downloads simultâneos cai pela metade e, se já estava em 1, a fila é pausada por
+    `pausa_s` (que dobra a cada abertura seguida, até `pausa_max_s`). Depois de
+    `recuperacao` sucessos seguidos, a concorrência volta a subir um passo (dobra).
+
+    Os retornos dizem ao motor o que fazer: None, ('reduzir', limite), ('pausar', segundos)
+    ou ('restaurar', limite). Limite None significa "sem limite do disjuntor". A taxa de
+    falhas que provocou a última abertura fica em `taxa_abertura`.
+    """
+
+    def __init__(self, janela=DISJUNTOR_JANELA, janela_s=DISJUNTOR_JANELA_S, minimo=DISJUNTOR_MINIMO,
+                 limite=DISJUNTOR_LIMITE, pausa_s=DISJUNTOR_PAUSA_S, pausa_max_s=DISJUNTOR_PAUSA_MAX_S,
+                 recuperacao=DISJUNTOR_RECUPERACAO):
+        self.janela_s = janela_s
+        self.minimo = minimo
+        self.limite = limite
+        self.pausa_s = pausa_s
+        self.pausa_max_s = pausa_max_s
+        self.recuperacao = recuperacao
+        self.limite_workers = None # Concorrência imposta pelo disjuntor (None = a configurada)
+        self.taxa_abertura = 0.0
+        self._resultados = deque(maxlen=janela) # (time.monotonic(), sucesso)
+        self._sucessos_seguidos = 0
+        self._aberturas_seguidas = 0
+        self._lock = threading.Lock()
+
+    def taxa_falhas(self):
+        with self._lock:
+            return self._taxa(time.monotonic())
+
+    def _taxa(self, agora):
+        while self._resultados and agora - self._resultados[0][0] > self.janela_s:
+            self._resultados.popleft()
+        if not self._resultados:
+            return 0.0
+        return sum(1 for _, sucesso in self._resultados if not sucesso) / len(self._resultados)
+
+    def registrar(self, sucesso, max_workers):
+        """Registra um resultado e retorna a ação que o motor deve tomar (ou None)."""
+        agora = time.monotonic()
+        with self._lock:
+            self._resultados.append((agora, sucesso))
+            if sucesso:
+                self._sucessos_seguidos += 1
+                if self.limite_workers is not None and self._sucessos_seguidos >= self.recuperacao:
+                    self._sucessos_seguidos = 0
+                    self._aberturas_seguidas = 0
+                    novo = self.limite_workers * 2
+                    self.limite_workers = None if novo >= max_workers else novo
+                    return ('restaurar', self.limite_workers)
+                return None
+            self._sucessos_seguidos = 0
+            taxa = self._taxa(agora)
+            if len(self._resultados) < self.minimo or taxa < self.limite:
+                return None
+            # Abre: a janela recomeça, para que a próxima decisão use só resultados novos
+            self.taxa_abertura = taxa
+            self._resultados.clear()
+            atual = self.limite_workers if self.limite_workers is not None else max_workers
+            if atual > 1:
+                self.limite_workers = atual // 2
+                return ('reduzir', self.limite_workers)
+            self.limite_workers = 1
+            pausa = min(self.pausa_s * 2 ** self._aberturas_seguidas, self.pausa_max_s)
+            self._aberturas_seguidas += 1
+            return ('pausar', pausa)
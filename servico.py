@@ -0,0 +1,853 @@
+# YouTube MP3 Downloader PRO - Serviço local: API HTTP/JSON sobre um único motor, e o cliente da GUI
+
+# --------------------------------------------------------------------------------------------------
+# 1. Importações de Módulos
+# --------------------------------------------------------------------------------------------------
+import os
+import hmac
+import json
+import queue
+import secrets
+import time
+import itertools
+import threading
+import http.client
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from engine import APPLICATION_BASE_PATH, DEFAULT_CONFIG, default_quality_for_format, normalizar_alvos
+from fila import FilaItem, STATUS_EM_ANDAMENTO
+
+# --------------------------------------------------------------------------------------------------
+# 2. Configurações Globais
+# --------------------------------------------------------------------------------------------------
+HOST_PADRAO = DEFAULT_CONFIG['servico_host'] # Só a máquina local
+PORTA_PADRAO = DEFAULT_CONFIG['servico_porta']
+TOKEN_FULL_PATH = os.path.join(APPLICATION_BASE_PATH, 'servico.token') # Segredo da instalação, lido pelos clientes
+HOSTS_LOCAIS = ('127.0.0.1', 'localhost', '[::1]') # Nomes aceitos no cabeçalho Host quando o serviço escuta em loopback
+PROGRESSO_SSE_HZ = 5 # Frequência máxima dos eventos 'progresso' enviados a cada cliente
+KEEPALIVE_S = 15.0 # Comentário SSE periódico, para detectar clientes que sumiram
+FILA_EVENTOS_MAX = 10000 # Eventos pendentes por cliente; um cliente travado é desconectado
+TIMEOUT_CONEXAO_S = 0.5 # Para descobrir se há um serviço rodando ao abrir a GUI
+TIMEOUT_REQUISICAO_S = 10.0
+RECONECTAR_S = 1.0
+JOBS_MAX = 500 # Jobs concluídos mantidos para consulta
+IMPORTACAO_PARTE_LINHAS = 5000 # Linhas por requisição de uma importação enviada em partes
+IMPORTACAO_PARTES_MAX = 4 # Partes recebidas e ainda não lidas pelo motor; além disso, o envio espera
+IMPORTACAO_ESPERA_S = 300.0 # Sem uma nova parte nesse tempo, a importação é encerrada
+
+class ErroServico(Exception):
+    """Falha em uma chamada à API do serviço (HTTP de erro ou serviço fora do ar)."""
+
+def ler_token(caminho=TOKEN_FULL_PATH):
+    """O token do serviço gravado em `caminho`, ou None se ainda não existir."""
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def ler_ou_criar_token(caminho=TOKEN_FULL_PATH):
+    """O token do serviço, gerado na primeira execução em um arquivo legível só pelo usuário."""
+    token = ler_token(caminho)
+    if token:
+        return token
+    token = secrets.token_urlsafe(32)
+    try:
+        fd = os.open(caminho, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError: # Outro processo criou o arquivo ao mesmo tempo
+        return ler_token(caminho)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(token)
+    return token
+
+# --------------------------------------------------------------------------------------------------
+# 3. Serialização
+# --------------------------------------------------------------------------------------------------
+def item_para_dict(item):
+    """Campos públicos de um FilaItem, em JSON."""
+    return {
+        'id': item.id,
+        'title': item.title,
+        'url': item.url,
+        'status': item.status,
+        'video_id': item.video_id,
+        'prioridade': item.prioridade,
+        'alvos': item.alvos,
+        'progresso': item.progresso,
+        'velocidade': item.velocidade,
+        'tentativas': item.tentativas,
+        'bytes': item.bytes,
+        'parcial': item.parcial,
+    }
+
+def evento_para_dict(evento):
+    """Um evento do motor com os itens convertidos para dicionários."""
+    resultado = {}
+    for chave, valor in evento.items():
+        if isinstance(valor, FilaItem):
+            valor = item_para_dict(valor)
+        elif isinstance(valor, list) and valor and isinstance(valor[0], FilaItem):
+            valor = [item_para_dict(item) for item in valor]
+        resultado[chave] = valor
+    return resultado
+
+# --------------------------------------------------------------------------------------------------
+# 4. Servidor (modo serviço)
+# --------------------------------------------------------------------------------------------------
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._despachar('GET')
+
+    def do_POST(self):
+        self._despachar('POST')
+
+    def _despachar(self, metodo):
+        recusa = self._recusar(metodo)
+        if recusa is not None:
+            return self._json(*recusa)
+        caminho = urlsplit(self.path).path.strip('/').split('/')
+        if caminho[:1] != ['api']:
+            return self._json(404, {'erro': "Rota desconhecida"})
+        try:
+            corpo = self._ler_corpo() if metodo == 'POST' else {}
+        except ValueError:
+            return self._json(400, {'erro': "O corpo deve ser um objeto JSON"})
+        if caminho == ['api', 'eventos'] and metodo == 'GET':
+            return self.server.servico.transmitir_eventos(self)
+        try:
+            status, resposta = self.server.servico.responder(metodo, caminho[1:], corpo)
+        except ValueError as e:
+            status, resposta = 400, {'erro': str(e)}
+        except Exception as e:
+            status, resposta = 500, {'erro': f"{type(e).__name__}: {e}"}
+        self._json(status, resposta)
+
+    def _recusar(self, metodo):
+        """(status, resposta) de uma requisição que não veio de um cliente local autorizado; senão None.
+
+        Páginas abertas no navegador alcançam 127.0.0.1 (inclusive por DNS rebinding), por isso
+        pedidos com Origin, com outro Host ou sem JSON são recusados antes do token.
+        """
+        servico = self.server.servico
+        if self.headers.get('Origin') is not None:
+            return 403, {'erro': "Requisições de navegadores não são aceitas"}
+        if (self.headers.get('Host') or '').lower() not in servico.hosts_aceitos:
+            return 403, {'erro': "Cabeçalho Host inválido"}
+        autorizacao = self.headers.get('Authorization') or ''
+        if not hmac.compare_digest(autorizacao.encode('utf-8'), f"Bearer {servico.token}".encode('utf-8')):
+            return 401, {'erro': f"Token ausente ou inválido (veja {TOKEN_FULL_PATH})"}
+        tipo = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+        if metodo == 'POST' and tipo != 'application/json':
+            return 415, {'erro': "Use Content-Type: application/json"}
+        return None
+
+    def _ler_corpo(self):
+        tamanho = int(self.headers.get('Content-Length') or 0)
+        if not tamanho:
+            return {}
+        corpo = json.loads(self.rfile.read(tamanho))
+        if not isinstance(corpo, dict):
+            raise ValueError(corpo)
+        return corpo
+
+    def _json(self, status, dados):
+        corpo = json.dumps(dados, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+class ServidorMotor:
+    """Expõe um DownloadEngine por uma API HTTP/JSON local, com eventos por SSE.
+
+    Todos os clientes (scripts, outras janelas da GUI) compartilham a mesma fila, os
+    mesmos workers e o mesmo limite de banda. Rotas:
+
+        GET  /api/estado                  -> estado do motor e configurações compartilhadas
+        GET  /api/fila                    -> itens da fila
+        GET  /api/itens/<id>              -> um item
+        POST /api/itens/<id>/cancelar     -> cancela o item
+        POST /api/itens/<id>/topo         -> move o item pendente para o topo
+        POST /api/pausar | /api/retomar | /api/limpar
+        POST /api/iniciar                 -> inicia os workers sem desfazer uma pausa
+        POST /api/config                  -> {pasta (dentro da pasta inicial), downloads_simultaneos, limite_banda_kbs}
+        POST /api/jobs                    -> {urls, formato?, qualidade?, alvos?, aguardar?}
+        POST /api/importar                -> {linhas, csv?, formato?, qualidade?, alvos?, continua?, aguardar?}
+        POST /api/importar/<id>           -> {linhas, continua?, aguardar?}: próxima parte da importação
+        GET  /api/jobs | /api/jobs/<id>   -> jobs enviados e seus resultados
+        GET  /api/metricas                -> percentis por fase da execução atual
+        GET  /api/eventos                 -> fluxo SSE com os eventos do motor, 'progresso' e 'estado'
+
+    Um job é analisado em segundo plano (202) ou, com "aguardar": true, antes da resposta.
+    Uma importação é um job que passa as linhas (de um arquivo de texto ou CSV) por
+    `DownloadEngine.importar` e guarda o resumo em 'resumo'. Com "continua": true, as
+    linhas seguintes chegam em outras requisições, em /api/importar/<id>, e o motor as lê
+    conforme chegam; a última parte vem sem "continua".
+
+    Toda requisição leva `Authorization: Bearer <token>`, com o token do arquivo `token_path`
+    (criado na primeira execução), e os POSTs levam `Content-Type: application/json`.
+    """
+
+    def __init__(self, engine, host=HOST_PADRAO, porta=PORTA_PADRAO, token_path=TOKEN_FULL_PATH):
+        self.engine = engine
+        self.token = ler_ou_criar_token(token_path)
+        self.pasta_raiz = os.path.realpath(engine.download_folder) # /api/config só troca por subpastas dela
+        self._clientes = set() # Filas de eventos dos clientes SSE conectados
+        self._clientes_lock = threading.Lock()
+        self._jobs = {} # id -> dicionário do job
+        self._jobs_lock = threading.Lock()
+        self._ids_jobs = itertools.count(1)
+        self._importacoes = {} # id do job -> (fila de partes, evento de conclusão) das importações recebendo linhas
+        self._httpd = ThreadingHTTPServer((host, porta), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.servico = self
+        self.hosts_aceitos = self._hosts_aceitos(host)
+        self._thread = None
+        engine.subscribe(self._on_evento)
+
+    def _hosts_aceitos(self, host):
+        """Valores aceitos no cabeçalho Host: o endereço em que o servidor escuta."""
+        porta = self._httpd.server_address[1]
+        nomes = {host.lower(), f"[{host.lower()}]"}
+        if host in ('127.0.0.1', '::1', 'localhost'):
+            nomes.update(HOSTS_LOCAIS)
+        return {f"{nome}:{porta}" for nome in nomes}
+
+    @property
+    def endereco(self):
+        host, porta = self._httpd.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def iniciar(self):
+        """Atende as requisições em uma thread em segundo plano."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def servir(self):
+        """Atende as requisições na thread atual, até `parar` ser chamado."""
+        self._httpd.serve_forever()
+
+    def parar(self):
+        self.engine.unsubscribe(self._on_evento)
+        if self._thread is not None: # Com `servir`, o laço já terminou (Ctrl+C) na própria thread
+            self._httpd.shutdown()
+        self._httpd.server_close()
+        with self._clientes_lock:
+            for fila in self._clientes:
+                fila.put(None) # Encerra os fluxos SSE abertos
+
+    # ---------------------------------------------------------------- Eventos
+    def _on_evento(self, evento):
+        """Repassa um evento do motor (em uma thread de worker) a todos os clientes SSE."""
+        dados = json.dumps(evento_para_dict(evento), ensure_ascii=False, default=str)
+        with self._clientes_lock:
+            travados = []
+            for fila in self._clientes:
+                try:
+                    fila.put_nowait(dados)
+                except queue.Full:
+                    travados.append(fila)
+            for fila in travados:
+                self._clientes.discard(fila)
+
+    def transmitir_eventos(self, handler):
+        """Mantém a conexão aberta enviando os eventos como Server-Sent Events."""
+        fila = queue.Queue(maxsize=FILA_EVENTOS_MAX)
+        with self._clientes_lock:
+            self._clientes.add(fila)
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        handler.send_header('Cache-Control', 'no-cache')
+        handler.send_header('Connection', 'close')
+        handler.end_headers()
+        handler.close_connection = True
+        intervalo = 1 / PROGRESSO_SSE_HZ
+        versao_enviada = estado_enviado = None
+        ultimo_envio = time.monotonic()
+        try:
+            handler.wfile.write(b": conectado\n\n")
+            handler.wfile.flush()
+            while True:
+                try:
+                    dados = fila.get(timeout=intervalo)
+                except queue.Empty:
+                    dados = ''
+                if dados is None:
+                    return
+                blocos = [f"data: {dados}\n\n"] if dados else []
+                versao, estados = self.engine.progresso_atual()
+                if versao != versao_enviada:
+                    versao_enviada = versao
+                    estados.pop(None, None) # Downloads avulsos do próprio serviço
+                    progresso = {'tipo': 'progresso', 'versao': versao, 'estados': estados}
+                    blocos.append(f"data: {json.dumps(progresso, default=str)}\n\n")
+                estado = self.estado()
+                if estado != estado_enviado: # Os clientes respondem a 'pausado' e afins sem consultar a API
+                    estado_enviado = estado
+                    blocos.append(f"data: {json.dumps({'tipo': 'estado', **estado}, default=str)}\n\n")
+                if not blocos and time.monotonic() - ultimo_envio > KEEPALIVE_S:
+                    blocos.append(": keepalive\n\n")
+                if blocos:
+                    handler.wfile.write("".join(blocos).encode('utf-8'))
+                    handler.wfile.flush()
+                    ultimo_envio = time.monotonic()
+        except OSError:
+            pass # Cliente desconectado
+        finally:
+            with self._clientes_lock:
+                self._clientes.discard(fila)
+
+    # ---------------------------------------------------------------- Rotas
+    def responder(self, metodo, caminho, corpo):
+        """(status HTTP, resposta) de uma requisição da API (sem o prefixo /api)."""
+        engine = self.engine
+        if metodo == 'GET':
+            if caminho == ['estado']:
+                return 200, self.estado()
+            if caminho == ['fila']:
+                return 200, {'itens': [item_para_dict(item) for item in engine.snapshot()]}
+            if len(caminho) == 2 and caminho[0] == 'itens':
+                item = engine.obter(self._id(caminho[1]))
+                return (200, item_para_dict(item)) if item is not None else (404, {'erro': "Item não encontrado"})
+            if caminho == ['jobs']:
+                with self._jobs_lock:
+                    return 200, {'jobs': [dict(job) for job in self._jobs.values()]}
+            if len(caminho) == 2 and caminho[0] == 'jobs':
+                with self._jobs_lock:
+                    job = self._jobs.get(self._id(caminho[1]))
+                    return (200, dict(job)) if job is not None else (404, {'erro': "Job não encontrado"})
+            if caminho == ['metricas']:
+                if engine.metricas is None:
+                    return 200, {'resumo': None, 'itens': 0, 'bytes': 0}
+                itens, total_bytes = engine.metricas.totais_execucao()
+                return 200, {'resumo': engine.metricas.resumo(), 'itens': itens, 'bytes': total_bytes}
+        elif metodo == 'POST':
+            if len(caminho) == 3 and caminho[0] == 'itens' and caminho[2] in ('cancelar', 'topo'):
+                item_id = self._id(caminho[1])
+                ok = engine.cancelar(item_id) if caminho[2] == 'cancelar' else engine.mover_para_topo(item_id)
+                return 200, {'ok': bool(ok)}
+            if caminho == ['pausar']:
+                return 200, {'ok': engine.pausar(), 'estado': self.estado()}
+            if caminho == ['retomar']:
+                self._nova_execucao_se_parado()
+                engine.retomar()
+                return 200, {'ok': True, 'estado': self.estado()}
+            if caminho == ['iniciar']:
+                self._nova_execucao_se_parado()
+                engine.iniciar()
+                return 200, {'ok': True, 'estado': self.estado()}
+            if caminho == ['limpar']:
+                return 200, {'ok': True, 'ha_ativos': engine.limpar(), 'estado': self.estado()}
+            if caminho == ['config']:
+                self.configurar(corpo)
+                return 200, self.estado()
+            if caminho == ['jobs']:
+                return self.enviar_job(corpo)
+            if caminho == ['importar']:
+                return self.enviar_importacao(corpo)
+            if len(caminho) == 2 and caminho[0] == 'importar':
+                return self.receber_linhas(self._id(caminho[1]), corpo)
+        return 404, {'erro': "Rota desconhecida"}
+
+    @staticmethod
+    def _id(texto):
+        try:
+            return int(texto)
+        except ValueError:
+            raise ValueError(f"Id inválido: {texto}")
+
+    def estado(self):
+        engine = self.engine
+        return {
+            'em_processamento': engine.em_processamento,
+            'pausado': engine.pausado,
+            'pausado_pelo_disjuntor': engine.pausado_pelo_disjuntor,
+            'workers_ativos': engine.workers_ativos,
+            'itens': len(engine.fila),
+            **engine.config_dict(),
+        }
+
+    def configurar(self, corpo):
+        """Aplica as configurações compartilhadas (valem para todos os clientes)."""
+        if 'limite_banda_kbs' in corpo:
+            self.engine.definir_limite_banda(corpo['limite_banda_kbs'])
+        pasta = corpo.get('pasta')
+        if pasta is not None:
+            pasta = self._subpasta(pasta)
+        workers = corpo.get('downloads_simultaneos')
+        if pasta is not None or workers is not None:
+            self.engine.configure(download_folder=pasta, max_workers=workers)
+
+    def _subpasta(self, pasta):
+        """O caminho real de `pasta` (relativa à pasta inicial do serviço), que deve ficar dentro dela."""
+        if not isinstance(pasta, str) or not pasta.strip():
+            raise ValueError("'pasta' deve ser um caminho")
+        real = os.path.realpath(os.path.join(self.pasta_raiz, pasta))
+        if os.path.commonpath([self.pasta_raiz, real]) != self.pasta_raiz:
+            raise ValueError(f"A pasta deve ficar dentro de {self.pasta_raiz}")
+        return real
+
+    def _nova_execucao_se_parado(self):
+        if not self.engine.em_processamento and self.engine.metricas is not None:
+            self.engine.metricas.nova_execucao()
+
+    def _alvos(self, corpo):
+        """Alvos de um job: 'alvos', ou 'formato'/'qualidade' quando diferem do padrão do serviço."""
+        alvos = corpo.get('alvos')
+        if alvos is None and (corpo.get('formato') or corpo.get('qualidade')):
+            # Formato próprio do job: vira um alvo único, sem mudar o padrão do serviço
+            formato = (corpo.get('formato') or self.engine.format_type).upper()
+            alvos = [(formato, corpo.get('qualidade') or default_quality_for_format(formato))]
+            if alvos[0] == (self.engine.format_type, self.engine.quality):
+                alvos = None
+        return normalizar_alvos(alvos) # ValueError -> 400
+
+    def _registrar_job(self, job, aguardar, processar):
+        job.update(id=next(self._ids_jobs), estado='analisando', criado_em=time.time())
+        with self._jobs_lock:
+            self._jobs[job['id']] = job
+            for antigo in [j for j in self._jobs if self._jobs[j]['estado'] == 'concluido'][:-JOBS_MAX]:
+                del self._jobs[antigo]
+        if aguardar:
+            processar(job)
+            return 200, dict(job)
+        threading.Thread(target=processar, args=(job,), daemon=True).start()
+        return 202, dict(job)
+
+    def enviar_job(self, corpo):
+        """Valida e enfileira um job: uma ou mais URLs (vídeos ou playlists)."""
+        urls = corpo.get('urls')
+        if isinstance(urls, str):
+            urls = [urls]
+        if not urls or not all(isinstance(url, str) and url.strip() for url in urls):
+            raise ValueError("Informe 'urls': uma lista de URLs de vídeos ou playlists")
+        job = {'urls': [url.strip() for url in urls], 'alvos': self._alvos(corpo), 'adicionados': {}, 'erros': {}}
+        return self._registrar_job(job, corpo.get('aguardar'), self._processar_job)
+
+    @staticmethod
+    def _linhas(corpo):
+        linhas = corpo.get('linhas')
+        if isinstance(linhas, str):
+            linhas = linhas.splitlines()
+        if not isinstance(linhas, list) or not all(isinstance(linha, str) for linha in linhas):
+            raise ValueError("Informe 'linhas': o conteúdo do arquivo, como texto ou lista de linhas")
+        return linhas
+
+    def enviar_importacao(self, corpo):
+        """Valida e inicia uma importação em massa: as linhas de um arquivo de texto ou CSV."""
+        linhas = self._linhas(corpo)
+        job = {'tipo': 'importacao', 'linhas': 0, 'alvos': self._alvos(corpo), 'resumo': None}
+        partes = queue.Queue(maxsize=IMPORTACAO_PARTES_MAX)
+        concluida = threading.Event()
+        self._registrar_job(job, False, lambda job: self._processar_importacao(job, partes, concluida,
+                                                                               bool(corpo.get('csv'))))
+        with self._jobs_lock:
+            if not concluida.is_set():
+                self._importacoes[job['id']] = (partes, concluida)
+        return self.receber_linhas(job['id'], corpo, linhas)
+
+    def receber_linhas(self, job_id, corpo, linhas=None):
+        """Entrega uma parte das linhas ao motor; sem "continua", é a última parte."""
+        if linhas is None:
+            linhas = self._linhas(corpo)
+        with self._jobs_lock:
+            job = self._jobs.get(job_id)
+            fluxo = self._importacoes.get(job_id)
+            if job is not None and fluxo is not None and not corpo.get('continua'):
+                del self._importacoes[job_id] # Outras partes depois desta são recusadas
+        if job is None:
+            return 404, {'erro': "Job não encontrado"}
+        if fluxo is None:
+            raise ValueError(job.get('erro') or f"A importação {job_id} não está recebendo linhas")
+        partes, concluida = fluxo
+        for parte in ([linhas] if linhas else []) + ([] if corpo.get('continua') else [None]):
+            while True: # Espera o motor ler as partes anteriores, a não ser que a importação tenha terminado
+                try:
+                    partes.put(parte, timeout=1.0)
+                    break
+                except queue.Full:
+                    if concluida.is_set():
+                        raise ValueError(job.get('erro') or f"A importação {job_id} já terminou")
+            if parte is not None:
+                job['linhas'] += len(parte)
+        if not corpo.get('continua') and corpo.get('aguardar'):
+            concluida.wait()
+            return 200, dict(job)
+        return 202, dict(job)
+
+    @staticmethod
+    def _linhas_recebidas(partes):
+        """As linhas das partes conforme chegam, até a última."""
+        while True:
+            try:
+                parte = partes.get(timeout=IMPORTACAO_ESPERA_S)
+            except queue.Empty:
+                raise TimeoutError("O cliente parou de enviar as linhas") from None
+            if parte is None:
+                return
+            yield from parte
+
+    def _processar_job(self, job):
+        self._nova_execucao_se_parado()
+        for url in job['urls']:
+            try:
+                adicionados = self.engine.adicionar_playlist(url, aceitar_video_unico=True, iniciar=True,
+                                                             alvos=job['alvos'])
+                job['adicionados'][url] = adicionados
+            except Exception as e:
+                job['erros'][url] = str(e)
+        job['estado'] = 'concluido'
+
+    def _processar_importacao(self, job, partes, concluida, formato_csv):
+        self._nova_execucao_se_parado()
+        try:
+            job['resumo'] = self.engine.importar(self._linhas_recebidas(partes), formato_csv,
+                                                 alvos=job['alvos'], iniciar=True)
+        except Exception as e:
+            job['erro'] = str(e)
+        with self._jobs_lock:
+            self._importacoes.pop(job['id'], None)
+        job['estado'] = 'concluido'
+        concluida.set()
+
+# --------------------------------------------------------------------------------------------------
+# 5. Cliente (GUI conectada a um serviço)
+# --------------------------------------------------------------------------------------------------
+class MetricasRemotas:
+    """Equivalente somente leitura do RegistroMetricas, lido da API do serviço."""
+
+    def __init__(self, motor):
+        self._motor = motor
+
+    def nova_execucao(self):
+        pass # O serviço começa uma nova execução sozinho, quando a fila volta a andar
+
+    def resumo(self):
+        return self._motor._requisitar('GET', '/api/metricas')['resumo'] or {}
+
+    def totais_execucao(self):
+        dados = self._motor._requisitar('GET', '/api/metricas')
+        return dados['itens'], dados['bytes']
+
+    def fechar(self):
+        pass
+
+
+class MotorRemoto:
+    """Cliente da API do serviço com a mesma interface do DownloadEngine usada pela GUI.
+
+    Os itens são espelhos locais (FilaItem) atualizados pelos eventos SSE, de modo que
+    a GUI os compare por identidade como faz com os itens do motor local; o estado do motor
+    (em processamento, pausado) também vem pelo SSE, sem requisições na thread da GUI. O formato e a
+    qualidade escolhidos na janela seguem em cada job, sem mudar o padrão dos outros
+    clientes; pasta, downloads simultâneos e limite de banda são do serviço e valem para
+    todos. Quando a conexão cai, o cliente reconecta e emite 'fila_recarregada'.
+    """
+
+    remoto = True
+
+    def __init__(self, endereco, token=None):
+        self.endereco = endereco.rstrip('/')
+        self._cabecalhos = {'Authorization': f"Bearer {token or ler_token()}"}
+        self._listeners = []
+        self._itens = {} # id -> FilaItem espelhado
+        self._itens_lock = threading.Lock()
+        self._progresso = (None, {})
+        self._encerrado = threading.Event()
+        self._estado = self._requisitar('GET', '/api/estado')
+        self.format_type = self._estado['formato_tipo']
+        self.quality = self._estado['qualidade']
+        self.metricas = MetricasRemotas(self)
+        self.journal = self.archive = self.cache = None # Os bancos de dados ficam com o serviço
+        self._conectado = threading.Event()
+        threading.Thread(target=self._ouvir_eventos, daemon=True).start()
+        self._conectado.wait(TIMEOUT_REQUISICAO_S)
+
+    @classmethod
+    def conectar(cls, host=HOST_PADRAO, porta=PORTA_PADRAO, token_path=TOKEN_FULL_PATH):
+        """Um MotorRemoto se houver um serviço respondendo em host:porta; senão, None."""
+        token = ler_token(token_path)
+        if token is None: # Sem o token da instalação, não há como usar o serviço
+            return None
+        endereco = f"http://{host}:{porta}"
+        requisicao = urllib.request.Request(endereco + '/api/estado', headers={'Authorization': f"Bearer {token}"})
+        try:
+            with urllib.request.urlopen(requisicao, timeout=TIMEOUT_CONEXAO_S) as resposta:
+                json.load(resposta)
+        except (OSError, ValueError):
+            return None
+        try:
+            return cls(endereco, token)
+        except ErroServico:
+            return None
+
+    # ---------------------------------------------------------------- HTTP
+    def _requisitar(self, metodo, caminho, corpo=None, timeout=TIMEOUT_REQUISICAO_S):
+        dados = json.dumps(corpo).encode('utf-8') if corpo is not None else None
+        requisicao = urllib.request.Request(self.endereco + caminho, data=dados, method=metodo,
+                                            headers={'Content-Type': 'application/json', **self._cabecalhos})
+        try:
+            with urllib.request.urlopen(requisicao, timeout=timeout) as resposta:
+                return json.load(resposta)
+        except urllib.error.HTTPError as e:
+            try:
+                mensagem = json.load(e).get('erro')
+            except ValueError:
+                mensagem = None
+            raise ErroServico(mensagem or f"HTTP {e.code}") from e
+        except OSError as e:
+            raise ErroServico(f"Serviço indisponível em {self.endereco}: {e}") from e
+
+    # ---------------------------------------------------------------- Eventos
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _emit(self, tipo, **dados):
+        evento = {'tipo': tipo, **dados}
+        for callback in list(self._listeners):
+            try:
+                callback(evento)
+            except Exception:
+                pass
+
+    def _espelho(self, dados):
+        """O FilaItem local de um item do serviço, criado ou atualizado a partir de `dados`."""
+        with self._itens_lock:
+            item = self._itens.get(dados['id'])
+            if item is None:
+                item = self._itens[dados['id']] = FilaItem(dados['id'], dados['title'], dados['url'])
+        for campo in ('title', 'status', 'video_id', 'prioridade', 'alvos', 'progresso', 'velocidade',
+                      'tentativas', 'bytes', 'parcial'):
+            setattr(item, campo, dados.get(campo))
+        return item
+
+    def _ouvir_eventos(self):
+        """Lê o fluxo SSE do serviço e republica os eventos com os itens espelhados."""
+        primeira = True
+        while not self._encerrado.is_set():
+            conexao = None
+            try:
+                partes = urlsplit(self.endereco)
+                conexao = http.client.HTTPConnection(partes.hostname, partes.port, timeout=KEEPALIVE_S * 2)
+                conexao.request('GET', '/api/eventos', headers={'Accept': 'text/event-stream', **self._cabecalhos})
+                resposta = conexao.getresponse()
+                if resposta.status != 200:
+                    raise ErroServico(f"HTTP {resposta.status}")
+                if not primeira:
+                    self._emit('fila_recarregada') # Eventos podem ter se perdido durante a queda
+                primeira = False
+                self._conectado.set()
+                for linha in resposta:
+                    if self._encerrado.is_set():
+                        return
+                    if linha.startswith(b'data: '):
+                        self._tratar_evento(json.loads(linha[len(b'data: '):]))
+            except (OSError, ValueError, ErroServico, http.client.HTTPException):
+                pass
+            finally:
+                if conexao is not None:
+                    conexao.close()
+            if self._encerrado.is_set():
+                return
+            self._conectado.set() # Não trava o construtor se o serviço caiu logo de cara
+            self._emit('erro', mensagem="🔌 Conexão com o serviço perdida; tentando reconectar...")
+            self._encerrado.wait(RECONECTAR_S)
+
+    def _tratar_evento(self, evento):
+        tipo = evento['tipo']
+        if tipo == 'estado':
+            del evento['tipo']
+            self._estado = evento
+            return
+        if tipo == 'progresso':
+            estados = {int(chave): estado for chave, estado in evento['estados'].items()}
+            with self._itens_lock:
+                for item_id, estado in estados.items():
+                    item = self._itens.get(item_id)
+                    if item is not None and estado.get('percent') is not None:
+                        item.progresso = estado['percent']
+            self._progresso = (evento['versao'], estados)
+            return
+        if tipo in ('itens_adicionados', 'fila_restaurada'):
+            with self._itens_lock:
+                novos = [dados for dados in evento['itens'] if dados['id'] not in self._itens]
+            evento['itens'] = [self._espelho(dados) for dados in novos] # Os já conhecidos vieram do snapshot
+            if not evento['itens']:
+                return
+        elif tipo == 'fila_limpa':
+            evento['removidos'] = [self._espelho(dados) for dados in evento['removidos']]
+            with self._itens_lock:
+                for item in evento['removidos']:
+                    self._itens.pop(item.id, None)
+        elif isinstance(evento.get('item'), dict):
+            evento['item'] = self._espelho(evento['item'])
+            if tipo == 'item_removido':
+                with self._itens_lock:
+                    self._itens.pop(evento['item'].id, None)
+        tipo = evento.pop('tipo')
+        self._emit(tipo, **evento)
+
+    # ---------------------------------------------------------------- Interface do motor
+    def _comando(self, caminho):
+        """Envia um comando da fila; a resposta traz o estado já atualizado pelo serviço."""
+        resposta = self._requisitar('POST', caminho)
+        self._estado = resposta['estado']
+        return resposta
+
+    @property
+    def em_processamento(self):
+        return self._estado['em_processamento']
+
+    @property
+    def pausado(self):
+        return self._estado['pausado']
+
+    @property
+    def download_folder(self):
+        return self._estado['pasta']
+
+    @property
+    def limite_banda_kbs(self):
+        return self._estado['limite_banda_kbs']
+
+    @property
+    def fila(self):
+        with self._itens_lock:
+            return list(self._itens.values())
+
+    def snapshot(self):
+        itens = self._requisitar('GET', '/api/fila')['itens']
+        espelhos = [self._espelho(dados) for dados in itens]
+        with self._itens_lock:
+            ids = {item.id for item in espelhos}
+            for item_id in [item_id for item_id in self._itens if item_id not in ids]:
+                del self._itens[item_id]
+        return espelhos
+
+    def itens_ativos(self):
+        with self._itens_lock:
+            return [item for item in self._itens.values() if item.status in STATUS_EM_ANDAMENTO]
+
+    def progresso_atual(self):
+        versao, estados = self._progresso
+        return versao, {chave: dict(estado) for chave, estado in estados.items()}
+
+    def configure(self, format_type=None, quality=None, download_folder=None, max_workers=None):
+        if format_type is not None:
+            self.format_type = format_type
+        if quality is not None:
+            self.quality = quality
+        mudancas = {}
+        if download_folder is not None:
+            mudancas['pasta'] = download_folder
+        if max_workers is not None:
+            mudancas['downloads_simultaneos'] = max_workers
+        if mudancas:
+            self._estado = self._requisitar('POST', '/api/config', mudancas)
+
+    def definir_limite_banda(self, kbs):
+        try:
+            kbs = max(0, int(kbs))
+        except (TypeError, ValueError):
+            kbs = 0
+        self._estado = self._requisitar('POST', '/api/config', {'limite_banda_kbs': kbs})
+
+    def config_dict(self):
+        return {
+            'pasta': self._estado['pasta'],
+            'qualidade': self.quality,
+            'formato_tipo': self.format_type,
+            'downloads_simultaneos': self._estado['downloads_simultaneos'],
+            'limite_banda_kbs': self._estado['limite_banda_kbs'],
+        }
+
+    def adicionar_playlist(self, url, aceitar_video_unico=False, iniciar=False, alvos=None):
+        """Envia a URL como um job e espera a análise. Retorna quantos itens entraram na fila."""
+        corpo = {'urls': [url], 'aguardar': True}
+        if alvos:
+            corpo['alvos'] = alvos
+        else:
+            corpo.update(formato=self.format_type, qualidade=self.quality)
+        # A análise de uma playlist grande pode levar minutos
+        job = self._requisitar('POST', '/api/jobs', corpo, timeout=None)
+        if url in job['erros']:
+            raise ErroServico(job['erros'][url])
+        return job['adicionados'].get(url, 0)
+
+    def importar(self, linhas, formato_csv=False, alvos=None, iniciar=False):
+        """Envia as linhas como uma importação em massa e espera o resumo (ver `DownloadEngine.importar`).
+
+        As linhas são lidas sob demanda e enviadas em partes de IMPORTACAO_PARTE_LINHAS.
+        """
+        corpo = {'csv': formato_csv}
+        if alvos:
+            corpo['alvos'] = alvos
+        else:
+            corpo.update(formato=self.format_type, qualidade=self.quality)
+        linhas = iter(linhas)
+        parte = list(itertools.islice(linhas, IMPORTACAO_PARTE_LINHAS))
+        caminho = '/api/importar'
+        while True:
+            proxima = list(itertools.islice(linhas, IMPORTACAO_PARTE_LINHAS))
+            corpo.update(linhas=parte, continua=bool(proxima), aguardar=not proxima)
+            job = self._requisitar('POST', caminho, corpo, timeout=None)
+            if not proxima:
+                break
+            caminho, corpo, parte = f"/api/importar/{job['id']}", {}, proxima
+        if job.get('erro'):
+            raise ErroServico(job['erro'])
+        return job['resumo']
+
+    def baixar_agora(self, url):
+        """No serviço não há download avulso: o vídeo entra na fila compartilhada."""
+        try:
+            self.adicionar_playlist(url, aceitar_video_unico=True)
+        except ErroServico as e:
+            self._emit('download_unico', status='error', erro=f"🔴 Erro no download: {e}")
+
+    def cancelar(self, item_id):
+        return self._requisitar('POST', f'/api/itens/{item_id}/cancelar')['ok']
+
+    def mover_para_topo(self, item_id):
+        return self._requisitar('POST', f'/api/itens/{item_id}/topo')['ok']
+
+    def pausar(self):
+        return self._comando('/api/pausar')['ok']
+
+    def retomar(self):
+        self._comando('/api/retomar')
+
+    def iniciar(self):
+        """Inicia os workers do serviço; uma fila pausada continua pausada para todos os clientes."""
+        self._comando('/api/iniciar')
+
+    def limpar(self):
+        return self._comando('/api/limpar')['ha_ativos']
+
+    def restaurar(self):
+        return 0 # O serviço restaura a própria fila ao iniciar
+
+    def aquecer(self):
+        pass
+
+    def aguardar(self, timeout=None):
+        return True
+
+    def encerrar(self, aguardar=True):
+        """Desconecta do serviço. Os downloads continuam nele."""
+        self._encerrado.set()
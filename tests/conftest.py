@@ -0,0 +1,5 @@
+# YouTube MP3 Downloader PRO - Configuração dos testes: os módulos ficam na raiz do projeto
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
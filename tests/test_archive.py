@@ -0,0 +1,93 @@
+# YouTube MP3 Downloader PRO - Testes do índice de downloads concluídos
+import sys
+
+import archive
+import engine
+import main
+from archive import DownloadArchive, extrair_video_id
+from engine import DownloadEngine
+
+QUALIDADES = {"MP3": ["128kbps", "192kbps", "320kbps"], "MP4": ["360p", "720p", "1080p"]}
+
+
+def _arquivo(pasta, nome, conteudo=b'audio'):
+    caminho = pasta / nome
+    caminho.write_bytes(conteudo)
+    return str(caminho)
+
+
+def test_consulta_por_video_formato_e_qualidade(tmp_path):
+    indice = DownloadArchive(str(tmp_path / 'arquivo.db'))
+    caminho = _arquivo(tmp_path, 'a.mp3')
+    indice.registrar('aaaaaaaaaaa', "MP3", "320kbps", caminho)
+    assert indice.contem('aaaaaaaaaaa', "MP3", "320kbps")
+    assert not indice.contem('aaaaaaaaaaa', "MP3", "192kbps")
+    assert not indice.contem('aaaaaaaaaaa', "MP4", "320kbps")
+    assert not indice.contem(None, "MP3", "320kbps")
+    indice.fechar()
+
+    reaberto = DownloadArchive(str(tmp_path / 'arquivo.db')) # O índice volta inteiro para a memória
+    assert reaberto.obter('aaaaaaaaaaa', "MP3", "320kbps") == (caminho, 5) and len(reaberto) == 1
+    reaberto.fechar()
+
+
+def test_id_do_video_lido_das_urls():
+    assert extrair_video_id("https://www.youtube.com/watch?feature=x&v=aaaaaaaaaaa") == 'aaaaaaaaaaa'
+    assert extrair_video_id("https://youtu.be/bbbbbbbbbbb?t=3") == 'bbbbbbbbbbb'
+    assert extrair_video_id("https://vimeo.com/1") is None and extrair_video_id(None) is None
+
+
+def _ffprobe_falso(ffprobe, caminho):
+    """Metadados como os gravados pelo FFmpegMetadata, sem rodar o ffprobe."""
+    if caminho.endswith('sem_tags.mp3'):
+        return {'format': {}}
+    if caminho.endswith('.mp4'):
+        return {'format': {'tags': {'comment': "https://www.youtube.com/watch?v=vvvvvvvvvvv"}},
+                'streams': [{'height': 1080}, {}]}
+    return {'format': {'bit_rate': '189000', 'tags': {'PURL': "https://youtu.be/mmmmmmmmmmm"}}}
+
+
+def test_reconstruir_pelo_comando(tmp_path, monkeypatch):
+    pasta = tmp_path / 'downloads'
+    (pasta / 'sub').mkdir(parents=True)
+    monkeypatch.setattr(archive, '_ffprobe', _ffprobe_falso)
+    monkeypatch.setattr(engine, 'ARCHIVE_FULL_PATH', str(tmp_path / 'arquivo.db'))
+    monkeypatch.setattr(engine, 'FFPROBE_PATH', sys.executable) # Basta existir
+    monkeypatch.setattr(engine, 'get_quality_options_for_format', QUALIDADES.get)
+
+    indice = DownloadArchive(engine.ARCHIVE_FULL_PATH)
+    mantido = _arquivo(pasta, 'mantido.mp3', b'12345678')
+    indice.registrar('kkkkkkkkkkk', "MP3", "320kbps", mantido)
+    indice.registrar('rrrrrrrrrrr', "MP3", "320kbps", str(pasta / 'apagado.mp3'))
+    indice.fechar()
+    _arquivo(pasta, 'musica.mp3')
+    _arquivo(pasta / 'sub', 'video.mp4')
+    _arquivo(pasta, 'sem_tags.mp3')
+    _arquivo(pasta, 'capa.jpg')
+
+    assert main.main_reconstruir_arquivo(main.parse_args(['--reconstruir-arquivo', '--pasta', str(pasta)])) == 0
+    indice = DownloadArchive(engine.ARCHIVE_FULL_PATH)
+    assert len(indice) == 3
+    assert indice.obter('kkkkkkkkkkk', "MP3", "320kbps") == (mantido, 8)
+    assert indice.contem('mmmmmmmmmmm', "MP3", "192kbps") # A taxa mais próxima de 189 kbps
+    assert indice.contem('vvvvvvvvvvv', "MP4", "1080p")
+    assert not indice.contem('rrrrrrrrrrr', "MP3", "320kbps")
+    indice.fechar()
+
+
+def test_adicionar_lote_pula_o_que_ja_foi_baixado(tmp_path):
+    indice = DownloadArchive(str(tmp_path / 'arquivo.db'))
+    motor = DownloadEngine(download_folder=str(tmp_path / 'downloads'), format_type="MP3", quality="320kbps",
+                           archive=indice)
+    indice.registrar('aaaaaaaaaaa', "MP3", "320kbps", _arquivo(tmp_path, 'a.mp3'))
+    indice.registrar('bbbbbbbbbbb', "MP3", "128kbps", _arquivo(tmp_path, 'b.mp3')) # Outra qualidade
+    indice.registrar('id-informado', "MP3", "320kbps", _arquivo(tmp_path, 'c.mp3'))
+    adicionados = motor.adicionar_lote([
+        ("A", "https://youtu.be/aaaaaaaaaaa"),
+        ("B", "https://www.youtube.com/watch?v=bbbbbbbbbbb"),
+        ("C", "https://vimeo.com/1", 'id-informado'),
+        ("D", "https://vimeo.com/2"),
+    ])
+    assert len(adicionados) == 2 and len(motor.fila) == 2
+    assert motor.ja_baixado('aaaaaaaaaaa') and not motor.ja_baixado('bbbbbbbbbbb')
+    indice.fechar()
@@ -0,0 +1,113 @@
+# YouTube MP3 Downloader PRO - Testes da mudança atômica para o destino e da reserva de espaço livre
+import errno
+import os
+from collections import namedtuple
+
+import pytest
+
+import armazenamento
+from armazenamento import (SUFIXO_MOVENDO, EspacoInsuficiente, ReservaEspaco, VerificadorEspaco, estimar_bytes,
+                           limpar_movendo, mover_atomico)
+
+MB = 1024 * 1024
+Uso = namedtuple('Uso', 'total used free')
+
+
+def _outro_disco(monkeypatch, origem):
+    """Faz o rename direto a partir de `origem` falhar como entre dois discos (EXDEV)."""
+    replace = os.replace
+
+    def replace_entre_discos(de, para):
+        if de == origem:
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        replace(de, para)
+
+    monkeypatch.setattr(armazenamento.os, 'replace', replace_entre_discos)
+
+
+def test_mesmo_disco_e_um_rename(tmp_path):
+    origem = tmp_path / 'trabalho' / 'musica.mp3'
+    origem.parent.mkdir()
+    origem.write_bytes(b'abc')
+    destino = mover_atomico(str(origem), str(tmp_path / 'destino'))
+    assert destino == str(tmp_path / 'destino' / 'musica.mp3')
+    assert not origem.exists() and open(destino, 'rb').read() == b'abc'
+
+
+def test_entre_discos_copia_para_temporario_e_renomeia(tmp_path, monkeypatch):
+    origem = tmp_path / 'musica.mp3'
+    origem.write_bytes(os.urandom(3 * MB + 7))
+    conteudo = origem.read_bytes()
+    os.utime(origem, (1_000_000, 1_000_000))
+    _outro_disco(monkeypatch, str(origem))
+    pasta = tmp_path / 'rede'
+    destino = mover_atomico(str(origem), str(pasta))
+    assert open(destino, 'rb').read() == conteudo and os.path.getmtime(destino) == 1_000_000
+    assert not origem.exists()
+    assert os.listdir(pasta) == ['musica.mp3'] # Nenhum temporário .movendo sobrou
+
+
+def test_copia_interrompida_nao_deixa_arquivo_pela_metade(tmp_path, monkeypatch):
+    origem = tmp_path / 'musica.mp3'
+    origem.write_bytes(b'x' * MB)
+    _outro_disco(monkeypatch, str(origem))
+
+    def copia_falha(entrada, saida, tamanho):
+        saida.write(entrada.read(1000))
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    monkeypatch.setattr(armazenamento.shutil, 'copyfileobj', copia_falha)
+    pasta = tmp_path / 'rede'
+    with pytest.raises(OSError):
+        mover_atomico(str(origem), str(pasta))
+    assert origem.exists() and os.listdir(pasta) == []
+
+
+def test_limpar_movendo_apaga_so_as_copias_incompletas(tmp_path):
+    (tmp_path / f".musica.mp3.1a2b3c4d{SUFIXO_MOVENDO}").write_bytes(b'x')
+    (tmp_path / 'musica.mp3').write_bytes(b'x')
+    limpar_movendo(str(tmp_path))
+    limpar_movendo(str(tmp_path / 'nao_existe'))
+    assert os.listdir(tmp_path) == ['musica.mp3']
+
+
+@pytest.fixture
+def disco(monkeypatch):
+    """Um disco falso de 1000 MB livres, compartilhado por todas as pastas."""
+    livre = {'bytes': 1000 * MB}
+    monkeypatch.setattr(armazenamento.shutil, 'disk_usage', lambda pasta: Uso(0, 0, livre['bytes']))
+    return livre
+
+
+def test_reservas_descontam_o_espaco_dos_outros_downloads(tmp_path, disco):
+    reserva = ReservaEspaco(margem_bytes=100 * MB)
+    trabalho, destino = str(tmp_path / 'trabalho'), str(tmp_path / 'destino')
+    reserva.reservar('a', {trabalho: 300 * MB, destino: 200 * MB}) # Mesmo disco: 500 MB do saldo
+    reserva.reservar('b', {trabalho: 300 * MB})
+    with pytest.raises(EspacoInsuficiente, match="200 MB livres, 250 MB necessários"):
+        reserva.reservar('c', {destino: 150 * MB}) # 1000 - 800 reservados - 150 < 100 de margem
+    reserva.liberar('a')
+    reserva.reservar('c', {destino: 150 * MB})
+    reserva.liberar('nao_existe')
+    assert os.path.isdir(trabalho) and os.path.isdir(destino)
+
+
+def test_recusa_nao_reserva_nada(tmp_path, disco):
+    reserva = ReservaEspaco()
+    pasta = str(tmp_path)
+    with pytest.raises(EspacoInsuficiente):
+        reserva.reservar('grande', {pasta: 1001 * MB})
+    reserva.reservar('cabe', {pasta: 1000 * MB}) # O pedido recusado não ficou reservado
+    disco['bytes'] = 10 * MB # O disco encheu por fora do aplicativo
+    with pytest.raises(EspacoInsuficiente):
+        reserva.reservar('outro', {pasta: 1})
+
+
+def test_verificador_usa_filesize_ou_a_estimativa():
+    info = {'requested_formats': [{'filesize': 10 * MB}, {'filesize_approx': 2 * MB}, {}]}
+    assert estimar_bytes(info) == 12 * MB and estimar_bytes({'filesize': 5}) == 5
+    pedidos = []
+    verificador = VerificadorEspaco()
+    verificador.set_downloader(type('Ydl', (), {'params': {armazenamento.PARAM_ESPACO: pedidos.append}})())
+    assert verificador.run(info) == ([], info)
+    assert pedidos == [12 * MB]
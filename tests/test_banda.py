@@ -0,0 +1,83 @@
+# YouTube MP3 Downloader PRO - Testes do limite global de banda e da divisão justa
+import threading
+import time
+
+from banda import LimitadorBanda, RAJADA_MIN_BYTES
+
+TAXA = 512 * 1024
+DURACAO_S = 1.0
+
+
+def _competir(limitador, downloads, duracao=DURACAO_S):
+    """Roda um download por thread até o prazo; retorna os bytes liberados a cada um.
+
+    `downloads` é uma lista de (chave, tamanho do bloco, peso).
+    """
+    recebidos = {chave: 0 for chave, _, _ in downloads}
+    prazo = time.monotonic() + duracao
+    fim = lambda: time.monotonic() > prazo
+
+    def baixar(chave, bloco, peso):
+        while not fim():
+            if limitador.consumir(chave, bloco, peso, interromper=fim):
+                recebidos[chave] += bloco
+
+    threads = [threading.Thread(target=baixar, args=download) for download in downloads]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recebidos
+
+
+def test_sem_limite_nao_espera():
+    limitador = LimitadorBanda()
+    inicio = time.monotonic()
+    assert all(limitador.consumir('a', 1024 * 1024) for _ in range(100))
+    assert time.monotonic() - inicio < 0.5
+
+
+def test_taxa_media_respeitada():
+    limitador = LimitadorBanda(TAXA)
+    recebidos = _competir(limitador, [('a', 16 * 1024, 1), ('b', 16 * 1024, 1)])
+    total = sum(recebidos.values())
+    rajada = max(TAXA * 0.25, RAJADA_MIN_BYTES)
+    assert TAXA * DURACAO_S * 0.7 < total <= TAXA * DURACAO_S + rajada + 2 * 16 * 1024
+
+
+def test_divisao_proporcional_aos_pesos():
+    recebidos = _competir(LimitadorBanda(TAXA), [('leve', 8 * 1024, 1), ('prioritario', 8 * 1024, 3)])
+    assert 2.0 < recebidos['prioritario'] / recebidos['leve'] < 4.5
+
+
+def test_blocos_grandes_nao_tomam_a_vez_dos_pequenos():
+    recebidos = _competir(LimitadorBanda(TAXA), [('grande', 64 * 1024, 1), ('pequeno', 4 * 1024, 1)])
+    assert 0.5 < recebidos['grande'] / recebidos['pequeno'] < 2.0
+
+
+def test_interromper_e_desligar_o_limite_liberam_quem_espera():
+    limitador = LimitadorBanda(64 * 1024)
+    limitador.consumir('a', 10 * 1024 * 1024) # Passa com o balde cheio e deixa uma dívida enorme
+    inicio = time.monotonic()
+    assert limitador.consumir('a', 1024, interromper=lambda: time.monotonic() - inicio > 0.2) is False
+    resultado = []
+    espera = threading.Thread(target=lambda: resultado.append(limitador.consumir('b', 1024)))
+    espera.start()
+    time.sleep(0.1)
+    limitador.definir_taxa(None)
+    espera.join(timeout=2)
+    assert resultado == [True]
+
+
+def test_progresso_retomado_nao_e_cobrado_de_novo():
+    limitador = LimitadorBanda(64 * 1024)
+    inicio = time.monotonic()
+    prazo = lambda: time.monotonic() - inicio > 5
+    # Um .part de 10 MB retomado: a primeira leitura só marca a referência
+    assert limitador.consumir_progresso('a', 'video.part', 10 * 1024 * 1024, interromper=prazo)
+    for baixados in (32, 64, 96):
+        assert limitador.consumir_progresso('a', 'video.part', 10 * 1024 * 1024 + baixados * 1024,
+                                            interromper=prazo)
+    assert time.monotonic() - inicio < 2 # Cobrar os 10 MB levaria minutos
+    limitador.esquecer('a')
+    assert limitador.consumir_progresso('a', 'video.part', 20 * 1024 * 1024, interromper=prazo)
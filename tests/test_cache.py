@@ -0,0 +1,90 @@
+# YouTube MP3 Downloader PRO - Testes do cache de metadados (TTL, LRU, contadores)
+import json
+import time
+from cache import MetadataCache
+from engine import DownloadEngine
+
+DADOS = {'id': 'x', 'title': "Um título razoavelmente longo", 'formats': [{'url': 'https://cdn/x' * 4}]}
+
+
+def _cache(tmp_path, **kwargs):
+    return MetadataCache(str(tmp_path / 'cache.db'), **kwargs)
+
+
+def test_entradas_expiram_pelo_ttl(tmp_path):
+    cache = _cache(tmp_path, ttl=3600)
+    cache.guardar('valida', DADOS)
+    cache.guardar('vencida', DADOS, ttl=0)
+    cache.guardar('curta', DADOS, ttl=0.05)
+    assert cache.obter('valida') == DADOS
+    assert cache.obter('vencida') is None
+    time.sleep(0.1)
+    assert cache.obter('curta') is None
+    assert cache.estatisticas()['entradas'] == 1 # As vencidas lidas foram apagadas
+    cache.fechar()
+
+
+def test_descarta_as_menos_usadas_ao_passar_do_limite(tmp_path):
+    tamanho = len(json.dumps(DADOS, ensure_ascii=False).encode('utf-8'))
+    cache = _cache(tmp_path, max_bytes=int(tamanho * 3.5))
+    for chave in ('a', 'b', 'c'):
+        cache.guardar(chave, DADOS)
+        time.sleep(0.01)
+    cache.obter('a') # 'b' passa a ser a menos usada
+    time.sleep(0.01)
+    cache.guardar('d', DADOS)
+    assert [chave for chave in 'abcd' if cache.obter(chave) is not None] == ['a', 'c', 'd']
+    assert cache.estatisticas()['bytes'] == 3 * tamanho <= cache.max_bytes
+    cache.fechar()
+
+
+def test_contadores_e_chaves_descartadas(tmp_path):
+    cache = _cache(tmp_path)
+    cache.guardar('x', {**DADOS, 'thumbnails': [{'url': 'grande'}] * 100})
+    assert 'thumbnails' not in cache.obter('x')
+    assert cache.obter('y') is None
+    cache.obter('x')
+    assert cache.guardar('z', {'nao_serializavel': object()}) is False
+    estatisticas = cache.estatisticas()
+    assert (estatisticas['hits'], estatisticas['misses'], estatisticas['entradas']) == (2, 1, 1)
+    cache.fechar()
+
+    reaberto = _cache(tmp_path) # O conteúdo sobrevive ao fechamento; os contadores são da sessão
+    assert reaberto.obter('x') is not None and reaberto.hits == 1
+    reaberto.fechar()
+
+
+class YdlFalso:
+    """Imita o YoutubeDL: os metadados guardados não produzem arquivo; os extraídos de novo, sim."""
+
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self.extracoes = 0
+
+    def extract_info(self, url, download=False, process=False):
+        self.extracoes += 1
+        return {'id': 'abc', 'title': "Novo", 'url': 'https://cdn/nova'}
+
+    def sanitize_info(self, info):
+        return dict(info)
+
+    def process_ie_result(self, info, download=True):
+        if info['url'] == 'https://cdn/nova':
+            self.arquivo.write_bytes(b'audio')
+        return {**info, 'filepath': str(self.arquivo)} # URL de mídia expirada: nenhum arquivo
+
+
+def test_metadados_vencidos_sao_invalidados_e_extraidos_de_novo(tmp_path):
+    cache = _cache(tmp_path)
+    cache.guardar('video:abc', {'id': 'abc', 'title': "Antigo", 'url': 'https://cdn/expirada'})
+    motor = DownloadEngine(download_folder=str(tmp_path / 'downloads'), cache=cache)
+    ydl = YdlFalso(tmp_path / 'abc.mp3')
+
+    info = motor._extrair_e_baixar(ydl, 'https://youtu.be/abc', 'abc')
+    assert info['filepath'] == str(tmp_path / 'abc.mp3') and ydl.extracoes == 1
+    assert cache.obter('video:abc')['url'] == 'https://cdn/nova' # A entrada vencida foi trocada
+
+    ydl.arquivo.unlink()
+    motor._extrair_e_baixar(ydl, 'https://youtu.be/abc', 'abc')
+    assert ydl.extracoes == 1 # A segunda vez vem do cache, sem extração
+    cache.fechar()
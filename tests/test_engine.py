@@ -0,0 +1,122 @@
+# YouTube MP3 Downloader PRO - Testes do motor com o extrator falso e o servidor de mídia local
+import threading
+import time
+
+import pytest
+
+from archive import DownloadArchive
+from engine import DownloadEngine
+from fila import STATUS_BAIXANDO, STATUS_CONCLUIDO, STATUS_PAUSADO, STATUS_PENDENTE
+
+pytest.importorskip('yt_dlp')
+from benchmarks import extrator_falso # noqa: E402 (importa o yt-dlp)
+from benchmarks.servidor_midia import ServidorMidia # noqa: E402
+
+KB = 1024
+ALVOS = [("MP3", "320kbps"), ("MP3", "128kbps"), ("MP4", "720p")]
+
+
+@pytest.fixture
+def servidor():
+    with ServidorMidia(tamanho=512 * KB) as servidor, extrator_falso.instalar():
+        yield servidor
+
+
+def _motor(tmp_path, **kwargs):
+    return DownloadEngine(download_folder=str(tmp_path / 'downloads'), pipeline_conversao=False, **kwargs)
+
+
+def _ouvir(motor):
+    eventos = []
+    motor.subscribe(lambda evento: eventos.append((evento['tipo'], getattr(evento.get('item'), 'id', None),
+                                                   getattr(evento.get('item'), 'status', None))))
+    return eventos
+
+
+def test_pausa_nao_pega_itens_novos_e_retomada_continua_do_part(tmp_path, servidor):
+    motor = _motor(tmp_path, max_workers=1)
+    primeiro, segundo = motor.adicionar_lote([("A", servidor.url_video('a')), ("B", servidor.url_video('b'))])
+    eventos = _ouvir(motor)
+    servidor.taxa = 128 * KB # Uns 4 s por arquivo: dá tempo de pausar no meio
+    motor.iniciar()
+    prazo = time.monotonic() + 10
+    while (motor.progresso_atual()[1].get(primeiro.id, {}).get('percent') or 0) < 10:
+        assert time.monotonic() < prazo
+        time.sleep(0.02)
+    assert motor.pausar()
+    assert motor.aguardar(timeout=10)
+    assert (primeiro.status, primeiro.parcial > 0) == (STATUS_PAUSADO, True) # O .part ficou em disco
+    assert segundo.status == STATUS_PENDENTE
+    assert ('item_status', segundo.id, STATUS_BAIXANDO) not in eventos # Nada foi pego durante a pausa
+    assert ('fila_concluida', None, None) in eventos
+
+    motor.iniciar() # Sem retomar, a fila continua pausada
+    assert not motor.em_processamento
+    servidor.taxa = 0
+    servidor.zerar_contadores()
+    motor.retomar()
+    assert motor.aguardar(timeout=30)
+    assert len(motor.fila) == 0
+    assert [arquivo.stat().st_size for arquivo in sorted((tmp_path / 'downloads').glob('*.wav'))] == [512 * KB] * 2
+    assert servidor.bytes_enviados < 2 * 512 * KB # O primeiro recomeçou de onde parou
+    assert sum(1 for tipo, _, status in eventos if (tipo, status) == ('item_status', STATUS_CONCLUIDO)) == 2
+    motor.encerrar()
+
+
+def test_downloads_em_andamento_terminam_se_so_a_fila_pendente_e_limpa(tmp_path, servidor):
+    motor = _motor(tmp_path, max_workers=1)
+    motor.adicionar_lote([(str(i), servidor.url_video(f"v{i}")) for i in range(3)])
+    servidor.taxa = 512 * KB
+    motor.iniciar()
+    prazo = time.monotonic() + 10
+    while not motor.itens_ativos():
+        assert time.monotonic() < prazo
+        time.sleep(0.02)
+    assert motor.limpar() # Ainda há um download em andamento
+    assert motor.aguardar(timeout=30)
+    assert len(list((tmp_path / 'downloads').glob('*.wav'))) == 1
+    motor.encerrar()
+
+
+def test_iniciar_durante_a_pausa_nao_desfaz_a_pausa(tmp_path, servidor):
+    motor = _motor(tmp_path)
+    motor.adicionar_lote([("A", servidor.url_video('a'))])
+    motor.pausado = True
+    ocioso = threading.Event()
+    motor.subscribe(lambda evento: evento['tipo'] == 'fila_concluida' and ocioso.set())
+    motor.iniciar()
+    assert motor.workers_ativos == 0 and not ocioso.wait(0.2)
+    motor.encerrar()
+
+
+def test_job_com_varios_alvos_baixa_a_fonte_uma_vez(tmp_path, servidor):
+    indice = DownloadArchive(str(tmp_path / 'arquivo.db'))
+    motor = _motor(tmp_path, archive=indice)
+    motor.adicionar_lote([("Job", servidor.url_video('j'), 'j')], ALVOS)
+    motor.iniciar()
+    assert motor.aguardar(timeout=30)
+    motor.encerrar()
+    assert servidor.requisicoes_midia == 1
+    saidas = sorted(arquivo.name for arquivo in (tmp_path / 'downloads').iterdir())
+    assert saidas == sorted(f"Video j [{formato} {qualidade}].wav" for formato, qualidade in ALVOS) # Sem a fonte
+    assert all(indice.obter('j', formato, qualidade)[0] ==
+               str(tmp_path / 'downloads' / f"Video j [{formato} {qualidade}].wav") for formato, qualidade in ALVOS)
+    indice.fechar()
+
+
+def test_alvo_ja_baixado_e_o_unico_pulado(tmp_path, servidor):
+    indice = DownloadArchive(str(tmp_path / 'arquivo.db'))
+    existente = tmp_path / 'antigo.mp3'
+    existente.write_bytes(b'audio')
+    indice.registrar('k', "MP3", "320kbps", str(existente))
+    motor = _motor(tmp_path, archive=indice)
+    item, = motor.adicionar_lote([("Job", servidor.url_video('k'), 'k')], ALVOS)
+    motor.iniciar()
+    assert motor.aguardar(timeout=30)
+    motor.encerrar()
+    assert item.alvos == ALVOS[1:] and servidor.requisicoes_midia == 1
+    assert sorted(arquivo.name for arquivo in (tmp_path / 'downloads').iterdir()) == [
+        "Video k [MP3 128kbps].wav", "Video k [MP4 720p].wav"]
+    assert indice.obter('k', "MP3", "320kbps") == (str(existente), 5) # O registro antigo continua valendo
+    assert motor.adicionar_lote([("De novo", servidor.url_video('k'), 'k')], ALVOS) == [] # Todos já baixados
+    indice.fechar()
@@ -0,0 +1,91 @@
+# YouTube MP3 Downloader PRO - Testes da divisão em faixas de bytes e do limite de conexões
+import pytest
+
+import faixas
+from faixas import (FAIXA_MAX_BYTES, FAIXA_MIN_BYTES, FAIXAS_POR_ARQUIVO, PROTOCOLO_FAIXAS, LimiteConexoes,
+                    divisivel, dividir_em_faixas, tamanho_faixa)
+
+MB = 1024 * 1024
+
+
+@pytest.mark.parametrize('tamanho, esperado', [
+    (1, FAIXA_MIN_BYTES),
+    (10 * MB, FAIXA_MIN_BYTES), # 32 faixas dariam menos que o mínimo
+    (FAIXAS_POR_ARQUIVO * 3 * MB, 3 * MB),
+    (FAIXAS_POR_ARQUIVO * 3 * MB + 1, 3 * MB + 1), # Arredonda para cima: nunca 33 faixas
+    (10 * 1024 * MB, FAIXA_MAX_BYTES),
+])
+def test_tamanho_faixa(tamanho, esperado):
+    assert tamanho_faixa(tamanho) == esperado
+
+
+def _formato(tamanho, **extras):
+    return {'url': 'https://cdn/audio', 'protocol': 'https', 'filesize': tamanho,
+            'downloader_options': {'http_chunk_size': MB}, **extras}
+
+
+def test_faixas_cobrem_o_arquivo_e_a_ultima_leva_o_resto():
+    formato = dividir_em_faixas(_formato(5 * MB + 123))
+    faixas_ = [(f['byte_range']['start'], f['byte_range']['end']) for f in formato['fragments']]
+    assert faixas_ == [(i * MB, (i + 1) * MB) for i in range(5)] + [(5 * MB, 5 * MB + 123)]
+    assert formato['protocol'] == PROTOCOLO_FAIXAS and 'downloader_options' not in formato
+
+
+def test_arquivo_menor_que_uma_faixa():
+    formato = dividir_em_faixas(_formato(1000))
+    assert [f['byte_range'] for f in formato['fragments']] == [{'start': 0, 'end': 1000}]
+    assert not divisivel(_formato(1000)) # Na prática, nem chega a ser dividido
+
+
+def test_so_arquivos_http_inteiros_e_grandes_sao_divisiveis():
+    assert divisivel(_formato(2 * FAIXA_MIN_BYTES))
+    assert not divisivel(_formato(2 * FAIXA_MIN_BYTES - 1))
+    assert not divisivel(_formato(None))
+    assert not divisivel(_formato(10 * MB, protocol='m3u8_native'))
+    assert not divisivel(_formato(10 * MB, fragments=[{'url': 'x'}]))
+    assert not divisivel(_formato(10 * MB, is_live=True))
+
+
+def test_limite_de_conexoes_reparte_o_total():
+    limite = LimiteConexoes(por_item=4, total=6)
+    assert [limite.reservar() for _ in range(3)] == [4, 2, 1] # Sempre ao menos uma
+    assert limite.em_uso == 7
+    limite.liberar(4)
+    assert limite.reservar() == 3 # Só as livres: 6 - 3
+    limite.liberar(100)
+    assert limite.em_uso == 0
+    assert LimiteConexoes(0, 0).reservar() == 1
+
+
+def test_download_em_faixas_igual_ao_original(tmp_path, monkeypatch):
+    pytest.importorskip('yt_dlp')
+    from benchmarks import extrator_falso
+    from benchmarks.servidor_midia import ServidorMidia, cabecalho_wav
+    from engine import DownloadEngine
+
+    divisoes = []
+    dividir = faixas.dividir_em_faixas
+
+    def espiar(formato):
+        divisoes.append(dividir(formato))
+        return divisoes[-1]
+
+    monkeypatch.setattr(faixas, 'dividir_em_faixas', espiar)
+    tamanho = 5 * MB + 321
+    original = cabecalho_wav(tamanho) + bytes(tamanho - 44)
+    with ServidorMidia(tamanho=tamanho) as servidor, extrator_falso.instalar():
+        baixados = {}
+        for conexoes in (4, 1):
+            pasta = tmp_path / f"conexoes_{conexoes}"
+            motor = DownloadEngine(download_folder=str(pasta), conexoes_por_item=conexoes, conexoes_max=conexoes,
+                                   pipeline_conversao=False)
+            servidor.zerar_contadores()
+            motor.adicionar_lote([("Faixas", servidor.url_video(f"v{conexoes}"))])
+            motor.iniciar()
+            assert motor.aguardar(timeout=60)
+            motor.encerrar()
+            arquivo, = pasta.glob('*.wav')
+            baixados[conexoes] = (arquivo.read_bytes(), servidor.requisicoes_midia)
+    assert len(divisoes) == 1 and len(divisoes[0]['fragments']) == 6
+    assert baixados[4][0] == original and baixados[4][1] >= 6 # Uma requisição por faixa
+    assert baixados[1][0] == original and baixados[1][1] == 1
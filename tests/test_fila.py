@@ -0,0 +1,84 @@
+# YouTube MP3 Downloader PRO - Testes da fila indexada com prioridade
+from fila import (FilaIndexada, FilaItem, STATUS_BAIXANDO, STATUS_PAUSADO, STATUS_PENDENTE,
+                  STATUS_RETENTATIVA)
+
+
+def _fila(n, **kwargs):
+    fila = FilaIndexada()
+    for i in range(n):
+        fila.adicionar(FilaItem(i, f"Vídeo {i}", f"https://youtu.be/{i}", video_id=f"v{i}"), **kwargs)
+    return fila
+
+def _retirar_todos(fila):
+    ids = []
+    while (item := fila.retirar_proximo(STATUS_BAIXANDO)) is not None:
+        ids.append(item.id)
+    return ids
+
+
+def test_retira_por_prioridade_e_ordem_de_chegada():
+    fila = _fila(3)
+    fila.adicionar(FilaItem(10, "Urgente", "u"), prioridade=-1)
+    fila.adicionar(FilaItem(11, "Depois", "d"), prioridade=5)
+    assert _retirar_todos(fila) == [10, 0, 1, 2, 11]
+    assert fila.pendentes == 0
+    assert len(fila) == 5 # Retirados continuam na fila, em andamento
+
+
+def test_recusa_id_ou_video_repetido():
+    fila = _fila(2)
+    assert not fila.adicionar(FilaItem(0, "Outro", "x"))
+    assert not fila.adicionar(FilaItem(5, "Mesmo vídeo", "x", video_id="v1"))
+    assert fila.contem_video("v1") and not fila.contem_video(None)
+    fila.remover(1)
+    assert fila.adicionar(FilaItem(5, "Mesmo vídeo", "x", video_id="v1"))
+
+
+def test_mover_para_topo_e_entradas_obsoletas():
+    fila = _fila(5)
+    fila.mover_para_topo(3)
+    fila.mover_para_topo(4) # O último movido fica à frente
+    fila.definir_prioridade(0, 10)
+    fila.remover(1)
+    assert fila.pendentes == 4
+    assert [item.id for item in fila.itens_ordenados()] == [4, 3, 2, 0]
+    assert _retirar_todos(fila) == [4, 3, 2, 0]
+
+
+def test_so_pendentes_mudam_de_prioridade():
+    fila = _fila(2)
+    item = fila.retirar_proximo(STATUS_BAIXANDO)
+    assert fila.definir_prioridade(item.id, -5) is None
+    assert fila.mover_para_topo(item.id) is None
+    assert fila.itens_ordenados()[0] is item # Em andamento aparece primeiro
+
+
+def test_devolver_volta_para_a_mesma_posicao():
+    fila = _fila(3)
+    primeiro = fila.retirar_proximo(STATUS_BAIXANDO)
+    segundo = fila.retirar_proximo(STATUS_BAIXANDO)
+    segundo.status = STATUS_RETENTATIVA
+    assert fila.devolver(primeiro.id) is primeiro and primeiro.status == STATUS_PAUSADO
+    assert fila.devolver(segundo.id, STATUS_PENDENTE) is segundo
+    assert fila.devolver(2) is None # Ainda pendente: não estava em andamento
+    assert fila.pendentes == 3
+    assert _retirar_todos(fila) == [0, 1, 2]
+
+
+def test_remover_pendentes_mantem_os_em_andamento():
+    fila = _fila(4)
+    ativo = fila.retirar_proximo(STATUS_BAIXANDO)
+    removidos = fila.remover_pendentes()
+    assert sorted(item.id for item in removidos) == [1, 2, 3]
+    assert list(fila) == [ativo]
+    assert fila.pendentes == 0 and fila.retirar_proximo(STATUS_BAIXANDO) is None
+
+
+def test_compactacao_preserva_a_ordem():
+    fila = _fila(50)
+    for rodada in range(20): # Muitas mudanças de prioridade deixam entradas obsoletas no heap
+        for i in range(50):
+            fila.definir_prioridade(i, (i * 7 + rodada) % 50)
+    assert len(fila._heap) <= 2 * fila.pendentes + 64
+    esperado = sorted(range(50), key=lambda i: (fila.obter(i).prioridade, fila.obter(i).seq))
+    assert _retirar_todos(fila) == esperado
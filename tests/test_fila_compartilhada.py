@@ -0,0 +1,177 @@
+# YouTube MP3 Downloader PRO - Testes da fila compartilhada (leases entre workers)
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from fila import STATUS_CONCLUIDO, STATUS_ERRO, STATUS_IGNORADO
+from fila_compartilhada import (FilaCompartilhada, PASTA_CONCLUIDOS, RECUPERACOES_MAX,
+                                TrabalhadorDistribuido)
+from importacao import ENTRADA_PLAYLIST, ENTRADA_VIDEO, URL_PLAYLIST, URL_VIDEO
+
+TTL = 0.5
+PROCESSOS = 4
+
+
+def _enfileirar(pasta, n, ttl=TTL):
+    fila = FilaCompartilhada(pasta, ttl=ttl)
+    fila.enfileirar([(None, (ENTRADA_VIDEO, f"v{i:010d}", URL_VIDEO.format(f"v{i:010d}"))) for i in range(n)])
+    return fila
+
+def _esperar(instante):
+    """Alinha o início dos processos, para que disputem os mesmos itens."""
+    while time.time() < instante:
+        time.sleep(0.001)
+
+def _resultados(pasta):
+    pasta = os.path.join(pasta, PASTA_CONCLUIDOS)
+    resultados = {}
+    for nome in os.listdir(pasta):
+        if nome.endswith('.json') and not nome.startswith('.'):
+            with open(os.path.join(pasta, nome), encoding='utf-8') as f:
+                resultados[nome[:-5]] = json.load(f)
+    return resultados
+
+# Executados em outros processos (funções de módulo, para funcionar também com "spawn")
+def _trabalhar(pasta, inicio):
+    """Pega e conclui itens até a fila esvaziar. Retorna (dono, ids pegos)."""
+    fila = FilaCompartilhada(pasta, ttl=TTL)
+    _esperar(inicio)
+    pegos = []
+    while True:
+        itens = fila.reivindicar(5)
+        if not itens:
+            if fila.vazia():
+                return fila.dono, pegos
+            time.sleep(0.01) # Itens ainda com leases de outros processos
+            continue
+        for item in itens:
+            pegos.append(item['id'])
+            fila.concluir(item['id'], STATUS_CONCLUIDO)
+
+def _abandonar(pasta, n):
+    """Pega itens e termina sem concluí-los nem devolvê-los, como um worker que morreu."""
+    return [item['id'] for item in FilaCompartilhada(pasta, ttl=TTL).reivindicar(n)]
+
+def _recuperar(pasta, inicio):
+    fila = FilaCompartilhada(pasta, ttl=TTL)
+    _esperar(inicio)
+    itens = fila.reivindicar(100)
+    for item in itens:
+        fila.concluir(item['id'], STATUS_CONCLUIDO)
+    return fila.dono, [(item['id'], item['recuperacoes']) for item in itens]
+
+
+def test_cada_item_e_pego_por_um_unico_processo(tmp_path):
+    pasta = str(tmp_path)
+    _enfileirar(pasta, 200)
+    inicio = time.time() + 0.5
+    with ProcessPoolExecutor(PROCESSOS) as executor:
+        saidas = list(executor.map(_trabalhar, [pasta] * PROCESSOS, [inicio] * PROCESSOS))
+    pegos = [item_id for _, ids in saidas for item_id in ids]
+    assert len(pegos) == len(set(pegos)) == 200
+    resultados = _resultados(pasta)
+    assert set(resultados) == set(pegos)
+    for dono, ids in saidas:
+        assert all(resultados[item_id]['dono'] == dono for item_id in ids)
+    assert FilaCompartilhada(pasta).resumo() == {'pendentes': 0, 'em_andamento': 0, STATUS_CONCLUIDO: 200}
+
+
+def test_lease_vencido_e_recuperado_por_um_so_processo(tmp_path):
+    pasta = str(tmp_path)
+    _enfileirar(pasta, 10)
+    with ProcessPoolExecutor(PROCESSOS) as executor:
+        abandonados = executor.submit(_abandonar, pasta, 4).result()
+        assert len(abandonados) == 4
+        # Enquanto o lease vale, ninguém pega os itens do worker morto
+        livres = executor.submit(_abandonar, pasta, 100).result()
+        assert len(livres) == 6 and not set(livres) & set(abandonados)
+        time.sleep(TTL * 1.5)
+        inicio = time.time() + 0.3
+        saidas = list(executor.map(_recuperar, [pasta] * PROCESSOS, [inicio] * PROCESSOS))
+    recuperados = [item for _, itens in saidas for item in itens]
+    assert sorted(item_id for item_id, _ in recuperados) == sorted(abandonados + livres)
+    assert all(recuperacoes == 1 for _, recuperacoes in recuperados)
+    resultados = _resultados(pasta)
+    assert len(resultados) == 10 and all(r['recuperacoes'] == 1 for r in resultados.values())
+
+
+def test_batimento_mantem_o_lease_e_detecta_a_perda(tmp_path):
+    pasta = str(tmp_path)
+    dono = _enfileirar(pasta, 1)
+    outro = FilaCompartilhada(pasta, ttl=TTL)
+    [item] = dono.reivindicar(1)
+    for _ in range(6): # Três TTLs com batimentos
+        time.sleep(TTL / 2)
+        assert dono.renovar([item['id']]) == []
+        assert outro.reivindicar(1) == []
+    time.sleep(TTL * 1.5) # Sem batimento: o lease vence
+    assert [recuperado['id'] for recuperado in outro.reivindicar(1)] == [item['id']]
+    assert dono.renovar([item['id']]) == [item['id']]
+    dono.liberar(item['id']) # Não apaga o lease que agora é do outro
+    assert outro.renovar([item['id']]) == []
+
+
+def test_item_abandonado_demais_vira_erro(tmp_path):
+    pasta = str(tmp_path)
+    _enfileirar(pasta, 1, ttl=0.1)
+    for tentativa in range(RECUPERACOES_MAX + 1):
+        assert len(FilaCompartilhada(pasta, ttl=0.1).reivindicar(1)) == 1
+        time.sleep(0.15)
+    assert FilaCompartilhada(pasta, ttl=0.1).reivindicar(1) == []
+    [resultado] = _resultados(pasta).values()
+    assert resultado['status'] == STATUS_ERRO
+
+
+class MotorFalso:
+    """O mínimo do DownloadEngine usado pelo TrabalhadorDistribuido, sem rede."""
+
+    max_workers = 1
+    pausado = pausado_pelo_disjuntor = False
+
+    def __init__(self, analisar):
+        self.analisar = analisar
+
+    def subscribe(self, callback):
+        pass
+
+    def unsubscribe(self, callback):
+        pass
+
+    def extrair_playlist(self, url, ao_lote):
+        return self.analisar(url, ao_lote)
+
+    def adicionar_lote(self, entradas, alvos=None):
+        return [] # Como se já estivessem no índice de downloads: viram "Ignorado"
+
+    def iniciar(self):
+        pass
+
+    def pausar(self):
+        return False
+
+    def cancelar(self, item_id):
+        return False
+
+
+def test_lease_renovado_durante_analise_lenta(tmp_path):
+    ttl = 0.4
+    fila = FilaCompartilhada(str(tmp_path), ttl=ttl)
+    fila.enfileirar([(None, (ENTRADA_PLAYLIST, 'PL1', URL_PLAYLIST.format('PL1')))])
+    outro = FilaCompartilhada(str(tmp_path), ttl=ttl)
+    pegos_pelo_outro = []
+
+    def analisar(url, ao_lote):
+        # A análise leva vários TTLs; enquanto isso, outro worker tenta pegar a playlist
+        fim = time.monotonic() + 4 * ttl
+        while time.monotonic() < fim:
+            time.sleep(ttl / 4)
+            pegos_pelo_outro.extend(outro.reivindicar(1))
+        ao_lote([("Vídeo", "https://www.youtube.com/watch?v=aaaaaaaaaaa", "aaaaaaaaaaa")], 1)
+        return {'title': "Playlist"}, 1
+
+    resultado = TrabalhadorDistribuido(MotorFalso(analisar), fila, consulta_s=0.05).executar()
+
+    assert pegos_pelo_outro == []
+    assert resultado == {STATUS_CONCLUIDO: 0, STATUS_ERRO: 0, STATUS_IGNORADO: 1} # Só os vídeos contam
+    assert fila.resumo() == {'pendentes': 0, 'em_andamento': 0, STATUS_CONCLUIDO: 1, STATUS_IGNORADO: 1}
@@ -0,0 +1,82 @@
+# YouTube MP3 Downloader PRO - Testes da normalização e da leitura de URLs importadas
+import pytest
+
+from importacao import (ENTRADA_PLAYLIST, ENTRADA_URL, ENTRADA_VIDEO, URL_PLAYLIST, URL_VIDEO,
+                        entradas_importadas, normalizar_entrada)
+
+VIDEO = 'dQw4w9WgXcQ'
+ESPERADO = (ENTRADA_VIDEO, VIDEO, URL_VIDEO.format(VIDEO))
+
+
+@pytest.mark.parametrize('texto', [
+    f"https://www.youtube.com/watch?v={VIDEO}",
+    f"http://youtube.com/watch?v={VIDEO}&t=42s",
+    f"https://youtu.be/{VIDEO}?si=abcdef",
+    f"youtu.be/{VIDEO}",
+    f"https://m.youtube.com/watch?v={VIDEO}",
+    f"https://music.youtube.com/watch?v={VIDEO}&feature=share",
+    f"https://www.youtube.com/shorts/{VIDEO}",
+    f"https://www.youtube.com/embed/{VIDEO}",
+    f"https://www.youtube-nocookie.com/embed/{VIDEO}",
+    f"https://www.youtube.com/watch?v={VIDEO}&list=PLabc123&index=4",
+    f"<https://youtu.be/{VIDEO}>",
+    f"  {VIDEO}  ",
+])
+def test_formas_do_mesmo_video_viram_o_mesmo_id(texto):
+    assert normalizar_entrada(texto) == ESPERADO
+
+
+def test_id_solto_so_com_aceitar_id():
+    assert normalizar_entrada(VIDEO, aceitar_id=False) is None
+
+
+def test_playlist_sem_video():
+    assert normalizar_entrada("https://www.youtube.com/playlist?list=PLabc_123-x") == (
+        ENTRADA_PLAYLIST, 'PLabc_123-x', URL_PLAYLIST.format('PLabc_123-x'))
+
+
+def test_outros_sites_e_textos_invalidos():
+    assert normalizar_entrada("https://vimeo.com/12345#t=10") == (
+        ENTRADA_URL, "https://vimeo.com/12345", "https://vimeo.com/12345")
+    assert normalizar_entrada("https://www.youtube.com/@canal") is None
+    assert normalizar_entrada("não é um link") is None
+
+
+def test_texto_com_varios_links_por_linha():
+    linhas = [
+        "# comentário",
+        "",
+        f"https://youtu.be/{VIDEO}, https://www.youtube.com/watch?v=aaaaaaaaaaa",
+        "linha sem link",
+        "bbbbbbbbbbb",
+        "palavra11ch e mais texto", # Um id solto só vale sozinho na linha
+    ]
+    assert list(entradas_importadas(linhas)) == [
+        (None, ESPERADO),
+        (None, (ENTRADA_VIDEO, 'aaaaaaaaaaa', URL_VIDEO.format('aaaaaaaaaaa'))),
+        (None, None),
+        (None, (ENTRADA_VIDEO, 'bbbbbbbbbbb', URL_VIDEO.format('bbbbbbbbbbb'))),
+        (None, None),
+    ]
+
+
+def test_csv_com_cabecalho_titulo_e_delimitador_do_excel():
+    linhas = iter([
+        "Título;Link\n",
+        f"Minha música;https://youtu.be/{VIDEO}\n",
+        "Onzeletras1;https://youtu.be/aaaaaaaaaaa\n", # O link vence o título de 11 letras
+        ";\n",
+        "Sem link;nada aqui\n",
+    ])
+    assert list(entradas_importadas(linhas, formato_csv=True)) == [
+        ("Minha música", ESPERADO),
+        ("Onzeletras1", (ENTRADA_VIDEO, 'aaaaaaaaaaa', URL_VIDEO.format('aaaaaaaaaaa'))),
+        (None, None),
+    ]
+
+
+def test_leitura_sob_demanda():
+    def linhas():
+        yield f"https://youtu.be/{VIDEO}"
+        raise AssertionError("leu além do necessário")
+    assert next(entradas_importadas(linhas())) == (None, ESPERADO)
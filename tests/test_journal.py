@@ -0,0 +1,72 @@
+# YouTube MP3 Downloader PRO - Testes do diário persistente da fila
+import sqlite3
+
+from engine import DownloadEngine
+from fila import STATUS_BAIXANDO, STATUS_CONCLUIDO, STATUS_PAUSADO, STATUS_PENDENTE
+from journal import COLUNAS_NOVAS, FilaJournal
+
+ALVOS = [('MP3', '320kbps'), ('MP4', '720p')]
+
+
+def _carregar(journal):
+    return journal.carregar_pendentes((STATUS_PENDENTE, STATUS_PAUSADO), (STATUS_BAIXANDO,), STATUS_PENDENTE)
+
+
+def test_registrar_lote_grava_tudo_de_uma_vez(tmp_path):
+    journal = FilaJournal(str(tmp_path / 'fila.db'))
+    ids = journal.registrar_lote([("https://youtu.be/aaaaaaaaaaa", "A", 'aaaaaaaaaaa'),
+                                  ("https://vimeo.com/1", "B", 'id-informado')],
+                                 STATUS_PENDENTE, alvos=ALVOS)
+    assert ids == sorted(ids) and len(set(ids)) == 2
+    assert _carregar(journal) == [
+        (ids[0], "https://youtu.be/aaaaaaaaaaa", "A", STATUS_PENDENTE, 0, 0, set(), ALVOS, 'aaaaaaaaaaa'),
+        (ids[1], "https://vimeo.com/1", "B", STATUS_PENDENTE, 0, 0, set(), ALVOS, 'id-informado')]
+    journal.fechar()
+
+
+def test_interrompidos_voltam_como_pendentes_e_finalizados_saem(tmp_path):
+    caminho = str(tmp_path / 'fila.db')
+    journal = FilaJournal(caminho)
+    ids = journal.registrar_lote([(f"u{i}", f"t{i}", None) for i in range(5)], STATUS_PENDENTE)
+    journal.atualizar_status(ids[0], STATUS_BAIXANDO)
+    journal.atualizar_status(ids[1], STATUS_CONCLUIDO)
+    journal.atualizar_parcial(ids[2], STATUS_PAUSADO, 1024, {'v.mp3.part'})
+    journal.atualizar_prioridade(ids[4], -1)
+    journal.fechar()
+
+    journal = FilaJournal(caminho) # Como na próxima abertura do aplicativo
+    linhas = _carregar(journal)
+    assert [(linha[0], linha[3]) for linha in linhas] == [
+        (ids[4], STATUS_PENDENTE), (ids[0], STATUS_PENDENTE), (ids[2], STATUS_PAUSADO), (ids[3], STATUS_PENDENTE)]
+    assert linhas[2][5:7] == (1024, {'v.mp3.part'})
+    assert len(_carregar(journal)) == 4 # O concluído foi apagado de vez
+    journal.fechar()
+
+
+def test_diario_antigo_ganha_as_colunas_novas(tmp_path):
+    caminho = str(tmp_path / 'fila.db')
+    conn = sqlite3.connect(caminho)
+    conn.execute("CREATE TABLE itens (id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, "
+                 "title TEXT NOT NULL, status TEXT NOT NULL, atualizado_em REAL NOT NULL)")
+    conn.execute("INSERT INTO itens (url, title, status, atualizado_em) VALUES ('u', 't', ?, 0)", (STATUS_BAIXANDO,))
+    conn.commit()
+    conn.close()
+
+    journal = FilaJournal(caminho)
+    colunas = {linha[1] for linha in journal._conn.execute("PRAGMA table_info(itens)")}
+    assert set(COLUNAS_NOVAS) <= colunas
+    assert _carregar(journal) == [(1, 'u', 't', STATUS_PENDENTE, 0, 0, set(), None, None)]
+    journal.fechar()
+
+
+def test_motor_restaura_o_id_do_video_informado(tmp_path):
+    journal = FilaJournal(str(tmp_path / 'fila.db'))
+    motor = DownloadEngine(download_folder=str(tmp_path / 'downloads'), journal=journal)
+    motor.adicionar_lote([("Outro site", "https://vimeo.com/1", 'vimeo-1'),
+                          ("Vídeo", "https://youtu.be/bbbbbbbbbbb", None)])
+
+    restaurado = DownloadEngine(download_folder=str(tmp_path / 'downloads'), journal=journal)
+    assert restaurado.restaurar() == 2
+    assert [item.video_id for item in restaurado.snapshot()] == ['vimeo-1', 'bbbbbbbbbbb']
+    assert restaurado.adicionar_lote([("De novo", "https://vimeo.com/1?x=1", 'vimeo-1')]) == [] # Deduplicado
+    journal.fechar()
@@ -0,0 +1,97 @@
+# YouTube MP3 Downloader PRO - Testes dos percentis por fase e do textfile do Prometheus
+import json
+import os
+
+import pytest
+
+import metricas
+from fila import FilaItem, STATUS_CONCLUIDO, STATUS_ERRO
+from metricas import RegistroMetricas, duracoes, percentil
+
+
+@pytest.mark.parametrize('p, esperado', [(0, 1), (10, 1), (11, 2), (50, 5), (90, 9), (91, 10), (99, 10), (100, 10)])
+def test_percentil_pelo_posto_mais_proximo(p, esperado):
+    assert percentil(list(range(1, 11)), p) == esperado
+
+
+def test_percentil_sem_amostras_ou_com_uma_so():
+    assert percentil([], 50) is None
+    assert [percentil([2.5], p) for p in (0, 50, 99, 100)] == [2.5] * 4
+
+
+def test_duracoes_so_das_fases_com_os_dois_marcos():
+    tempos = {'enfileirado': 10.0, 'iniciado': 12.5, 'download_inicio': 13.0, 'extracao_inicio': 12.6}
+    assert duracoes(tempos) == {'espera': 2.5}
+    assert duracoes({'enfileirado': 5.0, 'iniciado': 4.0}) == {'espera': 0.0} # Relógio ajustado
+
+
+def _item(item_id, status, inicio, fim, tamanho):
+    item = FilaItem(item_id, f"Vídeo \"{item_id}\"", f"https://youtu.be/{item_id}", status, video_id=str(item_id))
+    item.tempos.update(enfileirado=0.0, iniciado=inicio, download_inicio=inicio, download_fim=fim, finalizado=fim)
+    item.bytes = tamanho
+    return item
+
+
+def test_log_jsonl_e_resumo_da_execucao(tmp_path):
+    registro = RegistroMetricas(str(tmp_path / 'metricas.jsonl'))
+    linha = registro.registrar(_item(1, STATUS_CONCLUIDO, 1.0, 5.0, 4000))
+    assert linha['velocidade_media'] == 1000 and linha['duracoes']['download'] == 4.0
+    registro.registrar(_item(2, STATUS_ERRO, 2.0, 2.0, 0))
+    resumo = registro.resumo()
+    assert resumo['download'] == {'n': 2, 'max': 4.0, 'p50': 0.0, 'p90': 4.0, 'p99': 4.0}
+    assert resumo['extracao']['n'] == 0 and resumo['extracao']['p50'] is None
+    assert registro.totais_execucao() == (2, 4000)
+    registro.nova_execucao()
+    assert registro.resumo()['total']['n'] == 0 and registro.totais_execucao() == (0, 0)
+    registro.fechar()
+    with open(tmp_path / 'metricas.jsonl', encoding='utf-8') as f:
+        assert [json.loads(linha)['id'] for linha in f] == [1, 2]
+
+
+def test_textfile_do_prometheus(tmp_path):
+    caminho = str(tmp_path / 'ytdl.prom')
+    registro = RegistroMetricas(path_prometheus=caminho)
+    registro.registrar(_item(1, STATUS_CONCLUIDO, 1.0, 5.0, 4000))
+    registro.registrar(_item(2, STATUS_CONCLUIDO, 1.0, 3.0, 1000))
+    registro.registrar(_item(3, 'Erro "de rede"', 1.0, 1.5, 0))
+    registro.nova_execucao() # Os contadores do Prometheus não recomeçam com a execução
+    registro.escrever_prometheus()
+    with open(caminho, encoding='utf-8') as f:
+        linhas = f.read().splitlines()
+    assert "# TYPE ytdl_fase_segundos summary" in linhas
+    assert 'ytdl_fase_segundos{fase="download",quantile="0.5"} 2.000000' in linhas
+    assert 'ytdl_fase_segundos{fase="download",quantile="0.99"} 4.000000' in linhas
+    assert 'ytdl_fase_segundos_sum{fase="download"} 6.500000' in linhas
+    assert 'ytdl_fase_segundos_count{fase="download"} 3' in linhas
+    assert not any(linha.startswith('ytdl_fase_segundos{fase="extracao"') for linha in linhas) # Sem amostras
+    assert f'ytdl_itens_total{{status="{STATUS_CONCLUIDO}"}} 2' in linhas
+    assert 'ytdl_itens_total{status="Erro \\"de rede\\""} 1' in linhas
+    assert linhas[-1] == "ytdl_bytes_total 5000"
+    assert "# TYPE ytdl_bytes_total counter" in linhas
+    registro.fechar()
+
+
+def test_textfile_substituido_de_uma_vez(tmp_path, monkeypatch):
+    caminho = str(tmp_path / 'ytdl.prom')
+    registro = RegistroMetricas(path_prometheus=caminho)
+    registro.escrever_prometheus()
+    with open(caminho, encoding='utf-8') as f:
+        anterior = f.read()
+    substituicoes = []
+    replace = os.replace
+
+    def espiar(origem, destino):
+        with open(destino, encoding='utf-8') as f:
+            visto_pelo_coletor = f.read()
+        with open(origem, encoding='utf-8') as f:
+            novo = f.read()
+        substituicoes.append((visto_pelo_coletor, novo))
+        replace(origem, destino)
+
+    monkeypatch.setattr(metricas.os, 'replace', espiar)
+    registro.registrar(_item(1, STATUS_CONCLUIDO, 1.0, 5.0, 4000))
+    registro.escrever_prometheus()
+    (visto_pelo_coletor, novo), = substituicoes
+    assert visto_pelo_coletor == anterior and novo.endswith("ytdl_bytes_total 4000\n") # Nunca pela metade
+    assert os.listdir(tmp_path) == ['ytdl.prom'] # Sem o temporário
+    assert RegistroMetricas().escrever_prometheus() is None # Sem caminho, não grava nada
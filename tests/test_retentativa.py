@@ -0,0 +1,90 @@
+# YouTube MP3 Downloader PRO - Testes da classificação de erros, do backoff e do disjuntor
+import pytest
+
+from retentativa import ERRO_PERMANENTE, ERRO_TRANSITORIO, DisjuntorFalhas, atraso_backoff, classificar_erro
+
+
+# Imitações das exceções do yt-dlp: só o nome da classe e os atributos lidos importam
+class DownloadError(Exception):
+    def __init__(self, mensagem, exc_info=None):
+        super().__init__(mensagem)
+        self.exc_info = exc_info
+
+class ExtractorError(Exception):
+    def __init__(self, mensagem, expected=False, cause=None):
+        super().__init__(mensagem)
+        self.expected = expected
+        self.cause = cause
+
+class HTTPError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+class TransportError(Exception):
+    pass
+
+def _encapsulado(original):
+    """Um DownloadError como o do yt-dlp, com a exceção original em exc_info."""
+    return DownloadError("ERROR: falhou", exc_info=(type(original), original, None))
+
+
+@pytest.mark.parametrize('status, esperado', [
+    (429, ERRO_TRANSITORIO), (503, ERRO_TRANSITORIO), (403, ERRO_TRANSITORIO),
+    (404, ERRO_PERMANENTE), (410, ERRO_PERMANENTE),
+])
+def test_status_http_da_excecao_original(status, esperado):
+    assert classificar_erro(_encapsulado(HTTPError(status))) == esperado
+
+
+def test_status_http_dentro_da_cadeia_de_causas():
+    erro = ExtractorError("falha na extração", cause=HTTPError(429))
+    assert classificar_erro(_encapsulado(erro)) == ERRO_TRANSITORIO
+
+
+@pytest.mark.parametrize('mensagem, esperado', [
+    ("ERROR: [youtube] abc: Video unavailable", ERRO_PERMANENTE),
+    ("ERROR: [youtube] abc: Private video. Sign in if you've been granted access", ERRO_PERMANENTE),
+    ("ERROR: Unsupported URL: https://example.com", ERRO_PERMANENTE),
+    ("ERROR: unable to download video data: HTTP Error 429: Too Many Requests", ERRO_TRANSITORIO),
+    ("ERROR: Sign in to confirm you're not a bot", ERRO_TRANSITORIO),
+    ("ERROR: Connection reset by peer", ERRO_TRANSITORIO),
+])
+def test_mensagens_conhecidas_do_yt_dlp(mensagem, esperado):
+    assert classificar_erro(DownloadError(mensagem)) == esperado
+
+
+def test_mensagem_permanente_tem_precedencia():
+    assert classificar_erro(DownloadError("Video unavailable (timed out)")) == ERRO_PERMANENTE
+
+
+def test_classes_de_rede_e_erros_esperados():
+    assert classificar_erro(_encapsulado(TransportError("???"))) == ERRO_TRANSITORIO
+    assert classificar_erro(_encapsulado(ExtractorError("???", expected=True))) == ERRO_PERMANENTE
+    assert classificar_erro(ValueError("desconhecido")) == ERRO_PERMANENTE
+
+
+def test_backoff_dobra_ate_o_maximo_com_jitter():
+    assert [atraso_backoff(t, 2, 20, aleatorio=lambda: 1.0) for t in range(1, 6)] == [2, 4, 8, 16, 20]
+    assert atraso_backoff(3, 2, 20, aleatorio=lambda: 0.0) == 4 # Metade do teto
+    assert all(4 <= atraso_backoff(3, 2, 20) <= 8 for _ in range(100))
+
+
+def test_disjuntor_reduz_pausa_e_restaura():
+    disjuntor = DisjuntorFalhas(janela=10, minimo=4, limite=0.5, pausa_s=1, pausa_max_s=3, recuperacao=2)
+    acoes = [disjuntor.registrar(False, 4) for _ in range(4)]
+    assert acoes == [None, None, None, ('reduzir', 2)]
+    assert disjuntor.taxa_abertura == 1.0
+    assert [disjuntor.registrar(False, 4) for _ in range(4)][-1] == ('reduzir', 1)
+    pausas = [[disjuntor.registrar(False, 4) for _ in range(4)][-1] for _ in range(3)]
+    assert pausas == [('pausar', 1), ('pausar', 2), ('pausar', 3)] # Dobra até o máximo
+    assert [disjuntor.registrar(True, 4) for _ in range(2)] == [None, ('restaurar', 2)]
+    assert [disjuntor.registrar(True, 4) for _ in range(2)] == [None, ('restaurar', None)]
+    assert disjuntor.limite_workers is None
+
+
+def test_disjuntor_ignora_falhas_esparsas():
+    disjuntor = DisjuntorFalhas(janela=10, minimo=4, limite=0.5)
+    acoes = [disjuntor.registrar(i % 3 != 2, 4) for i in range(60)] # Uma falha a cada três
+    assert acoes == [None] * 60
+    assert disjuntor.limite_workers is None and disjuntor.taxa_falhas() < 0.5
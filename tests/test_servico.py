@@ -0,0 +1,111 @@
+# YouTube MP3 Downloader PRO - Testes da API local do serviço, com um servidor de verdade
+import http.client
+import json
+import os
+import threading
+
+import pytest
+
+import servico
+from engine import DownloadEngine
+from servico import MotorRemoto, ServidorMotor
+
+VIDEOS = [f"https://youtu.be/video{i:06d}" for i in range(10)] # Ids de 11 caracteres, sem rede
+
+
+@pytest.fixture
+def servidor(tmp_path):
+    engine = DownloadEngine(download_folder=str(tmp_path / 'downloads'))
+    engine.pausado = True # Os itens ficam na fila: nenhum worker vai à rede
+    servidor = ServidorMotor(engine, '127.0.0.1', 0, token_path=str(tmp_path / 'servico.token')).iniciar()
+    yield servidor
+    servidor.parar()
+    engine.encerrar()
+
+@pytest.fixture
+def remoto(servidor):
+    motor = MotorRemoto(servidor.endereco, servidor.token)
+    yield motor
+    motor.encerrar()
+
+
+def _requisitar(servidor, metodo, caminho, corpo=None, **cabecalhos):
+    """(status, resposta) de uma requisição crua; por padrão autorizada, com JSON e o Host do servidor."""
+    host, porta = servidor._httpd.server_address[:2]
+    cabecalhos = {'Authorization': f"Bearer {servidor.token}", 'Content-Type': 'application/json',
+                  'Host': f"{host}:{porta}", **cabecalhos}
+    conexao = http.client.HTTPConnection(host, porta, timeout=10)
+    try:
+        conexao.putrequest(metodo, caminho, skip_host=True)
+        dados = json.dumps(corpo).encode('utf-8') if corpo is not None else b''
+        for nome, valor in dict(cabecalhos, **{'Content-Length': str(len(dados))}).items():
+            if valor is not None:
+                conexao.putheader(nome, valor)
+        conexao.endheaders(dados)
+        resposta = conexao.getresponse()
+        return resposta.status, json.loads(resposta.read())
+    finally:
+        conexao.close()
+
+
+def test_token_ausente_ou_errado_e_recusado(servidor):
+    assert _requisitar(servidor, 'GET', '/api/estado', Authorization=None)[0] == 401
+    assert _requisitar(servidor, 'GET', '/api/estado', Authorization="Bearer outro")[0] == 401
+    status, estado = _requisitar(servidor, 'GET', '/api/estado')
+    assert status == 200 and estado['pausado'] is True
+
+
+def test_pedidos_de_navegador_e_outros_hosts_sao_recusados(servidor):
+    porta = servidor._httpd.server_address[1]
+    assert _requisitar(servidor, 'GET', '/api/estado', Origin="https://exemplo.com")[0] == 403
+    assert _requisitar(servidor, 'GET', '/api/estado', Host=f"exemplo.com:{porta}")[0] == 403 # DNS rebinding
+    assert _requisitar(servidor, 'GET', '/api/estado', Host=f"localhost:{porta}")[0] == 200
+    assert _requisitar(servidor, 'POST', '/api/pausar', {}, **{'Content-Type': 'text/plain'})[0] == 415
+
+
+@pytest.mark.parametrize('pasta', ['..', '../fora', 'sub/../../fora', '/tmp'])
+def test_pasta_fora_da_pasta_inicial_e_recusada(servidor, pasta):
+    status, resposta = _requisitar(servidor, 'POST', '/api/config', {'pasta': pasta})
+    assert status == 400 and 'erro' in resposta
+    assert servidor.engine.download_folder == servidor.pasta_raiz
+
+
+def test_subpasta_da_pasta_inicial_e_aceita(servidor):
+    status, estado = _requisitar(servidor, 'POST', '/api/config', {'pasta': 'sub/../albuns'})
+    assert status == 200
+    assert servidor.engine.download_folder == os.path.join(servidor.pasta_raiz, 'albuns')
+
+
+def test_importacao_enviada_em_partes(servidor, remoto, monkeypatch):
+    monkeypatch.setattr(servico, 'IMPORTACAO_PARTE_LINHAS', 3)
+    caminhos = []
+    requisitar = remoto._requisitar
+    monkeypatch.setattr(remoto, '_requisitar', lambda metodo, caminho, *args, **kwargs: (
+        caminhos.append(caminho), requisitar(metodo, caminho, *args, **kwargs))[1])
+    resumo = remoto.importar(iter(VIDEOS + VIDEOS[:2] + ["não é um link"]))
+    assert resumo['lidas'] == 13 and resumo['enfileirados'] == 10
+    assert resumo['duplicados'] == 2 and resumo['invalidas'] == 1
+    assert caminhos[0] == '/api/importar' and len(caminhos) == 5 # 13 linhas em partes de 3
+    assert all(caminho.startswith('/api/importar/') for caminho in caminhos[1:])
+    assert len(servidor.engine.fila) == 10
+
+
+def test_iniciar_nao_desfaz_a_pausa_compartilhada(servidor, remoto):
+    remoto.iniciar()
+    assert servidor.engine.pausado and remoto.pausado
+
+
+def test_eventos_chegam_pelo_sse(servidor, remoto):
+    recebidos = []
+    chegou = threading.Event()
+
+    def ouvir(evento):
+        if evento['tipo'] == 'itens_adicionados':
+            recebidos.append(evento)
+            chegou.set()
+
+    remoto.subscribe(ouvir)
+    _requisitar(servidor, 'POST', '/api/importar', {'linhas': [VIDEOS[0]], 'aguardar': True})
+    assert chegou.wait(5)
+    item, = recebidos[0]['itens']
+    assert item.video_id == 'video000000' and remoto.fila == [item] # O espelho local é o mesmo objeto